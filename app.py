@@ -1,389 +1,1161 @@
-from flask import Flask, render_template, request, jsonify
-import os
-import base64
-import tempfile
-import cv2
-import numpy as np
-from werkzeug.utils import secure_filename
-import json
-
-# Import các module hiện có
-from src.detect import FoodDetector
-from src.classify import FoodClassifier
-from src.billing import BillingSystem
-
-app = Flask(__name__, 
-            static_folder='web_ui/static',
-            template_folder='web_ui/templates')
-            
-# Tăng giới hạn kích thước nội dung lên 50MB
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
-
-# Cấu hình tuần tự hóa JSON để xử lý các kiểu dữ liệu NumPy
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super(CustomJSONEncoder, self).default(obj)
-
-app.json_encoder = CustomJSONEncoder
-
-# Khởi tạo hệ thống
-class_names = [
-    'banh mi', 'bap cai luoc', 'bap cai xao', 'bo xao', 'ca chien', 'ca chua', 'ca kho',
-    'ca rot', 'canh bau', 'canh bi do', 'canh cai', 'canh chua', 'canh rong bien', 'chuoi',
-    'com', 'dau bap', 'dau hu', 'dau que', 'do chua', 'dua hau', 'dua leo', 'ga chien',
-    'ga kho', 'kho qua', 'kho tieu', 'kho trung', 'nuoc mam', 'nuoc tuong', 'oi', 'ot',
-    'rau', 'rau muong', 'rau ngo', 'suon mieng', 'suon xao', 'thanh long', 'thit chien',
-    'thit luoc', 'tom', 'trung chien', 'trung luoc'
-]
-
-detector = None
-classifier = None
-billing = None
-
-def initialize_models():
-    global detector, classifier, billing
-    detector = FoodDetector()
-    classifier = FoodClassifier(class_names=class_names)
-    billing = BillingSystem()
-
-# Routes
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/api/analyze', methods=['POST'])
-def analyze_image():
-    # Kiểm tra xem các mô hình đã được khởi tạo chưa
-    if detector is None or classifier is None or billing is None:
-        initialize_models()
-    
-    try:
-        # Lấy dữ liệu ảnh từ request
-        if 'image' not in request.files:
-            # Xử lý ảnh được mã hóa base64
-            if 'imageData' in request.form:
-                image_data = request.form['imageData']
-                # Loại bỏ tiền tố data URL nếu có
-                if 'data:image' in image_data:
-                    image_data = image_data.split(',')[1]
-                
-                try:
-                    # Chuyển đổi base64 thành ảnh
-                    image_bytes = base64.b64decode(image_data)
-                    
-                    # Tạo file tạm để lưu ảnh
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-                    temp_file.write(image_bytes)
-                    temp_file.close()
-                    image_path = temp_file.name
-                except Exception as e:
-                    return jsonify({'error': f'Lỗi xử lý dữ liệu ảnh: {str(e)}'}), 400
-            else:
-                return jsonify({'error': 'Không có ảnh được cung cấp'}), 400
-        else:
-            # Xử lý tải lên file
-            image_file = request.files['image']
-            if not image_file:
-                return jsonify({'error': 'File rỗng'}), 400
-                
-            try:
-                filename = secure_filename(image_file.filename)
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1])
-                image_file.save(temp_file.name)
-                temp_file.close()
-                image_path = temp_file.name
-            except Exception as e:
-                return jsonify({'error': f'Lỗi lưu file đã tải lên: {str(e)}'}), 400
-        
-        # Xác thực xem ảnh có thể đọc được không
-        try:
-            img = cv2.imread(image_path)
-            if img is None:
-                return jsonify({'error': 'Không thể đọc file ảnh. Vui lòng thử ảnh khác.'}), 400
-                
-            # Resize ảnh nếu quá lớn
-            max_dimension = 1920  # Kích thước tối đa cho xử lý
-            height, width = img.shape[:2]
-            print(f"Kích thước ảnh gốc: {width}x{height}")
-            if height > max_dimension or width > max_dimension:
-                if height > width:
-                    new_height = max_dimension
-                    new_width = int(width * (max_dimension / height))
-                else:
-                    new_width = max_dimension
-                    new_height = int(height * (max_dimension / width))
-                img = cv2.resize(img, (new_width, new_height))
-                cv2.imwrite(image_path, img)
-                print(f"Đã resize ảnh thành {new_width}x{new_height}")
-        except Exception as e:
-            return jsonify({'error': f'Lỗi đọc ảnh: {str(e)}'}), 400
-        
-        # Xử lý ảnh sử dụng pipeline hiện có
-        try:
-            print("Bắt đầu phát hiện thực phẩm với YOLO...")
-            # Phát hiện các đối tượng bowl (class 45) và cắt
-            cropped_paths, yolo_classes, results = detector.detect_and_crop(image_path)
-            print(f"Hoàn tất phát hiện YOLO. Tìm thấy {len(cropped_paths)} món.")
-            for i, cls in enumerate(yolo_classes):
-                print(f"  Món {i+1}: {cls}")
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return jsonify({
-                'error': f'Lỗi phát hiện món ăn: {str(e)}'
-            }), 500
-        
-        # Kiểm tra xem có món ăn nào được phát hiện không
-        if len(cropped_paths) == 0:
-            return jsonify({
-                'error': 'Không phát hiện được món ăn nào trong hình ảnh. Vui lòng thử lại với ảnh khác.',
-                'items_found': 0
-            }), 400
-        
-        # Phân loại từng ảnh đã cắt và tạo danh sách food_items
-        print("Bắt đầu phân loại các ảnh đã cắt...")
-        food_items = []
-        detected_items = []
-        
-        for i, (path, yolo_class) in enumerate(zip(cropped_paths, yolo_classes)):
-            try:
-                print(f"Xử lý món {i+1}: {yolo_class} (lớp YOLO)")
-                # Tải ảnh đã cắt để hiển thị
-                crop_img = cv2.imread(path)
-                if crop_img is None:
-                    print(f"  Không thể đọc ảnh đã cắt tại {path}")
-                    continue
-                
-                # Nén và resize ảnh đã cắt để giảm kích thước
-                max_crop_size = 300
-                height, width = crop_img.shape[:2]
-                if height > max_crop_size or width > max_crop_size:
-                    if height > width:
-                        new_height = max_crop_size
-                        new_width = int(width * (max_crop_size / height))
-                    else:
-                        new_width = max_crop_size
-                        new_height = int(height * (max_crop_size / width))
-                    crop_img = cv2.resize(crop_img, (new_width, new_height))
-                
-                # Mã hóa ảnh thành dữ liệu base64
-                _, buffer = cv2.imencode('.jpg', crop_img, [cv2.IMWRITE_JPEG_QUALITY, 95])
-                crop_b64 = base64.b64encode(buffer).decode('utf-8')
-                
-                # Phân loại với CNN
-                print(f"  Phân loại với CNN...")
-                cnn_class = classifier.classify(path)
-                print(f"  Kết quả phân loại CNN: {cnn_class}")
-                
-                if cnn_class:
-                    food_class = cnn_class
-                    detected_items.append({
-                        'id': i,
-                        'yolo_class': yolo_class,
-                        'final_class': cnn_class,
-                        'image': f'data:image/jpeg;base64,{crop_b64}'
-                    })
-                    food_items.append(cnn_class)
-                else:
-                    food_class = yolo_class
-                    detected_items.append({
-                        'id': i,
-                        'yolo_class': yolo_class,
-                        'final_class': yolo_class,
-                        'image': f'data:image/jpeg;base64,{crop_b64}'
-                    })
-                    food_items.append(yolo_class)
-            except Exception as e:
-                print(f"Lỗi xử lý ảnh đã cắt {i}: {e}")
-                continue
-        
-        # Nếu không xử lý được món ăn nào
-        if len(food_items) == 0:
-            return jsonify({
-                'error': 'Không thể xử lý được món ăn nào. Vui lòng thử lại với ảnh rõ ràng hơn.',
-                'items_processed': 0
-            }), 400
-        
-        try:
-            # Tính hóa đơn
-            print("Tính hóa đơn cho các món:", food_items)
-            bill_details, total_cost, total_calories = billing.calculate_bill(food_items)
-            print(f"Hoàn tất tính hóa đơn: {len(bill_details)} món, {total_cost} VND, {total_calories} kcal")
-            
-            # Chuyển đổi kiểu dữ liệu NumPy thành kiểu Python
-            total_cost = float(total_cost) if hasattr(total_cost, 'item') else total_cost
-            total_calories = float(total_calories) if hasattr(total_calories, 'item') else total_calories
-            
-            # Định dạng chi tiết hóa đơn để hiển thị tốt hơn
-            formatted_bill = []
-            for i, detail in enumerate(bill_details):
-                price = float(detail['price']) if hasattr(detail['price'], 'item') else detail['price']
-                calories = float(detail['calories']) if hasattr(detail['calories'], 'item') else detail['calories']
-                
-                print(f"Món {i+1}: {detail['item']}, Giá: {price} VND, Calo: {calories} kcal")
-                
-                item_details = {
-                    'id': i,
-                    'item': detail['item'],
-                    'price': price,
-                    'calories': calories,
-                    'image': detected_items[i]['image'] if i < len(detected_items) else None
-                }
-                formatted_bill.append(item_details)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return jsonify({'error': f'Lỗi tính hóa đơn: {str(e)}'}), 500
-        
-        # Dọn dẹp các file tạm
-        try:
-            os.unlink(image_path)
-            for path in cropped_paths:
-                if os.path.exists(path):
-                    os.unlink(path)
-        except Exception as e:
-            print(f"Lỗi dọn dẹp file tạm: {e}")
-        
-        # Trả về kết quả
-        result = {
-            'success': True,
-            'detected_items': detected_items,
-            'bill_details': formatted_bill,
-            'total_cost': total_cost,
-            'total_calories': total_calories,
-            'items_count': len(formatted_bill)
-        }
-        print("Kết quả cuối cùng:", result)
-        return jsonify(result)
-    
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Lỗi phân tích: {str(e)}'}), 500
-
-@app.route('/api/food-info', methods=['GET'])
-def get_food_info():
-    """Trả về thông tin về các món ăn có sẵn"""
-    try:
-        if billing is None:
-            initialize_models()
-        
-        # Lấy thông tin món ăn từ CSV menu
-        menu_data = billing.menu.to_dict('records')
-        
-        # Định dạng dữ liệu cho frontend
-        food_info = []
-        for item in menu_data:
-            food_info.append({
-                'name': item['item'],
-                'calories': item['calories'],
-                'price': item['price'],
-                'category': get_food_category(item['item'])
-            })
-        
-        return jsonify({'success': True, 'food_info': food_info})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/update-food-item', methods=['POST'])
-def update_food_item():
-    """Cập nhật phân loại món ăn và tính lại hóa đơn"""
-    try:
-        # Lấy dữ liệu request
-        data = request.json
-        if not data or 'itemIndex' not in data or 'newFoodItem' not in data:
-            return jsonify({'error': 'Thiếu dữ liệu cần thiết'}), 400
-            
-        item_index = data['itemIndex']
-        new_food_item = data['newFoodItem']
-        bill_data = data.get('billData', {})
-        
-        # Nếu chưa khởi tạo hệ thống tính tiền, khởi tạo nó
-        if billing is None:
-            initialize_models()
-        
-        # Lấy dữ liệu menu để tìm thông tin món ăn mới
-        menu_data = billing.menu.to_dict('records')
-        matching_item = next((item for item in menu_data if item['item'] == new_food_item), None)
-        
-        if not matching_item:
-            return jsonify({'error': f'Không tìm thấy món {new_food_item} trong menu'}), 404
-            
-        # Tính lại hóa đơn với món ăn đã cập nhật
-        # Nếu bill_data được cung cấp, sử dụng nó để cập nhật món cụ thể
-        if bill_data and 'bill_details' in bill_data and item_index < len(bill_data['bill_details']):
-            # Lưu thông tin cũ để tham khảo
-            old_item = bill_data['bill_details'][item_index]['item']
-            old_price = bill_data['bill_details'][item_index]['price']
-            old_calories = bill_data['bill_details'][item_index]['calories']
-            
-            # Cập nhật món ăn
-            bill_data['bill_details'][item_index]['item'] = new_food_item
-            bill_data['bill_details'][item_index]['price'] = matching_item['price']
-            bill_data['bill_details'][item_index]['calories'] = matching_item['calories']
-            
-            # Tính lại tổng
-            total_cost = sum(item['price'] for item in bill_data['bill_details'])
-            total_calories = sum(item['calories'] for item in bill_data['bill_details'])
-            
-            # Cập nhật tổng
-            bill_data['total_cost'] = total_cost
-            bill_data['total_calories'] = total_calories
-            
-            return jsonify({
-                'success': True, 
-                'updated_bill': bill_data,
-                'old_item': {
-                    'name': old_item,
-                    'price': old_price,
-                    'calories': old_calories
-                },
-                'new_item': {
-                    'name': new_food_item,
-                    'price': matching_item['price'],
-                    'calories': matching_item['calories']
-                }
-            })
-        else:
-            # Trả về chỉ thông tin món ăn mới nếu không cung cấp bill_data
-            return jsonify({
-                'success': True,
-                'new_item': {
-                    'name': new_food_item,
-                    'price': matching_item['price'],
-                    'calories': matching_item['calories']
-                }
-            })
-            
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Lỗi cập nhật món ăn: {str(e)}'}), 500
-
-def get_food_category(item_name):
-    """Hàm đơn giản để phân loại các món ăn"""
-    item_name = item_name.lower()
-    
-    # Phân loại dựa trên các loại thực phẩm Việt Nam phổ biến
-    if any(x in item_name for x in ['com', 'bun', 'pho', 'banh']):
-        return 'Carbohydrates'
-    elif any(x in item_name for x in ['thit', 'ga', 'bo', 'ca chien', 'ca kho', 'trung', 'tom', 'suon', 'kho tieu', 'dau hu']):
-        return 'Protein'
-    elif any(x in item_name for x in ['rau', 'dau', 'bap cai', 'cai', 'dua leo', 'ot', 'ca chua', 'kho qua']):
-        return 'Vegetable'
-    elif any(x in item_name for x in ['canh', 'ca chua', 'ca rot']):
-        return 'Soup'
-    else:
-        return 'Other'
-
-if __name__ == '__main__':
-    # Khởi tạo mô hình khi khởi động
-    initialize_models()
-    # Chạy ứng dụng Flask
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+from flask import Flask, render_template, request, jsonify, Response, abort, g
+import os
+import base64
+import cv2
+import numpy as np
+import json
+import gzip
+import uuid
+import hashlib
+import hmac
+import logging
+import time
+import threading
+
+# Import các module hiện có
+from src.billing import BillingSystem
+from src.registry import ModelRegistry
+from src.cache import CropCache
+from src.stream import StreamManager
+from src.jobs import JobManager
+from src.thumbnails import ThumbnailStore
+from src.bills import BillSessionStore
+from src.ingest import ingest_image
+from src.orders import OrderStore
+from src.rollups import SalesRollups
+from src.log import setup_logging, request_id_var
+from src.metrics import (REGISTRY, STAGE_SECONDS, REQUEST_SECONDS, TRAY_ITEMS, ITEMS_TOTAL,
+                         CNN_FALLBACKS_TOTAL)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+app = Flask(__name__, 
+            static_folder='web_ui/static',
+            template_folder='web_ui/templates')
+            
+# Logging: mức log (chi tiết từng ảnh cắt chỉ có ở DEBUG) và định dạng 'json' hoặc 'text'
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'json')
+setup_logging(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'])
+logger = logging.getLogger(__name__)
+
+# Tăng giới hạn kích thước nội dung lên 50MB
+app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
+
+# Backend suy luận của CNN: 'keras', 'tflite' hoặc 'onnx' (xem src/export_cnn.py)
+app.config['CNN_BACKEND'] = os.environ.get('CNN_BACKEND', 'keras')
+app.config['CNN_MODEL_PATH'] = os.environ.get('CNN_MODEL_PATH')
+app.config['CNN_NUM_THREADS'] = int(os.environ['CNN_NUM_THREADS']) if os.environ.get('CNN_NUM_THREADS') else None
+
+# Mô hình YOLO: yolov8n.pt (ultralytics) hoặc bản đã xuất .onnx / *_openvino_model (xem src/export_yolo.py)
+app.config['YOLO_MODEL_PATH'] = os.environ.get('YOLO_MODEL_PATH')
+
+# Danh sách lớp của CNN (file JSON hoặc mỗi dòng một tên; None = danh sách mặc định)
+app.config['CLASS_NAMES_PATH'] = os.environ.get('CLASS_NAMES_PATH')
+
+# Danh mục phiên bản mô hình: manifest, chu kỳ kiểm tra thay đổi (giây), ảnh khay mẫu để
+# kiểm tra phiên bản mới và token quản trị (header X-Admin-Token của các API thay đổi /api/models; None = tắt các API này)
+app.config['MODEL_MANIFEST_PATH'] = os.environ.get('MODEL_MANIFEST_PATH', 'models/registry.json')
+app.config['MODEL_RELOAD_INTERVAL'] = 5.0
+app.config['MODEL_SMOKE_IMAGE'] = os.environ.get('MODEL_SMOKE_IMAGE')
+app.config['MODEL_ADMIN_TOKEN'] = os.environ.get('MODEL_ADMIN_TOKEN')
+
+# Menu: file CSV (None = tìm menu_info.csv ở các vị trí mặc định) và chu kỳ kiểm tra thay đổi (giây)
+app.config['MENU_PATH'] = os.environ.get('MENU_PATH')
+app.config['MENU_RELOAD_INTERVAL'] = 2.0
+
+# Cache kết quả phân loại theo perceptual hash của ảnh cắt (0 = tắt)
+app.config['CLASSIFY_CACHE_SIZE'] = int(os.environ.get('CLASSIFY_CACHE_SIZE', 0))
+app.config['CLASSIFY_CACHE_TTL'] = 600
+app.config['CLASSIFY_CACHE_MAX_DISTANCE'] = 4
+
+# Chế độ camera trực tiếp: số phiên tối đa, thời gian sống (giây) và ngưỡng chuyển động
+app.config['STREAM_MAX_SESSIONS'] = 32
+app.config['STREAM_SESSION_TTL'] = 300
+app.config['STREAM_MOTION_THRESHOLD'] = 8.0
+# Món đã tính tiền biến mất rồi xuất hiện lại cùng vị trí trong khoảng này (giây) không bị tính lại
+app.config['STREAM_REBILL_COOLDOWN'] = 10.0
+
+# Công việc phân tích bất đồng bộ (/api/jobs): số worker, số công việc chờ tối đa,
+# thời gian giữ kết quả (giây) và thời gian long-poll tối đa (giây)
+app.config['JOBS_MAX_WORKERS'] = 2
+app.config['JOBS_MAX_PENDING'] = 64
+app.config['JOBS_TTL'] = 300
+app.config['JOBS_MAX_WAIT'] = 30
+
+# Định dạng phản hồi mặc định: 'full' (ảnh cắt base64 trong JSON) hoặc 'slim'
+# (ảnh cắt lấy qua /api/crops/<id>); client có thể chọn bằng tham số format
+app.config['RESPONSE_FORMAT'] = 'full'
+app.config['CROP_STORE_SIZE'] = 2048
+app.config['CROP_STORE_TTL'] = 600
+app.config['CROP_JPEG_QUALITY'] = 85
+
+# Phiên hóa đơn (sửa món qua /api/update-food-item với session_id): số phiên tối đa
+# và thời gian sống (giây) kể từ lần dùng cuối
+app.config['BILL_SESSIONS_MAX'] = 4096
+app.config['BILL_SESSION_TTL'] = 1800
+
+# Nén JSON theo Accept-Encoding (br nếu có thư viện brotli, ngược lại gzip)
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 5
+
+# Độ phân giải xử lý: cạnh dài tối đa của ảnh dùng để cắt món ăn và của ảnh đưa vào YOLO
+# (JPEG lớn được giải mã thẳng ở độ phân giải giảm, xem src/ingest.py)
+app.config['INGEST_CROP_MAX_DIMENSION'] = 1920
+app.config['INGEST_DETECT_MAX_DIMENSION'] = 640
+
+# Lưu đơn hàng đã hoàn tất (SQLite, chế độ WAL): đơn được gom lô và ghi nền,
+# tối đa ORDERS_BATCH_SIZE đơn mỗi transaction, chờ gom tối đa ORDERS_FLUSH_INTERVAL giây
+app.config['ORDERS_DB_PATH'] = os.environ.get('ORDERS_DB_PATH', 'data/orders.db')
+app.config['ORDERS_BATCH_SIZE'] = 256
+app.config['ORDERS_FLUSH_INTERVAL'] = 0.05
+app.config['ORDERS_MAX_PENDING'] = 10000
+app.config['ORDERS_PAGE_SIZE'] = 50
+
+# Cấu hình gom lô suy luận giữa các request đồng thời và thời gian tối đa (giây) chờ kết quả
+app.config['INFERENCE_MAX_BATCH_SIZE'] = 8
+app.config['INFERENCE_MAX_DETECT_BATCH_SIZE'] = 4
+app.config['INFERENCE_MAX_WAIT_MS'] = 8
+app.config['INFERENCE_RESULT_TIMEOUT'] = 30.0
+
+# Cấu hình tuần tự hóa JSON để xử lý các kiểu dữ liệu NumPy
+class CustomJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, np.integer):
+            return int(obj)
+        elif isinstance(obj, np.floating):
+            return float(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super(CustomJSONEncoder, self).default(obj)
+
+app.json_encoder = CustomJSONEncoder
+
+# Khởi tạo hệ thống
+models = ModelRegistry(
+    app.config['MODEL_MANIFEST_PATH'],
+    defaults={
+        'yolo_model_path': app.config['YOLO_MODEL_PATH'],
+        'cnn_model_path': app.config['CNN_MODEL_PATH'],
+        'cnn_backend': app.config['CNN_BACKEND'],
+        'class_names_path': app.config['CLASS_NAMES_PATH'],
+    },
+    cache=CropCache(
+        max_size=app.config['CLASSIFY_CACHE_SIZE'],
+        ttl=app.config['CLASSIFY_CACHE_TTL'],
+        max_distance=app.config['CLASSIFY_CACHE_MAX_DISTANCE']
+    ) if app.config['CLASSIFY_CACHE_SIZE'] > 0 else None,
+    num_threads=app.config['CNN_NUM_THREADS'],
+    scheduler_options={
+        'max_batch_size': app.config['INFERENCE_MAX_BATCH_SIZE'],
+        'max_wait_ms': app.config['INFERENCE_MAX_WAIT_MS'],
+        'max_detect_batch_size': app.config['INFERENCE_MAX_DETECT_BATCH_SIZE'],
+        'result_timeout': app.config['INFERENCE_RESULT_TIMEOUT'],
+    },
+    # Warm-up với kích thước lô thực tế (ảnh từ frontend tối đa 1024px)
+    warmup_batch_sizes=((1, app.config['INFERENCE_MAX_DETECT_BATCH_SIZE']), (1, app.config['INFERENCE_MAX_BATCH_SIZE'])),
+    smoke_image_path=app.config['MODEL_SMOKE_IMAGE']
+)
+billing = None
+streams = StreamManager(
+    max_sessions=app.config['STREAM_MAX_SESSIONS'],
+    ttl=app.config['STREAM_SESSION_TTL'],
+    motion_threshold=app.config['STREAM_MOTION_THRESHOLD'],
+    rebill_cooldown=app.config['STREAM_REBILL_COOLDOWN']
+)
+crop_store = ThumbnailStore(
+    max_size=app.config['CROP_STORE_SIZE'],
+    ttl=app.config['CROP_STORE_TTL']
+)
+bill_sessions = BillSessionStore(
+    max_size=app.config['BILL_SESSIONS_MAX'],
+    ttl=app.config['BILL_SESSION_TTL']
+)
+jobs = JobManager(
+    max_workers=app.config['JOBS_MAX_WORKERS'],
+    max_pending=app.config['JOBS_MAX_PENDING'],
+    ttl=app.config['JOBS_TTL']
+)
+# Kho đơn hàng và bảng tổng hợp được tạo khi cần (init_orders), không phải khi import app
+orders = None
+rollups = None
+_orders_lock = threading.Lock()
+
+def init_orders():
+    """
+    Mở kho đơn hàng và bảng tổng hợp đúng một lần
+
+    Chỉ import app (master của serve.py, benchmark, công cụ) không tạo file CSDL và
+    không đăng ký flush khi thoát; worker mở kho trong initialize_models().
+
+    Returns:
+        OrderStore: Kho đơn hàng
+    """
+    global orders, rollups
+    with _orders_lock:
+        if orders is None:
+            store = OrderStore(
+                app.config['ORDERS_DB_PATH'],
+                batch_size=app.config['ORDERS_BATCH_SIZE'],
+                flush_interval=app.config['ORDERS_FLUSH_INTERVAL'],
+                max_pending=app.config['ORDERS_MAX_PENDING']
+            )
+            # Bảng tổng hợp được cập nhật cùng transaction ghi đơn hàng
+            rollups = SalesRollups(store)
+            orders = store
+    return orders
+
+def decode_for_inference(image_bytes):
+    """Giải mã ảnh thành cặp ảnh cắt/ảnh YOLO theo cấu hình INGEST_*"""
+    return ingest_image(
+        image_bytes,
+        crop_max_dimension=app.config['INGEST_CROP_MAX_DIMENSION'],
+        detect_max_dimension=app.config['INGEST_DETECT_MAX_DIMENSION']
+    )
+
+_init_lock = threading.Lock()
+models_ready = threading.Event()
+model_init_error = None
+
+def load_models():
+    """
+    Tạo các mô hình của phiên bản đang hoạt động và BillingSystem mà không chạy suy luận
+    
+    Với backend an toàn khi fork (xem ModelRegistry.fork_safe), serve.py gọi hàm này
+    trong tiến trình master trước khi fork để trọng số chỉ nằm một lần trong bộ nhớ
+    và được các worker chia sẻ theo copy-on-write.
+    """
+    global billing
+    with _init_lock:
+        if models.active is not None and billing is not None:
+            return
+        models.load_initial()
+        billing = BillingSystem(menu_path=app.config['MENU_PATH'])
+
+def initialize_models():
+    """
+    Tải mô hình và BillingSystem đúng một lần, warm-up và kiểm tra nhanh
+    
+    An toàn khi được gọi đồng thời: các lần gọi sau chờ lần gọi đầu hoàn tất
+    thay vì tải lại mô hình. Nếu mô hình đã được load_models() tải sẵn (tiến trình
+    master của serve.py) thì chỉ chạy warm-up và khởi động bộ lập lịch.
+    """
+    global model_init_error
+    if models_ready.is_set():
+        return
+    
+    init_orders()
+    try:
+        load_models()
+    except Exception as e:
+        model_init_error = str(e)
+        logger.exception("Lỗi khởi tạo mô hình: %s", model_init_error)
+        raise
+    
+    with _init_lock:
+        if models_ready.is_set():
+            return
+        
+        try:
+            logger.info("Đang warm-up các mô hình...")
+            models.start()
+            
+            # Các luồng theo dõi menu và manifest mô hình được tạo sau khi fork
+            # (mỗi worker của serve.py một luồng)
+            billing.start_watching(app.config['MENU_RELOAD_INTERVAL'])
+            models.start_watching(app.config['MODEL_RELOAD_INTERVAL'])
+        except Exception as e:
+            model_init_error = str(e)
+            logger.exception("Lỗi khởi tạo mô hình: %s", model_init_error)
+            raise
+        
+        model_init_error = None
+        models_ready.set()
+        logger.info("Các mô hình đã sẵn sàng")
+
+def require_models():
+    """
+    Khởi tạo mô hình nếu cần trước khi xử lý một request API
+
+    Returns:
+        tuple: None nếu mô hình đã sẵn sàng, hoặc phản hồi JSON 503 nếu khởi tạo thất bại
+    """
+    if models_ready.is_set():
+        return None
+    try:
+        initialize_models()
+    except Exception as e:
+        return jsonify({'error': f'Mô hình chưa sẵn sàng: {str(e)}'}), 503
+    return None
+
+def start_models_initialization():
+    """Tải mô hình trong luồng nền để /healthz phản hồi ngay trong lúc khởi động"""
+    thread = threading.Thread(target=initialize_models, name='model-init', daemon=True)
+    thread.start()
+    return thread
+
+# Routes
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Kiểm tra tiến trình còn sống (không phụ thuộc vào mô hình)"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Chỉ trả về 200 khi các mô hình đã được tải và warm-up xong"""
+    if models_ready.is_set():
+        return jsonify({'status': 'ready'})
+    if model_init_error:
+        return jsonify({'status': 'error', 'error': model_init_error}), 503
+    return jsonify({'status': 'loading'}), 503
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze_image():
+    # Kiểm tra xem các mô hình đã được khởi tạo chưa
+    error_response = require_models()
+    if error_response is not None:
+        return error_response
+    
+    try:
+        # Lấy dữ liệu ảnh từ request (giữ nguyên trong bộ nhớ, không ghi ra đĩa)
+        image_bytes, error_response = read_request_image()
+        if error_response is not None:
+            return error_response
+        
+        result, status = analyze_tray(image_bytes, slim=wants_slim_response())
+        with STAGE_SECONDS.time(stage='serialize'):
+            response = jsonify(result)
+        return response, status
+    
+    except Exception as e:
+        logger.exception("Lỗi phân tích: %s", e)
+        return jsonify({'error': f'Lỗi phân tích: {str(e)}'}), 500
+
+def analyze_tray(image_bytes, slim=False):
+    """
+    Chạy toàn bộ pipeline (giải mã, YOLO, CNN, tính hóa đơn) cho một ảnh khay
+    
+    Không phụ thuộc vào request Flask nên có thể chạy trong worker của /api/jobs.
+    
+    Args:
+        image_bytes (bytes): Dữ liệu ảnh đã mã hóa (JPEG/PNG...)
+        slim (bool): Trả ảnh cắt dưới dạng URL /api/crops/<id> thay vì base64
+        
+    Returns:
+        tuple: (kết quả dạng dict theo định dạng /api/analyze, mã HTTP)
+    """
+    # Cả khay dùng một phiên bản mô hình, kể cả khi phiên bản được thay giữa chừng;
+    # bundle đó không bị dừng cho đến khi khay được xử lý xong
+    with models.use() as bundle:
+        return _analyze_tray(bundle, image_bytes, slim)
+
+def _analyze_tray(bundle, image_bytes, slim):
+    """Pipeline của analyze_tray trên một bundle cố định"""
+    # Giải mã ảnh một lần duy nhất (ở độ phân giải giảm nếu ảnh lớn) và xác thực xem ảnh có đọc được không
+    try:
+        ingested = decode_for_inference(image_bytes)
+        if ingested is None:
+            return {'error': 'Không thể đọc file ảnh. Vui lòng thử ảnh khác.'}, 400
+        
+        width, height = ingested.original_size
+        logger.debug("Kích thước ảnh gốc: %dx%d, giải mã 1/%d, ảnh cắt %dx%d, ảnh YOLO %dx%d",
+                     width, height, ingested.decode_factor,
+                     ingested.source.shape[1], ingested.source.shape[0],
+                     ingested.frame.shape[1], ingested.frame.shape[0])
+    except Exception as e:
+        return {'error': f'Lỗi đọc ảnh: {str(e)}'}, 400
+    
+    # Xử lý ảnh sử dụng pipeline hiện có
+    try:
+        # Phát hiện các đối tượng bowl (class 45) trên ảnh độ phân giải thấp (qua bộ lập lịch gom lô),
+        # sau đó chỉ cắt các vùng đã phát hiện từ ảnh độ phân giải cao
+        crops, results = bundle.scheduler.detect_crops(ingested.frame)
+        crops = ingested.crops_from(crops)
+        logger.debug("Hoàn tất phát hiện YOLO. Tìm thấy %d món.", len(crops))
+    except Exception as e:
+        logger.exception("Lỗi phát hiện món ăn: %s", e)
+        return {'error': f'Lỗi phát hiện món ăn: {str(e)}'}, 500
+    
+    # Kiểm tra xem có món ăn nào được phát hiện không
+    if len(crops) == 0:
+        return {
+            'error': 'Không phát hiện được món ăn nào trong hình ảnh. Vui lòng thử lại với ảnh khác.',
+            'items_found': 0
+        }, 400
+    
+    TRAY_ITEMS.observe(len(crops))
+    ITEMS_TOTAL.inc(len(crops))
+    
+    # Phân loại tất cả ảnh đã cắt (được gom lô cùng các request đồng thời khác)
+    predictions = bundle.scheduler.classify_batch([crop.image for crop in crops])
+    
+    # Tạo danh sách food_items
+    food_items = []
+    detected_items = []
+    
+    for i, (crop, prediction) in enumerate(zip(crops, predictions)):
+        try:
+            logger.debug("Món %d: lớp YOLO %s, kết quả CNN %s", i + 1, crop.yolo_class, prediction)
+            detected_item = make_detected_item(i, crop, prediction, slim)
+            detected_items.append(detected_item)
+            food_items.append(detected_item['final_class'])
+        except Exception as e:
+            logger.warning("Lỗi xử lý ảnh đã cắt %d: %s", i, e)
+            continue
+    
+    # Nếu không xử lý được món ăn nào
+    if len(food_items) == 0:
+        return {
+            'error': 'Không thể xử lý được món ăn nào. Vui lòng thử lại với ảnh rõ ràng hơn.',
+            'items_processed': 0
+        }, 400
+    
+    try:
+        result = build_bill_result(food_items, detected_items, open_session=True)
+        result['model_version'] = bundle.version
+    except Exception as e:
+        logger.exception("Lỗi tính hóa đơn: %s", e)
+        return {'error': f'Lỗi tính hóa đơn: {str(e)}'}, 500
+    
+    # Trả về kết quả
+    logger.info("Đã phân tích khay: %d món, %s VND, %s kcal", result['items_count'], result['total_cost'], result['total_calories'],
+                extra={'items': result['items_count'], 'decode_factor': ingested.decode_factor})
+    return result, 200
+
+def read_request_image():
+    """
+    Lấy bytes ảnh từ request: file tải lên ('image'), base64 ('imageData') hoặc body nhị phân
+    
+    Returns:
+        tuple: (bytes ảnh, None) hoặc (None, phản hồi lỗi)
+    """
+    if 'image' in request.files:
+        # Xử lý tải lên file
+        image_file = request.files['image']
+        if not image_file:
+            return None, (jsonify({'error': 'File rỗng'}), 400)
+            
+        try:
+            return image_file.read(), None
+        except Exception as e:
+            return None, (jsonify({'error': f'Lỗi đọc file đã tải lên: {str(e)}'}), 400)
+    
+    if 'imageData' in request.form:
+        # Xử lý ảnh được mã hóa base64
+        image_data = request.form['imageData']
+        # Loại bỏ tiền tố data URL nếu có
+        if 'data:image' in image_data:
+            image_data = image_data.split(',')[1]
+        
+        try:
+            # Chuyển đổi base64 thành bytes ảnh
+            return base64.b64decode(image_data), None
+        except Exception as e:
+            return None, (jsonify({'error': f'Lỗi xử lý dữ liệu ảnh: {str(e)}'}), 400)
+    
+    if request.mimetype in ('image/jpeg', 'image/png', 'application/octet-stream'):
+        # Ảnh gửi trực tiếp trong body (dùng cho luồng camera)
+        return request.get_data(), None
+    
+    return None, (jsonify({'error': 'Không có ảnh được cung cấp'}), 400)
+
+def resize_to_max(img, max_dimension):
+    """Thu nhỏ ảnh giữ tỉ lệ để cạnh dài nhất không vượt quá max_dimension"""
+    height, width = img.shape[:2]
+    if height <= max_dimension and width <= max_dimension:
+        return img
+    if height > width:
+        new_height = max_dimension
+        new_width = int(width * (max_dimension / height))
+    else:
+        new_width = max_dimension
+        new_height = int(height * (max_dimension / width))
+    return cv2.resize(img, (new_width, new_height))
+
+def encode_crop_jpeg(crop_img, max_crop_size=300):
+    """Resize và nén ảnh đã cắt thành bytes JPEG"""
+    with STAGE_SECONDS.time(stage='crop_encode'):
+        crop_img = resize_to_max(crop_img, max_crop_size)
+        _, buffer = cv2.imencode('.jpg', crop_img, [cv2.IMWRITE_JPEG_QUALITY, app.config['CROP_JPEG_QUALITY']])
+        return buffer.tobytes()
+
+def encode_crop_image(crop_img, max_crop_size=300):
+    """Nén, resize và mã hóa ảnh đã cắt thành data URL base64 để hiển thị"""
+    crop_b64 = base64.b64encode(encode_crop_jpeg(crop_img, max_crop_size)).decode('utf-8')
+    return f'data:image/jpeg;base64,{crop_b64}'
+
+def crop_image_field(crop_img, slim):
+    """
+    Trường ảnh của một món trong kết quả
+    
+    Returns:
+        dict: {'image_url': '/api/crops/<id>'} ở chế độ slim, ngược lại {'image': data URL}
+    """
+    if slim:
+        crop_id = crop_store.put(encode_crop_jpeg(crop_img))
+        return {'image_url': f'/api/crops/{crop_id}'}
+    return {'image': encode_crop_image(crop_img)}
+
+def wants_slim_response():
+    """Client chọn định dạng slim bằng tham số format=slim (query hoặc form)"""
+    response_format = request.args.get('format') or request.form.get('format') or app.config['RESPONSE_FORMAT']
+    return response_format == 'slim'
+
+def make_detected_item(item_id, crop, prediction, slim=False):
+    """
+    Tạo mục detected_items cho một ảnh cắt; dùng lớp YOLO nếu CNN thất bại
+    
+    Args:
+        item_id (int): Chỉ số món trong khay
+        crop (FoodCrop): Ảnh cắt
+        prediction (list): Kết quả top-k của CNN hoặc None
+        slim (bool): Trả ảnh dưới dạng URL thay vì base64
+    """
+    cnn_class = prediction[0][0] if prediction else None
+    if not cnn_class:
+        CNN_FALLBACKS_TOTAL.inc()
+    return {
+        'id': item_id,
+        'yolo_class': crop.yolo_class,
+        'final_class': cnn_class if cnn_class else crop.yolo_class,
+        **crop_image_field(crop.image, slim)
+    }
+
+def build_bill_result(food_items, detected_items, open_session=False):
+    """
+    Tính hóa đơn và tạo kết quả theo định dạng của /api/analyze
+    
+    Args:
+        food_items (list): Tên các món ăn
+        detected_items (list): Các mục detected_items tương ứng (chứa 'image' hoặc 'image_url')
+        open_session (bool): Tạo phiên hóa đơn ở máy chủ và trả về session_id để sửa món
+    """
+    # Tính hóa đơn
+    logger.debug("Tính hóa đơn cho các món: %s", food_items)
+    # Dùng một snapshot menu cho cả hóa đơn, kể cả khi menu được tải lại giữa chừng
+    menu = billing.snapshot
+    with STAGE_SECONDS.time(stage='bill'):
+        bill_details, total_cost, total_calories = menu.calculate_bill(food_items)
+    
+    # Định dạng chi tiết hóa đơn để hiển thị tốt hơn (BillingSystem đã trả về số Python)
+    formatted_bill = []
+    for i, detail in enumerate(bill_details):
+        item_details = {
+            'id': i,
+            'item': detail['item'],
+            'price': detail['price'],
+            'calories': detail['calories']
+        }
+        if i < len(detected_items) and 'image_url' in detected_items[i]:
+            item_details['image_url'] = detected_items[i]['image_url']
+        else:
+            item_details['image'] = detected_items[i]['image'] if i < len(detected_items) else None
+        formatted_bill.append(item_details)
+    
+    result = {
+        'success': True,
+        'detected_items': detected_items,
+        'bill_details': formatted_bill,
+        'total_cost': total_cost,
+        'total_calories': total_calories,
+        'items_count': len(formatted_bill),
+        'menu_version': menu.version
+    }
+    if open_session:
+        result['session_id'] = bill_sessions.create(bill_details, total_cost, total_calories, menu.version).id
+    return result
+
+@app.route('/api/stream', methods=['POST'])
+def start_stream():
+    """Mở một phiên camera trực tiếp"""
+    error_response = require_models()
+    if error_response is not None:
+        return error_response
+    
+    session = streams.create()
+    if session is None:
+        return jsonify({'error': 'Quá nhiều phiên camera đang mở. Vui lòng thử lại sau.'}), 429
+    return jsonify({'success': True, 'session_id': session.id})
+
+@app.route('/api/stream/<session_id>/frame', methods=['POST'])
+def stream_frame(session_id):
+    """
+    Nhận một khung hình của phiên camera
+    
+    Detector chỉ chạy khi cảnh thay đổi; mỗi món được theo dõi qua các khung hình và
+    chỉ được phân loại, tính tiền một lần.
+    """
+    session = streams.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Phiên camera không tồn tại hoặc đã hết hạn'}), 404
+    
+    image_bytes, error_response = read_request_image()
+    if error_response is not None:
+        return error_response
+    ingested = decode_for_inference(image_bytes)
+    if ingested is None:
+        return jsonify({'error': 'Không thể đọc khung hình'}), 400
+    
+    try:
+        # Cả khung hình dùng một phiên bản mô hình, kể cả khi phiên bản được thay giữa chừng
+        with models.use() as bundle:
+            def detect_fn(frame):
+                crops, results = bundle.scheduler.detect_crops(frame)
+                return ingested.crops_from(crops), results
+            
+            detector_ran, confirmed = session.process_frame(ingested.frame, detect_fn, bundle.scheduler.classify_batch)
+        
+        new_items = []
+        if confirmed:
+            menu = billing.snapshot
+            bill_details, _, _ = menu.calculate_bill([track.label for track in confirmed])
+            for track, detail in zip(confirmed, bill_details):
+                new_items.append({
+                    'track_id': track.id,
+                    'item': detail['item'],
+                    'price': detail['price'],
+                    'calories': detail['calories'],
+                    'menu_version': menu.version
+                })
+        
+        return jsonify({
+            'success': True,
+            'detector_ran': detector_ran,
+            'new_items': new_items,
+            'model_version': bundle.version,
+            'stats': session.stats()
+        })
+    except Exception as e:
+        logger.exception("Lỗi xử lý khung hình: %s", e)
+        return jsonify({'error': f'Lỗi xử lý khung hình: {str(e)}'}), 500
+
+@app.route('/api/stream/<session_id>', methods=['DELETE'])
+def stop_stream(session_id):
+    """Đóng phiên camera và trả về hóa đơn của các món đã theo dõi (cùng định dạng /api/analyze)"""
+    session = streams.close(session_id)
+    if session is None:
+        return jsonify({'error': 'Phiên camera không tồn tại hoặc đã hết hạn'}), 404
+    
+    if not session.billed_tracks:
+        return jsonify({
+            'error': 'Không phát hiện được món ăn nào trong luồng camera.',
+            'items_found': 0
+        }), 400
+    
+    try:
+        slim = wants_slim_response()
+        detected_items = []
+        for i, track in enumerate(session.billed_tracks):
+            detected_items.append({
+                'id': i,
+                'yolo_class': track.yolo_class,
+                'final_class': track.label,
+                **crop_image_field(track.image, slim)
+            })
+        result = build_bill_result([item['final_class'] for item in detected_items], detected_items,
+                                   open_session=True)
+        result['stream'] = session.stats()
+        return jsonify(result)
+    except Exception as e:
+        logger.exception("Lỗi tính hóa đơn: %s", e)
+        return jsonify({'error': f'Lỗi tính hóa đơn: {str(e)}'}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Gửi ảnh khay để phân tích bất đồng bộ
+    
+    Nhận dữ liệu ảnh giống /api/analyze, trả về ngay job_id (202). Kết quả lấy qua
+    GET /api/jobs/<job_id>.
+    """
+    error_response = require_models()
+    if error_response is not None:
+        return error_response
+    
+    image_bytes, error_response = read_request_image()
+    if error_response is not None:
+        return error_response
+    
+    job = jobs.submit(analyze_tray, image_bytes, wants_slim_response())
+    if job is None:
+        return jsonify({'error': 'Hàng đợi phân tích đã đầy. Vui lòng thử lại sau.'}), 429
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Lấy trạng thái hoặc kết quả của một công việc
+    
+    Tham số wait (giây) cho phép chờ đến khi công việc xong (long-poll). Khi đã xong,
+    trả về kết quả đúng định dạng và mã HTTP của /api/analyze; khi chưa xong trả về 202.
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), app.config['JOBS_MAX_WAIT'])
+    except ValueError:
+        return jsonify({'error': 'Tham số wait không hợp lệ'}), 400
+    
+    job = jobs.wait(job_id, wait)
+    if job is None:
+        return jsonify({'error': 'Công việc không tồn tại hoặc đã hết hạn'}), 404
+    
+    if job.status in ('done', 'failed'):
+        result = dict(job.result)
+        result['job'] = job.to_dict()
+        return jsonify(result), job.status_code
+    if job.status == 'cancelled':
+        return jsonify({'error': 'Công việc đã bị hủy', 'job': job.to_dict()}), 410
+    return jsonify({'success': True, **job.to_dict()}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Hủy một công việc đang chờ hoặc đang chạy (kết quả của công việc đang chạy sẽ bị bỏ đi)"""
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Công việc không tồn tại hoặc đã hết hạn'}), 404
+    return jsonify({'success': True, **job.to_dict()})
+
+@app.route('/api/crops/<crop_id>', methods=['GET'])
+def get_crop(crop_id):
+    """Trả về ảnh cắt đã lưu của một kết quả ở định dạng slim"""
+    data = crop_store.get(crop_id)
+    if data is None:
+        abort(404)
+    
+    # Nội dung của một id không bao giờ thay đổi nên trình duyệt có thể cache đến khi hết hạn
+    response = Response(data, mimetype='image/jpeg')
+    response.headers['Cache-Control'] = f"private, max-age={int(app.config['CROP_STORE_TTL'])}, immutable"
+    response.set_etag(crop_id)
+    return response.make_conditional(request)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Xuất thời gian từng bước, bộ đếm và thời gian tải mô hình theo định dạng Prometheus"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.before_request
+def start_request():
+    """Bắt đầu đo thời gian và gán request ID (lấy từ header X-Request-ID nếu client gửi)"""
+    g.request_started = time.perf_counter()
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    request_id_var.set(g.request_id)
+
+@app.after_request
+def record_request_time(response):
+    """Ghi tổng thời gian của các request API vào histogram theo endpoint"""
+    started = g.get('request_started')
+    if started is not None and request.path.startswith('/api/'):
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                endpoint=request.url_rule.rule if request.url_rule else 'unknown',
+                                status=response.status_code)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Nén phản hồi JSON bằng brotli hoặc gzip nếu client hỗ trợ"""
+    if (response.mimetype != 'application/json' or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.status_code < 200):
+        return response
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    
+    accept_encodings = request.accept_encodings
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        response.set_data(brotli.compress(data, quality=app.config['COMPRESS_LEVEL']))
+        response.headers['Content-Encoding'] = 'br'
+    elif accept_encodings.quality('gzip') > 0:
+        response.set_data(gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL']))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    response.vary.add('Accept-Encoding')
+    return response
+
+# /api/food-info đã tuần tự hóa (và nén) sẵn cho phiên bản menu hiện hành
+_food_info_cache = None
+_food_info_lock = threading.Lock()
+
+class FoodInfoPayload:
+    __slots__ = ('version', 'etag', 'bodies')
+
+    def __init__(self, menu):
+        """
+        Nội dung /api/food-info của một phiên bản menu, kể cả phân loại món
+
+        Phân loại và JSON chỉ được tính một lần mỗi khi menu được tải; các bản nén gzip/br
+        cũng được tạo sẵn để mỗi request chỉ còn việc chọn bytes theo Accept-Encoding.
+        """
+        food_info = []
+        for item in menu.menu_items():
+            food_info.append({
+                'name': item['item'],
+                'calories': item['calories'],
+                'price': item['price'],
+                'category': get_food_category(item['item'])
+            })
+        body = json.dumps({'success': True, 'food_info': food_info, 'menu_version': menu.version},
+                          ensure_ascii=False).encode('utf-8')
+        
+        self.version = menu.version
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=11)
+
+def food_info_payload(menu):
+    """Trả về FoodInfoPayload của snapshot menu, chỉ dựng lại khi phiên bản menu đổi"""
+    global _food_info_cache
+    payload = _food_info_cache
+    if payload is not None and payload.version == menu.version:
+        return payload
+    with _food_info_lock:
+        if _food_info_cache is None or _food_info_cache.version != menu.version:
+            _food_info_cache = FoodInfoPayload(menu)
+        return _food_info_cache
+
+@app.route('/api/food-info', methods=['GET'])
+def get_food_info():
+    """
+    Trả về thông tin về các món ăn có sẵn
+    
+    Phản hồi có ETag theo nội dung; client gửi lại If-None-Match sẽ nhận 304 cho đến
+    khi menu thay đổi.
+    """
+    try:
+        if not models_ready.is_set():
+            initialize_models()
+        
+        payload = food_info_payload(billing.snapshot)
+        
+        accept_encodings = request.accept_encodings
+        if 'br' in payload.bodies and accept_encodings.quality('br') > 0:
+            encoding = 'br'
+        elif accept_encodings.quality('gzip') > 0:
+            encoding = 'gzip'
+        else:
+            encoding = 'identity'
+        
+        response = Response(payload.bodies[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        # Mỗi bản nén là một biểu diễn khác nên có ETag riêng
+        response.set_etag(payload.etag if encoding == 'identity' else f"{payload.etag}-{encoding}")
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/update-food-item', methods=['POST'])
+def update_food_item():
+    """
+    Cập nhật phân loại món ăn và tính lại hóa đơn
+    
+    Nhận {session_id, itemIndex, newFoodItem}: món trong phiên hóa đơn do /api/analyze
+    tạo được thay tại chỗ và tổng được cập nhật theo chênh lệch. Client cũ vẫn có thể
+    gửi cả hóa đơn trong billData thay cho session_id.
+    """
+    try:
+        # Lấy dữ liệu request
+        data = request.json
+        if not data or 'itemIndex' not in data or 'newFoodItem' not in data:
+            return jsonify({'error': 'Thiếu dữ liệu cần thiết'}), 400
+            
+        item_index = data['itemIndex']
+        new_food_item = data['newFoodItem']
+        bill_data = data.get('billData', {})
+        
+        # Nếu chưa khởi tạo hệ thống tính tiền, khởi tạo nó
+        if not models_ready.is_set():
+            initialize_models()
+        
+        # Tra cứu thông tin món ăn mới trong chỉ mục menu
+        menu = billing.snapshot
+        matching_item = menu.lookup(new_food_item)
+        
+        if not matching_item:
+            return jsonify({'error': f'Không tìm thấy món {new_food_item} trong menu'}), 404
+        
+        new_item = {
+            'name': new_food_item,
+            'price': matching_item['price'],
+            'calories': matching_item['calories']
+        }
+        
+        if 'session_id' in data:
+            session = bill_sessions.get(data['session_id'])
+            if session is None:
+                return jsonify({'error': 'Phiên hóa đơn không tồn tại hoặc đã hết hạn'}), 404
+            try:
+                old_item = session.replace(int(item_index), new_food_item,
+                                           matching_item['price'], matching_item['calories'])
+            except (IndexError, TypeError, ValueError):
+                return jsonify({'error': f'Vị trí món không hợp lệ: {item_index}'}), 400
+            
+            return jsonify({
+                'success': True,
+                'session_id': session.id,
+                'item_index': int(item_index),
+                **session.totals(),
+                'menu_version': menu.version,
+                'old_item': old_item,
+                'new_item': new_item
+            })
+            
+        # Tính lại hóa đơn với món ăn đã cập nhật
+        # Nếu bill_data được cung cấp, sử dụng nó để cập nhật món cụ thể
+        if bill_data and 'bill_details' in bill_data and item_index < len(bill_data['bill_details']):
+            # Lưu thông tin cũ để tham khảo
+            old_item = bill_data['bill_details'][item_index]['item']
+            old_price = bill_data['bill_details'][item_index]['price']
+            old_calories = bill_data['bill_details'][item_index]['calories']
+            
+            # Cập nhật món ăn
+            bill_data['bill_details'][item_index]['item'] = new_food_item
+            bill_data['bill_details'][item_index]['price'] = matching_item['price']
+            bill_data['bill_details'][item_index]['calories'] = matching_item['calories']
+            
+            # Tính lại tổng
+            total_cost = sum(item['price'] for item in bill_data['bill_details'])
+            total_calories = sum(item['calories'] for item in bill_data['bill_details'])
+            
+            # Cập nhật tổng
+            bill_data['total_cost'] = total_cost
+            bill_data['total_calories'] = total_calories
+            
+            return jsonify({
+                'success': True, 
+                'updated_bill': bill_data,
+                'menu_version': menu.version,
+                'old_item': {
+                    'name': old_item,
+                    'price': old_price,
+                    'calories': old_calories
+                },
+                'new_item': new_item
+            })
+        else:
+            # Trả về chỉ thông tin món ăn mới nếu không cung cấp bill_data
+            return jsonify({
+                'success': True,
+                'menu_version': menu.version,
+                'new_item': new_item
+            })
+            
+    except Exception as e:
+        logger.exception("Lỗi cập nhật món ăn: %s", e)
+        return jsonify({'error': f'Lỗi cập nhật món ăn: {str(e)}'}), 500
+
+@app.route('/api/orders', methods=['POST'])
+def complete_order():
+    """
+    Hoàn tất một đơn hàng
+    
+    Nhận JSON {items: [tên món, ...], student_id}. Giá và calo được tính lại từ menu hiện
+    tại, đơn được đưa vào hàng đợi ghi và trả về ngay (202) mà không chờ ghi xuống đĩa.
+    Món không có trong menu bị từ chối (400) thay vì được tính giá mặc định và ghi vào
+    lịch sử đơn hàng và bảng tổng hợp.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('items'), list) or not data['items']:
+        return jsonify({'error': 'Thiếu danh sách món ăn'}), 400
+    error_response = require_models()
+    if error_response is not None:
+        return error_response
+    
+    menu = billing.snapshot
+    items = [str(item) for item in data['items']]
+    unknown = sorted({item for item in items if item not in menu.index})
+    if unknown:
+        return jsonify({'error': f"Món không có trong menu: {', '.join(unknown)}", 'unknown_items': unknown}), 400
+    bill_details, total_cost, total_calories = menu.calculate_bill(items)
+    student_id = data.get('student_id')
+    order = init_orders().submit(bill_details, total_cost, total_calories,
+                                 student_id=str(student_id) if student_id else None,
+                                 menu_version=menu.version)
+    if order is None:
+        return jsonify({'error': 'Hàng đợi lưu đơn hàng đã đầy. Vui lòng thử lại sau.'}), 503
+    return jsonify({'success': True, 'status': 'queued', 'order_id': order['id'], 'order': order}), 202
+
+@app.route('/api/orders', methods=['GET'])
+def list_orders():
+    """
+    Lịch sử đơn hàng, mới nhất trước
+    
+    Tham số: student_id, since (epoch giây), limit và cursor (next_cursor của trang trước).
+    """
+    try:
+        since = float(request.args['since']) if request.args.get('since') else None
+        limit = min(max(int(request.args.get('limit', app.config['ORDERS_PAGE_SIZE'])), 1), 500)
+        page, next_cursor = init_orders().history(
+            student_id=request.args.get('student_id') or None,
+            since=since,
+            cursor=request.args.get('cursor') or None,
+            limit=limit
+        )
+    except ValueError:
+        return jsonify({'error': 'Tham số không hợp lệ'}), 400
+    return jsonify({'success': True, 'orders': page, 'next_cursor': next_cursor})
+
+@app.route('/api/orders/<order_id>', methods=['GET'])
+def get_order(order_id):
+    """Chi tiết một đơn hàng (404 cho đến khi đơn được ghi xuống)"""
+    order = init_orders().get(order_id)
+    if order is None:
+        return jsonify({'error': 'Đơn hàng không tồn tại'}), 404
+    return jsonify({'success': True, 'order': order})
+
+@app.route('/api/analytics/sales', methods=['GET'])
+def get_sales_analytics():
+    """
+    Số lượng, doanh thu và calo theo món trong từng ngày hoặc từng giờ (từ bảng tổng hợp)
+    
+    Tham số: granularity ('day' hoặc 'hour'), since và until (epoch giây), item.
+    """
+    init_orders()
+    try:
+        buckets = rollups.dish_sales(
+            since=float(request.args['since']) if request.args.get('since') else None,
+            until=float(request.args['until']) if request.args.get('until') else None,
+            granularity=request.args.get('granularity', 'day'),
+            item=request.args.get('item') or None
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Tham số không hợp lệ: {str(e)}'}), 400
+    return jsonify({'success': True, 'sales': buckets})
+
+@app.route('/api/analytics/calories', methods=['GET'])
+def get_calorie_analytics():
+    """
+    Tổng calo theo ngày của một sinh viên (từ bảng tổng hợp)
+    
+    Tham số: student_id, since và until (ngày YYYY-MM-DD).
+    """
+    init_orders()
+    days = rollups.daily_calories(
+        student_id=request.args.get('student_id') or None,
+        since=request.args.get('since') or None,
+        until=request.args.get('until') or None
+    )
+    return jsonify({'success': True, 'days': days})
+
+def check_admin_token():
+    """
+    Trả về phản hồi lỗi nếu request không có đúng MODEL_ADMIN_TOKEN
+
+    Đăng ký một file mô hình tùy ý tương đương chạy mã (ví dụ lớp Lambda của Keras), nên
+    khi chưa cấu hình token các API quản trị mô hình luôn bị từ chối.
+    """
+    token = app.config['MODEL_ADMIN_TOKEN']
+    if not token:
+        return jsonify({'error': 'API quản trị mô hình bị tắt (chưa đặt MODEL_ADMIN_TOKEN)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({'error': 'Không có quyền quản trị mô hình'}), 403
+    return None
+
+@app.route('/api/models', methods=['GET'])
+def get_models():
+    """Phiên bản mô hình đang phục vụ, phiên bản trước đó (để quay lui), trạng thái tải và manifest"""
+    return jsonify({'success': True, **models.status()})
+
+@app.route('/api/models', methods=['POST'])
+def register_model():
+    """
+    Đăng ký một phiên bản mô hình và chuyển sang phiên bản đó
+    
+    Nhận JSON {version, yolo_model_path, cnn_model_path, cnn_backend, class_names_path, activate}.
+    Phiên bản mới được tải, warm-up và kiểm tra trong nền (mỗi worker một lần) rồi mới
+    thay phiên bản đang phục vụ; nếu không đạt, phiên bản hiện tại được giữ nguyên.
+    """
+    error_response = check_admin_token()
+    if error_response is not None:
+        return error_response
+    data = request.get_json(silent=True)
+    if not data or not data.get('version'):
+        return jsonify({'error': 'Thiếu tên phiên bản'}), 400
+    
+    try:
+        models.register(str(data['version']), data, activate=data.get('activate', True))
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({'error': str(e)}), 400
+    models.sync()
+    return jsonify({'success': True, **models.status()}), 202
+
+@app.route('/api/models/activate', methods=['POST'])
+def activate_model():
+    """Chuyển sang một phiên bản đã đăng ký: {version}"""
+    error_response = check_admin_token()
+    if error_response is not None:
+        return error_response
+    data = request.get_json(silent=True)
+    if not data or not data.get('version'):
+        return jsonify({'error': 'Thiếu tên phiên bản'}), 400
+    
+    try:
+        models.set_active(str(data['version']))
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    models.sync()
+    return jsonify({'success': True, **models.status()}), 202
+
+@app.route('/api/models/rollback', methods=['POST'])
+def rollback_model():
+    """Quay lại ngay phiên bản mô hình trước đó (các worker khác chuyển theo manifest)"""
+    error_response = check_admin_token()
+    if error_response is not None:
+        return error_response
+    previous = models.previous
+    if previous is None:
+        return jsonify({'error': 'Không có phiên bản trước để quay lại'}), 409
+    
+    # Chỉ đổi manifest rồi đồng bộ: sync() và luồng theo dõi cùng quay lui theo phiên bản
+    # đích nên không thể chuyển ngược về phiên bản vừa bỏ
+    models.set_active(previous.version)
+    models.sync()
+    return jsonify({'success': True, **models.status()})
+
+@app.route('/api/inference-stats', methods=['GET'])
+def get_inference_stats():
+    """Trả về độ sâu hàng đợi, histogram kích thước lô và thời gian chờ của bộ lập lịch suy luận"""
+    bundle = models.active
+    if bundle is None or bundle.scheduler is None:
+        return jsonify({'success': True, 'ready': False})
+    stats = bundle.scheduler.stats()
+    stats['model_version'] = bundle.version
+    if models.cache is not None:
+        stats['classify_cache'] = models.cache.stats()
+    stats['jobs'] = jobs.stats()
+    stats['bill_sessions'] = bill_sessions.stats()
+    stats['orders'] = orders.stats() if orders is not None else None
+    return jsonify({'success': True, 'ready': True, 'stats': stats})
+
+def get_food_category(item_name):
+    """Hàm đơn giản để phân loại các món ăn"""
+    item_name = item_name.lower()
+    
+    # Phân loại dựa trên các loại thực phẩm Việt Nam phổ biến
+    if any(x in item_name for x in ['com', 'bun', 'pho', 'banh']):
+        return 'Carbohydrates'
+    elif any(x in item_name for x in ['thit', 'ga', 'bo', 'ca chien', 'ca kho', 'trung', 'tom', 'suon', 'kho tieu', 'dau hu']):
+        return 'Protein'
+    elif any(x in item_name for x in ['rau', 'dau', 'bap cai', 'cai', 'dua leo', 'ot', 'ca chua', 'kho qua']):
+        return 'Vegetable'
+    elif any(x in item_name for x in ['canh', 'ca chua', 'ca rot']):
+        return 'Soup'
+    else:
+        return 'Other'
+
+if __name__ == '__main__':
+    # Khởi tạo mô hình khi khởi động
+    initialize_models()
+    # Chạy ứng dụng Flask (tắt reloader để mô hình không bị tải lại trong tiến trình con)
+    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger('serve')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Chạy máy chủ production: tải mô hình một lần rồi fork nhiều worker")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Số tiến trình worker (mặc định: số lõi CPU)")
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help="Số luồng TF/torch/OpenCV cho mỗi worker (mặc định: số lõi / số worker)")
+    parser.add_argument('--no-affinity', action='store_true',
+                        help="Không gắn mỗi worker vào một nhóm lõi CPU riêng")
+    return parser.parse_args()
+
+def set_thread_env(threads):
+    """
+    Đặt ngân sách luồng qua biến môi trường trước khi import TensorFlow/torch
+
+    Các thư viện này đọc biến môi trường khi khởi tạo nên phải đặt trước khi import app.
+    """
+    value = str(threads)
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ.setdefault(name, value)
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+    os.environ.setdefault('CNN_NUM_THREADS', value)
+
+def worker_cpus(index, workers, threads):
+    """Chia các lõi CPU được phép dùng thành các nhóm liên tiếp, mỗi worker một nhóm"""
+    cpus = sorted(os.sched_getaffinity(0))
+    if workers > len(cpus):
+        return [cpus[index % len(cpus)]]
+    start = (index * len(cpus)) // workers
+    return cpus[start:start + max(1, threads)]
+
+def configure_worker(index, args, threads):
+    """Thiết lập ngân sách luồng và CPU affinity của worker ngay sau khi fork"""
+    import cv2
+    cv2.setNumThreads(threads)
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(threads)
+
+    if not args.no_affinity and hasattr(os, 'sched_setaffinity'):
+        cpus = worker_cpus(index, args.workers, threads)
+        os.sched_setaffinity(0, cpus)
+        logger.info("[worker %d] pid %d dùng CPU %s, %d luồng", index, os.getpid(), cpus, threads)
+    else:
+        logger.info("[worker %d] pid %d dùng %d luồng", index, os.getpid(), threads)
+
+def run_worker(index, args, threads, sock):
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    configure_worker(index, args, threads)
+    # Warm-up và bộ lập lịch (có luồng nền) phải được tạo sau khi fork
+    app_module.initialize_models()
+
+    server = make_server(args.host, args.port, app_module.app, threaded=True, fd=sock.fileno())
+    # shutdown() chờ serve_forever() kết thúc nên phải gọi từ luồng khác
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    server.serve_forever()
+    # os._exit() bỏ qua atexit: ghi nốt (hoặc ghi tạm ra file spill) các đơn hàng còn lại trước khi thoát
+    if app_module.orders is not None:
+        app_module.orders.close()
+
+def main():
+    args = parse_args()
+    if not hasattr(os, 'fork'):
+        sys.exit("serve.py cần os.fork (Linux/macOS); trên Windows hãy dùng web_server.py")
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    threads = args.threads_per_worker or max(1, cores // args.workers)
+    set_thread_env(threads)
+
+    import app as app_module
+
+    # Master chỉ tạo mô hình, không chạy suy luận nào: thread pool của runtime không
+    # tồn tại qua fork, còn trọng số đã tải được các worker dùng chung (copy-on-write).
+    # Keras/torch khởi tạo runtime không an toàn khi fork nên khi đó mỗi worker tự tải.
+    if app_module.models.fork_safe():
+        logger.info("Đang tải mô hình trong tiến trình master (pid %d)...", os.getpid())
+        app_module.load_models()
+    else:
+        logger.info("Backend mô hình không an toàn khi fork, mỗi worker sẽ tự tải mô hình")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+    logger.info("Đang lắng nghe trên %s:%d với %d worker", args.host, args.port, args.workers)
+
+    children = {}
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            # Worker khởi động lại sẽ kế thừa handler của master; trả về mặc định để SIGTERM
+            # nhận được trong lúc warm-up dừng chính worker thay vì dừng các worker khác
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            try:
+                run_worker(index, args, threads, sock)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    for index in range(args.workers):
+        spawn(index)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Giám sát các worker: khởi động lại worker bị chết cho đến khi nhận tín hiệu dừng
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            logger.warning("[worker %d] pid %d đã dừng (status %d), đang khởi động lại", index, pid, status)
+            time.sleep(1)
+            spawn(index)
+
+    sock.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.preprocess import BatchPreprocessor
+
+DATA_DIR = "data/classification_dataset_augmented"
+
+def legacy_preprocess(images):
+    """Tiền xử lý theo cách cũ: cvtColor, resize, astype/255, expand_dims cho từng ảnh rồi ghép lô"""
+    batch = []
+    for img in images:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img = cv2.resize(img, (224, 224))
+        img = img.astype(np.float32) / 255.0
+        img = np.expand_dims(img, axis=0)
+        batch.append(img)
+    return np.concatenate(batch)
+
+def measure(fn, trays, repeats):
+    """
+    Đo thời gian và bộ nhớ cấp phát cho mỗi ảnh cắt
+
+    Bộ nhớ được đo bằng đỉnh tracemalloc trong mỗi lần gọi (NumPy báo cáo bộ nhớ dữ
+    liệu mảng cho tracemalloc), tức là lượng cấp phát tạm thời mà mỗi khay gây ra.
+
+    Returns:
+        dict: thời gian trung bình (µs) và số byte cấp phát đỉnh trên mỗi ảnh
+    """
+    crops = sum(len(t) for t in trays)
+    for tray in trays:
+        fn(tray)  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for tray in trays:
+            fn(tray)
+    elapsed = time.perf_counter() - start
+
+    peak = 0
+    for tray in trays:
+        tracemalloc.start()
+        fn(tray)
+        peak += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'us_per_crop': elapsed / (repeats * crops) * 1e6,
+        'bytes_per_crop': peak / crops,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark tiền xử lý ảnh cắt cho CNN")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--trays', type=int, default=20)
+    parser.add_argument('--crops-per-tray', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, 'train', '*', '*.jpg')))
+    needed = args.trays * args.crops_per_tray
+    images = [cv2.imread(p) for p in paths[::max(1, len(paths) // needed)][:needed]]
+    images = [img for img in images if img is not None]
+    trays = [images[i:i + args.crops_per_tray] for i in range(0, len(images), args.crops_per_tray)]
+    print(f"{len(images)} ảnh cắt, {len(trays)} khay")
+
+    preprocessor = BatchPreprocessor((224, 224), color_order='bgr', max_batch_size=args.crops_per_tray)
+    candidates = [('legacy', legacy_preprocess), ('buffered', preprocessor)]
+
+    # Kiểm tra hai cách cho cùng kết quả
+    diff = np.abs(legacy_preprocess(trays[0]) - preprocessor(trays[0])).max()
+    print(f"Chênh lệch lớn nhất giữa hai cách: {diff:.2e}")
+
+    print(f"\n{'cách':<10} {'µs/ảnh':>10} {'KB cấp phát/ảnh':>16}")
+    for name, fn in candidates:
+        r = measure(fn, trays, args.repeats)
+        print(f"{name:<10} {r['us_per_crop']:>10.1f} {r['bytes_per_crop'] / 1024:>16.1f}")
+
+if __name__ == "__main__":
+    main()
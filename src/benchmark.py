@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import glob
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+
+# Benchmark luôn chạy trên CPU
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.export_yolo import sample_trays
+
+DATA_DIR = "data/classification_dataset_augmented"
+YOLO_MODEL_PATH = "yolov8n.pt"
+RESULTS_PATH = "models/benchmark_results.json"
+BASELINE_PATH = "models/benchmark_baseline.json"
+
+def current_rss():
+    """RSS hiện tại của tiến trình (byte), None nếu hệ điều hành không hỗ trợ /proc"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class RssSampler:
+    def __init__(self, interval=0.005):
+        """
+        Lấy mẫu RSS trong một luồng nền để ghi nhận RSS đỉnh của từng bước
+
+        Trên hệ thống không có /proc, dùng ru_maxrss (đỉnh của cả tiến trình).
+        """
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            rss = current_rss()
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss() or 0
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        if current_rss() is None:
+            import resource
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+def run_stage(fn, inputs, repeats, warmup=1):
+    """
+    Chạy fn trên từng đầu vào, đo độ trễ từng lần gọi, thông lượng và RSS đỉnh
+
+    Returns:
+        dict: calls, throughput (lần gọi/giây), p50/p95/p99/mean (ms), peak_rss_mb
+    """
+    for item in inputs[:warmup]:
+        fn(item)
+
+    latencies = []
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for item in inputs:
+                t0 = time.perf_counter()
+                fn(item)
+                latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies) * 1000.0
+    return {
+        'calls': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'peak_rss_mb': sampler.peak / (1024 * 1024),
+    }
+
+def sample_crops(data_dir, count, seed=0):
+    """Lấy ngẫu nhiên ảnh món ăn (đã là ảnh cắt) từ data_dir/train"""
+    paths = sorted(glob.glob(os.path.join(data_dir, 'train', '*', '*.jpg')))
+    rng = random.Random(seed)
+    paths = rng.sample(paths, min(count, len(paths)))
+    return [img for img in (cv2.imread(p) for p in paths) if img is not None]
+
+def parse_backend(spec):
+    """'tflite:models/cnn_int8.tflite' -> ('tflite', 'models/cnn_int8.tflite'); 'keras' -> ('keras', None)"""
+    backend, _, path = spec.partition(':')
+    return backend, path or None
+
+def bench_detector(model_path, trays, repeats, results):
+    from src.detect import FoodDetector
+
+    detector = FoodDetector(model_path=model_path)
+    name = os.path.basename(model_path.rstrip('/\\'))
+    results[f'detect_crops/{name}'] = run_stage(detector.detect_crops, trays, repeats)
+
+    # Đường dẫn cũ: đọc file, phát hiện, ghi ảnh cắt ra thư mục tạm
+    tray_dir = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i, tray in enumerate(trays):
+            paths.append(os.path.join(tray_dir, f'tray_{i}.jpg'))
+            cv2.imwrite(paths[-1], tray)
+
+        def detect_and_crop(path):
+            cropped_paths, _, _ = detector.detect_and_crop(path)
+            if cropped_paths:
+                shutil.rmtree(os.path.dirname(cropped_paths[0]), ignore_errors=True)
+
+        results[f'detect_and_crop/{name}'] = run_stage(detect_and_crop, paths, repeats)
+    finally:
+        shutil.rmtree(tray_dir, ignore_errors=True)
+
+def bench_classifier(spec, crops, tray_sizes, repeats, results):
+    from src.classify import FoodClassifier
+
+    backend, path = parse_backend(spec)
+    classifier = FoodClassifier(model_path=path, backend=backend)
+    name = f"{backend}:{os.path.basename(classifier.model_path)}"
+    results[f'classify/{name}'] = run_stage(classifier.classify, crops, repeats)
+
+    batches, start = [], 0
+    for size in tray_sizes:
+        batches.append(crops[start:start + size])
+        start = (start + size) % max(1, len(crops) - size)
+    results[f'classify_batch/{name}'] = run_stage(classifier.classify_batch, batches, repeats)
+
+def bench_billing(trays_items, repeats, results):
+    from src.billing import BillingSystem
+
+    billing = BillingSystem()
+    results['calculate_bill'] = run_stage(billing.calculate_bill, trays_items, repeats)
+    # Cả lô khay trong một lần tra cứu
+    results['calculate_bills'] = run_stage(billing.calculate_bills, [trays_items], repeats)
+
+def bench_analyze(trays, repeats, results):
+    import app as app_module
+
+    app_module.initialize_models()
+    client = app_module.app.test_client()
+    payloads = [cv2.imencode('.jpg', tray, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes() for tray in trays]
+
+    def analyze(payload):
+        response = client.post('/api/analyze', data=payload, content_type='image/jpeg')
+        if response.status_code >= 500:
+            raise RuntimeError(f"/api/analyze trả về {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    name = f"{app_module.app.config['CNN_BACKEND']}"
+    results[f'analyze/{name}'] = run_stage(analyze, payloads, repeats)
+
+def check_regressions(results, baseline, max_regression):
+    """
+    So sánh với baseline: một bước bị coi là chậm đi nếu p95 tăng hoặc thông lượng giảm
+    quá max_regression (tỉ lệ)
+
+    Returns:
+        list: Các mô tả bước bị chậm đi
+    """
+    failures = []
+    for key, base in baseline.get('results', {}).items():
+        current = results.get(key)
+        if current is None:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + max_regression):
+            failures.append(f"{key}: p95 {current['p95_ms']:.2f} ms > baseline {base['p95_ms']:.2f} ms")
+        if current['throughput'] < base['throughput'] / (1 + max_regression):
+            failures.append(f"{key}: thông lượng {current['throughput']:.2f}/s < baseline {base['throughput']:.2f}/s")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark đầu-cuối (CPU, offline) cho YOLO, CNN, tính hóa đơn và /api/analyze")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--stages', nargs='+', default=['detect', 'classify', 'bill', 'analyze'],
+                        choices=['detect', 'classify', 'bill', 'analyze'])
+    parser.add_argument('--yolo-models', nargs='+', default=[YOLO_MODEL_PATH],
+                        help="Các mô hình YOLO cần so sánh (.pt, .onnx, *_openvino_model)")
+    parser.add_argument('--cnn-backends', nargs='+', default=['keras'],
+                        help="Các backend CNN dạng backend[:đường dẫn], ví dụ tflite:models/cnn_int8.tflite")
+    parser.add_argument('--trays', type=int, default=10)
+    parser.add_argument('--crops', type=int, default=64)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--max-regression', type=float, default=0.15,
+                        help="Mức chậm đi tối đa chấp nhận được so với baseline (tỉ lệ)")
+    parser.add_argument('--save-baseline', action='store_true', help="Ghi kết quả lần chạy này làm baseline")
+    args = parser.parse_args()
+
+    for model_path in args.yolo_models:
+        if 'detect' in args.stages and not os.path.exists(model_path):
+            sys.exit(f"Không tìm thấy {model_path}; benchmark chạy offline nên không tự tải mô hình")
+
+    rng = random.Random(args.seed)
+    trays = sample_trays(args.data_dir, args.trays, seed=args.seed)
+    crops = sample_crops(args.data_dir, args.crops, seed=args.seed)
+    tray_sizes = [rng.randint(4, 8) for _ in range(args.trays)]
+    print(f"{len(trays)} khay tổng hợp, {len(crops)} ảnh cắt")
+
+    results = {}
+    if 'detect' in args.stages:
+        for model_path in args.yolo_models:
+            bench_detector(model_path, trays, args.repeats, results)
+    if 'classify' in args.stages:
+        for spec in args.cnn_backends:
+            bench_classifier(spec, crops, tray_sizes, args.repeats, results)
+    if 'bill' in args.stages:
+        classes = sorted(os.listdir(os.path.join(args.data_dir, 'train')))
+        trays_items = [[rng.choice(classes) for _ in range(size)] for size in tray_sizes]
+        bench_billing(trays_items, args.repeats, results)
+    if 'analyze' in args.stages:
+        bench_analyze(trays, args.repeats, results)
+
+    print(f"\n{'bước':<40} {'lần/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for key, r in results.items():
+        print(f"{key:<40} {r['throughput']:>8.2f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['peak_rss_mb']:>8.1f}")
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': vars(args),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Đã lưu kết quả tại {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Đã lưu baseline tại {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            failures = check_regressions(results, json.load(f), args.max_regression)
+        if failures:
+            print(f"\nCác bước chậm đi quá {args.max_regression:.0%} so với baseline:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"\nKhông có bước nào chậm đi quá {args.max_regression:.0%} so với baseline")
+
+if __name__ == "__main__":
+    main()
@@ -1,163 +1,348 @@
-import pandas as pd
-import numpy as np
-import os
-
-class BillingSystem:
-    def __init__(self, menu_path=None):
-        """
-        Khởi tạo hệ thống tính tiền dựa trên CSV menu
-        
-        Args:
-            menu_path (str, optional): Đường dẫn đến file CSV menu. Nếu None, sử dụng vị trí mặc định.
-        """
-        # Nếu không chỉ định path cụ thể, tìm kiếm menu_info.csv ở các vị trí thông dụng
-        if menu_path is None:
-            potential_paths = [
-                'menu_info.csv',
-                os.path.join(os.path.dirname(__file__), 'menu_info.csv'),
-                os.path.join(os.path.dirname(__file__), '..', 'menu_info.csv'),
-                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'menu_info.csv'),
-                os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'menu_info.csv')
-            ]
-            
-            for path in potential_paths:
-                if os.path.exists(path):
-                    menu_path = path
-                    break
-            
-            if menu_path is None:
-                # Nếu không tìm thấy file, tạo một menu mặc định
-                print("CẢNH BÁO: Không tìm thấy file menu_info.csv. Sử dụng menu mặc định.")
-                self.menu = self._create_default_menu()
-            else:
-                print(f"Đang tải menu từ: {menu_path}")
-                self.menu = pd.read_csv(menu_path)
-        else:
-            # Sử dụng đường dẫn đã cung cấp
-            if os.path.exists(menu_path):
-                self.menu = pd.read_csv(menu_path)
-            else:
-                print(f"CẢNH BÁO: Không tìm thấy file menu tại {menu_path}. Sử dụng menu mặc định.")
-                self.menu = self._create_default_menu()
-        
-        # Đảm bảo các thông tin cần thiết có trong menu
-        required_columns = ['item', 'price', 'calories']
-        if not all(col in self.menu.columns for col in required_columns):
-            missing_cols = [col for col in required_columns if col not in self.menu.columns]
-            print(f"CẢNH BÁO: Thiếu các cột trong menu: {missing_cols}. Sử dụng menu mặc định.")
-            self.menu = self._create_default_menu()
-    
-    def _create_default_menu(self):
-        """
-        Tạo menu mặc định với giá và calo cho các món ăn phổ biến
-        
-        Returns:
-            pandas.DataFrame: Menu mặc định
-        """
-        # Danh sách món ăn phổ biến với giá và calo tương ứng
-        default_items = [
-            {'item': 'banh mi', 'price': 15000, 'calories': 350},
-            {'item': 'bap cai luoc', 'price': 5000, 'calories': 30},
-            {'item': 'bap cai xao', 'price': 8000, 'calories': 60},
-            {'item': 'bo xao', 'price': 25000, 'calories': 250},
-            {'item': 'ca chien', 'price': 20000, 'calories': 200},
-            {'item': 'ca chua', 'price': 5000, 'calories': 20},
-            {'item': 'ca kho', 'price': 18000, 'calories': 180},
-            {'item': 'ca rot', 'price': 5000, 'calories': 25},
-            {'item': 'canh bau', 'price': 10000, 'calories': 40},
-            {'item': 'canh bi do', 'price': 10000, 'calories': 45},
-            {'item': 'canh cai', 'price': 10000, 'calories': 35},
-            {'item': 'canh chua', 'price': 12000, 'calories': 60},
-            {'item': 'canh rong bien', 'price': 12000, 'calories': 30},
-            {'item': 'chuoi', 'price': 5000, 'calories': 90},
-            {'item': 'com', 'price': 10000, 'calories': 150},
-            {'item': 'dau bap', 'price': 7000, 'calories': 35},
-            {'item': 'dau hu', 'price': 8000, 'calories': 70},
-            {'item': 'dau que', 'price': 7000, 'calories': 30},
-            {'item': 'do chua', 'price': 5000, 'calories': 15},
-            {'item': 'dua hau', 'price': 8000, 'calories': 50},
-            {'item': 'dua leo', 'price': 5000, 'calories': 15},
-            {'item': 'ga chien', 'price': 22000, 'calories': 280},
-            {'item': 'ga kho', 'price': 20000, 'calories': 250},
-            {'item': 'kho qua', 'price': 8000, 'calories': 25},
-            {'item': 'kho tieu', 'price': 18000, 'calories': 200},
-            {'item': 'kho trung', 'price': 12000, 'calories': 150},
-            {'item': 'nuoc mam', 'price': 2000, 'calories': 10},
-            {'item': 'nuoc tuong', 'price': 2000, 'calories': 5},
-            {'item': 'oi', 'price': 8000, 'calories': 40},
-            {'item': 'ot', 'price': 2000, 'calories': 5},
-            {'item': 'rau', 'price': 5000, 'calories': 20},
-            {'item': 'rau muong', 'price': 8000, 'calories': 25},
-            {'item': 'rau ngo', 'price': 5000, 'calories': 15},
-            {'item': 'suon mieng', 'price': 25000, 'calories': 300},
-            {'item': 'suon xao', 'price': 25000, 'calories': 280},
-            {'item': 'thanh long', 'price': 10000, 'calories': 60},
-            {'item': 'thit chien', 'price': 22000, 'calories': 250},
-            {'item': 'thit luoc', 'price': 20000, 'calories': 180},
-            {'item': 'tom', 'price': 25000, 'calories': 120},
-            {'item': 'trung chien', 'price': 10000, 'calories': 120},
-            {'item': 'trung luoc', 'price': 8000, 'calories': 80},
-            # Thêm một món ăn "không xác định" để xử lý các trường hợp không nhận dạng được
-            {'item': 'unknown', 'price': 10000, 'calories': 100}
-        ]
-        
-        return pd.DataFrame(default_items)
-    
-    def calculate_bill(self, food_items):
-        """
-        Tính toán hóa đơn dựa trên danh sách các món ăn
-        
-        Args:
-            food_items (list): Danh sách các món ăn đã phát hiện
-            
-        Returns:
-            tuple: (chi tiết hóa đơn, tổng tiền, tổng calo)
-        """
-        bill_details = []
-        total_cost = 0
-        total_calories = 0
-        
-        try:
-            for item in food_items:
-                # Tìm món ăn trong menu
-                menu_item = self.menu[self.menu['item'] == item]
-                
-                if len(menu_item) > 0:
-                    # Lấy thông tin của món ăn đầu tiên tìm thấy
-                    price = menu_item.iloc[0]['price']
-                    calories = menu_item.iloc[0]['calories']
-                else:
-                    # Nếu không tìm thấy, sử dụng giá trị mặc định
-                    print(f"CẢNH BÁO: Không tìm thấy '{item}' trong menu. Sử dụng giá trị mặc định.")
-                    price = 10000  # Giá mặc định: 10,000 VND
-                    calories = 100  # Calo mặc định: 100 kcal
-                
-                # Thêm vào chi tiết hóa đơn
-                bill_details.append({
-                    'item': item,
-                    'price': price,
-                    'calories': calories
-                })
-                
-                # Cập nhật tổng
-                total_cost += price
-                total_calories += calories
-            
-            return bill_details, total_cost, total_calories
-            
-        except Exception as e:
-            print(f"Lỗi khi tính hóa đơn: {str(e)}")
-            return [], 0, 0
-
-if __name__ == "__main__":
-    # Demo
-    billing = BillingSystem()
-    food_items = ['com', 'ga chien', 'canh chua', 'dua leo', 'dau hu']
-    bill_details, total_cost, total_calories = billing.calculate_bill(food_items)
-    
-    print("Chi tiết hóa đơn:")
-    for item in bill_details:
-        print(f"{item['item']}: {item['price']} VND, {item['calories']} kcal")
-        
-    print(f"Tổng tiền: {total_cost} VND")
+import pandas as pd
+import numpy as np
+import io
+import os
+import time
+import hashlib
+import logging
+import threading
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+class MenuSnapshot:
+    # Giá và calo dùng cho món không có trong menu
+    default_price = 10000
+    default_calories = 100
+
+    def __init__(self, menu, version, source=None, mtime=None):
+        """
+        Một phiên bản bất biến của menu, đã biên dịch để tính hóa đơn
+        
+        Menu được biên dịch thành chỉ mục băm tên món -> vị trí và các mảng giá/calo liên
+        tiếp (chỉ đọc). Vị trí cuối cùng của mỗi mảng là giá trị mặc định cho món không có
+        trong menu, nên một khay được tra cứu bằng một phép lấy phần tử theo chỉ số.
+        
+        Args:
+            menu (pandas.DataFrame): Menu có các cột item, price, calories
+            version (str): Phiên bản menu (được ghi lên mỗi hóa đơn)
+            source (str, optional): File menu đã đọc
+            mtime (float, optional): Thời điểm sửa đổi của file menu
+        """
+        names = menu['item'].astype(str).tolist()
+        index = {}
+        for position, name in enumerate(names):
+            # Giữ dòng đầu tiên nếu tên món bị trùng
+            index.setdefault(name, position)
+        
+        self.version = version
+        self.source = source
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.items = tuple(names)
+        self.index = MappingProxyType(index)
+        # validate_menu chấp nhận cả chuỗi dạng số ("25000") nên phải chuyển sang kiểu số ở đây,
+        # nếu không mảng có dtype object chứa str
+        self.prices = np.append(pd.to_numeric(menu['price']).to_numpy(), self.default_price)
+        self.calories = np.append(pd.to_numeric(menu['calories']).to_numpy(), self.default_calories)
+        self.prices.setflags(write=False)
+        self.calories.setflags(write=False)
+        self._unknown = len(names)
+    
+    def _indices(self, food_items):
+        """Chuyển tên món thành vị trí trong mảng giá/calo (vị trí mặc định nếu không có trong menu)"""
+        indices = np.fromiter((self.index.get(item, self._unknown) for item in food_items),
+                              dtype=np.intp, count=len(food_items))
+        if np.any(indices == self._unknown):
+            unknown = sorted({item for item in food_items if item not in self.index})
+            logger.warning("Không tìm thấy %s trong menu. Sử dụng giá trị mặc định.", unknown)
+        return indices
+    
+    def lookup(self, item):
+        """
+        Tra cứu một món trong menu
+        
+        Returns:
+            dict: {'item', 'price', 'calories'} với số Python, hoặc None nếu không có trong menu
+        """
+        position = self.index.get(item)
+        if position is None:
+            return None
+        return {'item': item, 'price': self.prices[position].item(), 'calories': self.calories[position].item()}
+    
+    def menu_items(self):
+        """Danh sách các món trong menu dạng [{'item', 'price', 'calories'}, ...] với số Python"""
+        prices, calories = self.prices.tolist(), self.calories.tolist()
+        return [{'item': name, 'price': prices[i], 'calories': calories[i]}
+                for name, i in self.index.items()]
+    
+    def calculate_bill(self, food_items):
+        """
+        Tính toán hóa đơn dựa trên danh sách các món ăn
+        
+        Args:
+            food_items (list): Danh sách các món ăn đã phát hiện
+            
+        Returns:
+            tuple: (chi tiết hóa đơn, tổng tiền, tổng calo), các giá trị là số Python
+        """
+        try:
+            return self.calculate_bills([food_items])[0]
+        except Exception as e:
+            logger.exception("Lỗi khi tính hóa đơn: %s", e)
+            return [], 0, 0
+    
+    def calculate_bills(self, trays):
+        """
+        Tính hóa đơn cho nhiều khay bằng một lần tra cứu theo chỉ số
+        
+        Args:
+            trays (list): Danh sách các khay, mỗi khay là danh sách tên món
+            
+        Returns:
+            list: Mỗi phần tử là (chi tiết hóa đơn, tổng tiền, tổng calo) như calculate_bill
+        """
+        if len(trays) == 0:
+            return []
+        items = [item for tray in trays for item in tray]
+        indices = self._indices(items)
+        prices = self.prices[indices]
+        calories = self.calories[indices]
+        
+        # Tổng theo từng khay; khay rỗng có tổng bằng 0
+        sizes = np.fromiter((len(tray) for tray in trays), dtype=np.intp, count=len(trays))
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        nonempty = sizes > 0
+        total_costs = np.zeros(len(trays), dtype=prices.dtype)
+        total_calories = np.zeros(len(trays), dtype=calories.dtype)
+        if np.any(nonempty):
+            total_costs[nonempty] = np.add.reduceat(prices, starts[nonempty])
+            total_calories[nonempty] = np.add.reduceat(calories, starts[nonempty])
+        
+        prices, calories = prices.tolist(), calories.tolist()
+        total_costs, total_calories = total_costs.tolist(), total_calories.tolist()
+        bills = []
+        for t, (start, size) in enumerate(zip(starts.tolist(), sizes.tolist())):
+            bill_details = [
+                {'item': items[i], 'price': prices[i], 'calories': calories[i]}
+                for i in range(start, start + size)
+            ]
+            bills.append((bill_details, total_costs[t], total_calories[t]))
+        return bills
+
+def validate_menu(menu):
+    """
+    Kiểm tra menu trước khi dùng
+    
+    Raises:
+        ValueError: Nếu thiếu cột, menu rỗng, tên món trống hoặc giá/calo không phải số không âm
+    """
+    required_columns = ['item', 'price', 'calories']
+    missing_cols = [col for col in required_columns if col not in menu.columns]
+    if missing_cols:
+        raise ValueError(f"Thiếu các cột trong menu: {missing_cols}")
+    if len(menu) == 0:
+        raise ValueError("Menu rỗng")
+    if menu['item'].isna().any() or (menu['item'].astype(str).str.strip() == '').any():
+        raise ValueError("Menu có món không có tên")
+    for col in ('price', 'calories'):
+        values = pd.to_numeric(menu[col], errors='coerce')
+        if values.isna().any() or (values < 0).any():
+            raise ValueError(f"Cột {col} có giá trị không hợp lệ")
+
+class BillingSystem:
+    def __init__(self, menu_path=None):
+        """
+        Khởi tạo hệ thống tính tiền dựa trên CSV menu
+        
+        Menu hiện hành là một MenuSnapshot bất biến. Khi file menu thay đổi, reload()
+        đọc và kiểm tra file mới ngoài luồng xử lý request rồi thay snapshot bằng một phép
+        gán duy nhất, nên mỗi hóa đơn luôn được tính trên một bảng giá nhất quán.
+        
+        Args:
+            menu_path (str, optional): Đường dẫn đến file CSV menu. Nếu None, sử dụng vị trí mặc định.
+        """
+        # Nếu không chỉ định path cụ thể, tìm kiếm menu_info.csv ở các vị trí thông dụng
+        if menu_path is None:
+            potential_paths = [
+                'menu_info.csv',
+                os.path.join(os.path.dirname(__file__), 'menu_info.csv'),
+                os.path.join(os.path.dirname(__file__), '..', 'menu_info.csv'),
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'menu_info.csv'),
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'menu_info.csv')
+            ]
+            
+            for path in potential_paths:
+                if os.path.exists(path):
+                    menu_path = path
+                    break
+            
+            if menu_path is None:
+                # Nếu không tìm thấy file, tạo một menu mặc định
+                logger.warning("Không tìm thấy file menu_info.csv. Sử dụng menu mặc định.")
+        elif not os.path.exists(menu_path):
+            logger.warning("Không tìm thấy file menu tại %s. Sử dụng menu mặc định.", menu_path)
+        
+        self.menu_path = menu_path
+        self.snapshot = None
+        self._reload_lock = threading.Lock()
+        self._seen_mtime = None
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        
+        if menu_path is None or not self.reload():
+            self.snapshot = MenuSnapshot(self._create_default_menu(), version='default')
+    
+    @property
+    def menu(self):
+        """Menu hiện hành dạng DataFrame (chỉ dùng ngoài luồng xử lý request)"""
+        return pd.DataFrame(self.snapshot.menu_items(), columns=['item', 'price', 'calories'])
+    
+    @property
+    def version(self):
+        return self.snapshot.version
+    
+    def reload(self, force=False):
+        """
+        Đọc lại file menu nếu đã thay đổi và thay snapshot hiện hành
+        
+        Nếu file mới không hợp lệ, snapshot cũ được giữ nguyên.
+        
+        Args:
+            force (bool): Đọc lại kể cả khi thời điểm sửa đổi của file không đổi
+            
+        Returns:
+            bool: True nếu snapshot hiện hành khớp với file (đã thay hoặc file không đổi)
+        """
+        if self.menu_path is None:
+            return False
+        with self._reload_lock:
+            try:
+                mtime = os.path.getmtime(self.menu_path)
+            except OSError as e:
+                logger.debug("Không đọc được file menu %s: %s", self.menu_path, e)
+                return False
+            if not force and mtime == self._seen_mtime:
+                return self.snapshot is not None and self.snapshot.source == self.menu_path
+            # Ghi nhận ngay cả khi file lỗi để không phân tích lại cho đến lần sửa tiếp theo
+            self._seen_mtime = mtime
+            
+            try:
+                with open(self.menu_path, 'rb') as f:
+                    content = f.read()
+                # Phiên bản theo nội dung: các worker đọc cùng một file có cùng phiên bản
+                version = hashlib.sha1(content).hexdigest()[:12]
+                if self.snapshot is not None and self.snapshot.source == self.menu_path and self.snapshot.version == version:
+                    return True
+                
+                menu = pd.read_csv(io.BytesIO(content))
+                validate_menu(menu)
+                self.snapshot = MenuSnapshot(menu, version, source=self.menu_path, mtime=mtime)
+            except Exception as e:
+                logger.error("Không thể tải menu từ %s: %s. Giữ menu hiện tại.", self.menu_path, e)
+                return False
+        
+        logger.info("Đã tải menu từ %s (phiên bản %s, %d món)", self.menu_path, version, len(self.snapshot.items))
+        return True
+    
+    def start_watching(self, interval=2.0):
+        """Theo dõi thời điểm sửa đổi của file menu trong một luồng nền và tự tải lại khi thay đổi"""
+        if self.menu_path is None or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop_watching.clear()
+        
+        def watch():
+            while not self._stop_watching.wait(interval):
+                self.reload()
+        
+        self._watcher = threading.Thread(target=watch, name='menu-watcher', daemon=True)
+        self._watcher.start()
+    
+    def stop_watching(self):
+        self._stop_watching.set()
+    
+    def lookup(self, item):
+        """Tra cứu một món trong menu hiện hành, xem MenuSnapshot.lookup"""
+        return self.snapshot.lookup(item)
+    
+    def menu_items(self):
+        """Danh sách các món trong menu hiện hành, xem MenuSnapshot.menu_items"""
+        return self.snapshot.menu_items()
+    
+    def calculate_bill(self, food_items):
+        """Tính hóa đơn của một khay trên menu hiện hành, xem MenuSnapshot.calculate_bill"""
+        return self.snapshot.calculate_bill(food_items)
+    
+    def calculate_bills(self, trays):
+        """Tính hóa đơn của nhiều khay trên menu hiện hành, xem MenuSnapshot.calculate_bills"""
+        return self.snapshot.calculate_bills(trays)
+    
+    def _create_default_menu(self):
+        """
+        Tạo menu mặc định với giá và calo cho các món ăn phổ biến
+        
+        Returns:
+            pandas.DataFrame: Menu mặc định
+        """
+        # Danh sách món ăn phổ biến với giá và calo tương ứng
+        default_items = [
+            {'item': 'banh mi', 'price': 15000, 'calories': 350},
+            {'item': 'bap cai luoc', 'price': 5000, 'calories': 30},
+            {'item': 'bap cai xao', 'price': 8000, 'calories': 60},
+            {'item': 'bo xao', 'price': 25000, 'calories': 250},
+            {'item': 'ca chien', 'price': 20000, 'calories': 200},
+            {'item': 'ca chua', 'price': 5000, 'calories': 20},
+            {'item': 'ca kho', 'price': 18000, 'calories': 180},
+            {'item': 'ca rot', 'price': 5000, 'calories': 25},
+            {'item': 'canh bau', 'price': 10000, 'calories': 40},
+            {'item': 'canh bi do', 'price': 10000, 'calories': 45},
+            {'item': 'canh cai', 'price': 10000, 'calories': 35},
+            {'item': 'canh chua', 'price': 12000, 'calories': 60},
+            {'item': 'canh rong bien', 'price': 12000, 'calories': 30},
+            {'item': 'chuoi', 'price': 5000, 'calories': 90},
+            {'item': 'com', 'price': 10000, 'calories': 150},
+            {'item': 'dau bap', 'price': 7000, 'calories': 35},
+            {'item': 'dau hu', 'price': 8000, 'calories': 70},
+            {'item': 'dau que', 'price': 7000, 'calories': 30},
+            {'item': 'do chua', 'price': 5000, 'calories': 15},
+            {'item': 'dua hau', 'price': 8000, 'calories': 50},
+            {'item': 'dua leo', 'price': 5000, 'calories': 15},
+            {'item': 'ga chien', 'price': 22000, 'calories': 280},
+            {'item': 'ga kho', 'price': 20000, 'calories': 250},
+            {'item': 'kho qua', 'price': 8000, 'calories': 25},
+            {'item': 'kho tieu', 'price': 18000, 'calories': 200},
+            {'item': 'kho trung', 'price': 12000, 'calories': 150},
+            {'item': 'nuoc mam', 'price': 2000, 'calories': 10},
+            {'item': 'nuoc tuong', 'price': 2000, 'calories': 5},
+            {'item': 'oi', 'price': 8000, 'calories': 40},
+            {'item': 'ot', 'price': 2000, 'calories': 5},
+            {'item': 'rau', 'price': 5000, 'calories': 20},
+            {'item': 'rau muong', 'price': 8000, 'calories': 25},
+            {'item': 'rau ngo', 'price': 5000, 'calories': 15},
+            {'item': 'suon mieng', 'price': 25000, 'calories': 300},
+            {'item': 'suon xao', 'price': 25000, 'calories': 280},
+            {'item': 'thanh long', 'price': 10000, 'calories': 60},
+            {'item': 'thit chien', 'price': 22000, 'calories': 250},
+            {'item': 'thit luoc', 'price': 20000, 'calories': 180},
+            {'item': 'tom', 'price': 25000, 'calories': 120},
+            {'item': 'trung chien', 'price': 10000, 'calories': 120},
+            {'item': 'trung luoc', 'price': 8000, 'calories': 80},
+            # Thêm một món ăn "không xác định" để xử lý các trường hợp không nhận dạng được
+            {'item': 'unknown', 'price': 10000, 'calories': 100}
+        ]
+        
+        return pd.DataFrame(default_items)
+
+
+if __name__ == "__main__":
+    # Demo
+    billing = BillingSystem()
+    food_items = ['com', 'ga chien', 'canh chua', 'dua leo', 'dau hu']
+    bill_details, total_cost, total_calories = billing.calculate_bill(food_items)
+    
+    print("Chi tiết hóa đơn:")
+    for item in bill_details:
+        print(f"{item['item']}: {item['price']} VND, {item['calories']} kcal")
+        
+    print(f"Tổng tiền: {total_cost} VND")
     print(f"Tổng calo: {total_calories} kcal")
\ No newline at end of file
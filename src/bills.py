@@ -0,0 +1,99 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+class BillSession:
+    __slots__ = ('id', 'items', 'prices', 'calories', 'total_cost', 'total_calories',
+                 'menu_version', 'touched_at', '_lock')
+
+    def __init__(self, session_id, bill_details, total_cost, total_calories, menu_version=None):
+        """
+        Hóa đơn của một khay được giữ ở máy chủ để sửa từng món
+
+        Args:
+            session_id (str): ID phiên
+            bill_details (list): [{'item', 'price', 'calories'}, ...] (đầu ra của calculate_bill)
+            total_cost (float): Tổng tiền
+            total_calories (float): Tổng calo
+            menu_version (str, optional): Phiên bản menu dùng để tính hóa đơn
+        """
+        self.id = session_id
+        self.items = [detail['item'] for detail in bill_details]
+        self.prices = [detail['price'] for detail in bill_details]
+        self.calories = [detail['calories'] for detail in bill_details]
+        self.total_cost = total_cost
+        self.total_calories = total_calories
+        self.menu_version = menu_version
+        self.touched_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def replace(self, index, item, price, calories):
+        """
+        Thay món ở vị trí index, cập nhật tổng theo phần chênh lệch (O(1))
+
+        Returns:
+            dict: Món cũ {'name', 'price', 'calories'}
+
+        Raises:
+            IndexError: index nằm ngoài hóa đơn
+        """
+        with self._lock:
+            if not 0 <= index < len(self.items):
+                raise IndexError(index)
+            old = {'name': self.items[index], 'price': self.prices[index], 'calories': self.calories[index]}
+            self.items[index] = item
+            self.prices[index] = price
+            self.calories[index] = calories
+            self.total_cost += price - old['price']
+            self.total_calories += calories - old['calories']
+            return old
+
+    def totals(self):
+        with self._lock:
+            return {
+                'total_cost': self.total_cost,
+                'total_calories': self.total_calories,
+                'items_count': len(self.items),
+            }
+
+class BillSessionStore:
+    def __init__(self, max_size=4096, ttl=1800):
+        """
+        Các phiên hóa đơn trong bộ nhớ, giới hạn số lượng và thời gian không dùng
+
+        Args:
+            max_size (int): Số phiên tối đa (loại bỏ phiên ít dùng nhất khi đầy)
+            ttl (float): Thời gian sống của phiên kể từ lần dùng cuối (giây)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, bill_details, total_cost, total_calories, menu_version=None):
+        """Tạo phiên cho một hóa đơn, trả về BillSession"""
+        session = BillSession(uuid.uuid4().hex, bill_details, total_cost, total_calories, menu_version)
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id):
+        """Trả về phiên hoặc None nếu không tồn tại/đã hết hạn; mỗi lần lấy gia hạn phiên"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.touched_at > self.ttl:
+                del self._sessions[session_id]
+                return None
+            session.touched_at = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._sessions), 'max_size': self.max_size}
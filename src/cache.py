@@ -0,0 +1,149 @@
+import time
+import threading
+from collections import OrderedDict, defaultdict
+import cv2
+import numpy as np
+
+def dhash(image, color_order='bgr', hash_size=8):
+    """
+    Tính difference hash (dHash) 64-bit của một ảnh cắt
+
+    Ảnh được thu nhỏ về (hash_size + 1) x hash_size ảnh xám, mỗi bit cho biết điểm ảnh
+    có sáng hơn điểm bên phải nó hay không. Hai ảnh gần giống nhau có khoảng cách
+    Hamming nhỏ giữa hai hash.
+
+    Args:
+        image (numpy.ndarray): Ảnh (H, W, 3) uint8
+        color_order (str): 'bgr' hoặc 'rgb'
+        hash_size (int): Số bit theo mỗi chiều
+
+    Returns:
+        int: Giá trị hash
+    """
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY if color_order == 'bgr' else cv2.COLOR_RGB2GRAY)
+    bits = (gray[:, 1:] > gray[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class CropCache:
+    def __init__(self, max_size=1024, ttl=600, max_distance=4, min_confidence=0.9, hash_bits=64):
+        """
+        Bộ nhớ đệm kết quả phân loại theo perceptual hash của ảnh cắt
+
+        Ảnh cắt gần giống một ảnh đã phân loại (khoảng cách Hamming <= max_distance)
+        được trả về kết quả cũ mà không cần chạy CNN. Khóa gồm phiên bản mô hình nên
+        kết quả cũ không còn dùng được sau khi đổi mô hình.
+
+        Hash được chia thành max_distance + 1 dải bit: hai hash cách nhau không quá
+        max_distance bit luôn trùng nhau ít nhất một dải, nên mỗi lần tra chỉ so khoảng
+        cách với các mục trùng dải thay vì quét toàn bộ bộ nhớ đệm.
+
+        Args:
+            max_size (int): Số mục tối đa (loại bỏ mục ít dùng gần đây nhất khi đầy)
+            ttl (float): Thời gian sống của mỗi mục (giây)
+            max_distance (int): Khoảng cách Hamming tối đa để coi hai ảnh là gần trùng
+            min_confidence (float): Chỉ lưu kết quả có xác suất lớp cao nhất từ ngưỡng này,
+                để ảnh mơ hồ luôn được chạy lại qua CNN
+            hash_bits (int): Số bit của hash (dhash mặc định 64 bit)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+
+        self._entries = OrderedDict()  # (phiên bản mô hình, hash) -> (kết quả, thời điểm lưu)
+        # (phiên bản mô hình, số thứ tự dải, giá trị dải) -> các khóa của _entries
+        self._index = defaultdict(set)
+        bands = min(max_distance + 1, hash_bits)
+        bounds = [i * hash_bits // bands for i in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _band_keys(self, key):
+        model_version, image_hash = key
+        return [(model_version, i, (image_hash >> start) & mask) for i, (start, mask) in enumerate(self._bands)]
+
+    def _remove(self, key):
+        # Gọi khi đang giữ self._lock
+        del self._entries[key]
+        for band_key in self._band_keys(key):
+            keys = self._index.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[band_key]
+
+    def get(self, image_hash, model_version, top_k=1):
+        """
+        Tìm kết quả của ảnh gần trùng nhất cùng phiên bản mô hình
+
+        Returns:
+            list: [(tên lớp, xác suất), ...] hoặc None nếu không có
+        """
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            exact = (model_version, image_hash)
+            if exact in self._entries:
+                best_key, best_distance = exact, 0
+            else:
+                candidates = set()
+                for band_key in self._band_keys(exact):
+                    candidates.update(self._index.get(band_key, ()))
+                for key in candidates:
+                    distance = hamming(key[1], image_hash)
+                    if distance < best_distance:
+                        best_key, best_distance = key, distance
+
+            if best_key is not None:
+                prediction, stored_at = self._entries[best_key]
+                if now - stored_at > self.ttl:
+                    self._remove(best_key)
+                    self.expirations += 1
+                elif len(prediction) >= top_k:
+                    self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    return prediction[:top_k]
+
+            self.misses += 1
+            return None
+
+    def put(self, image_hash, model_version, prediction):
+        """Lưu kết quả phân loại nếu đủ độ tin cậy"""
+        if not prediction or prediction[0][1] < self.min_confidence:
+            return
+        with self._lock:
+            key = (model_version, image_hash)
+            if key not in self._entries:
+                for band_key in self._band_keys(key):
+                    self._index[band_key].add(key)
+            self._entries[key] = (prediction, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
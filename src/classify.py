@@ -1,98 +1,257 @@
-import os
-import cv2
-import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-
-class FoodClassifier:
-    def __init__(self, model_path=None, class_names=None):
-        """
-        Khởi tạo bộ phân loại thực phẩm với bất kỳ mô hình h5 nào
-        
-        Args:
-            model_path (str, optional): Đường dẫn đến mô hình đã huấn luyện.
-            class_names (list, optional): Danh sách tên các lớp thực phẩm. 
-        """
-        self.class_names = class_names
-        
-        # Tải mô hình từ đường dẫn được chỉ định hoặc tìm kiếm trong các vị trí mặc định
-        try:
-            if model_path and os.path.exists(model_path):
-                print(f"Đang tải mô hình từ {model_path}")
-                self.model = load_model(model_path, compile=False)
-            else:
-                # Tìm kiếm mô hình ở các vị trí mặc định
-                default_paths = [
-                    'models/cnn.h5',
-                    'cnn.h5',
-                ]
-                
-                for path in default_paths:
-                    if os.path.exists(path):
-                        print(f"Đang tải mô hình từ {path}")
-                        self.model = load_model(path, compile=False)
-                        break
-                else:
-                    raise FileNotFoundError("Không tìm thấy mô hình")
-        except Exception as e:
-            print(f"Lỗi khi tải mô hình: {str(e)}")
-            raise
-    
-    def preprocess_image(self, image_path):
-        """
-        Tiền xử lý ảnh để đưa vào mô hình
-        
-        Args:
-            image_path (str): Đường dẫn đến ảnh cần phân loại
-            
-        Returns:
-            numpy.ndarray: Ảnh đã qua tiền xử lý
-        """
-        try:
-            # Xử lý đường dẫn ảnh
-            if isinstance(image_path, str):
-                img = cv2.imread(image_path)
-                if img is None:
-                    raise ValueError(f"Không thể đọc ảnh từ {image_path}")
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            else:
-                img = image_path
-                if img.shape[2] == 3 and img[0,0,0] > img[0,0,2]:
-                    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            
-            # Resize và chuẩn bị ảnh
-            img = cv2.resize(img, (224, 224))
-            img = img.astype(np.float32) / 255.0
-            img = np.expand_dims(img, axis=0)
-            
-            return img
-        except Exception as e:
-            print(f"Lỗi khi tiền xử lý ảnh: {str(e)}")
-            raise
-    
-    def classify(self, image_path):
-        """
-        Phân loại ảnh thực phẩm
-        
-        Args:
-            image_path (str or numpy.ndarray): Đường dẫn đến ảnh hoặc ảnh dạng numpy array
-            
-        Returns:
-            str: Tên lớp dự đoán
-        """
-        try:
-            # Tiền xử lý ảnh
-            preprocessed_img = self.preprocess_image(image_path)
-            
-            # Dự đoán
-            predictions = self.model.predict(preprocessed_img)
-            predicted_class_index = np.argmax(predictions[0])
-            
-            # Lấy tên lớp
-            if self.class_names and predicted_class_index < len(self.class_names):
-                return self.class_names[predicted_class_index]
-            else:
-                return str(predicted_class_index)
-        except Exception as e:
-            print(f"Lỗi khi phân loại: {str(e)}")
-            return None
\ No newline at end of file
+import os
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+from src.preprocess import BatchPreprocessor
+from src.cache import dhash
+from src.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class KerasBackend:
+    def __init__(self, model_path):
+        """Chạy mô hình Keras (.h5) ở độ chính xác đầy đủ"""
+        self.model = load_model(model_path, compile=False)
+
+    def __call__(self, batch):
+        return np.asarray(self.model(batch, training=False))
+
+
+class TFLiteBackend:
+    def __init__(self, model_path, num_threads=None):
+        """
+        Chạy mô hình TFLite (float, dynamic-range hoặc full-INT8)
+        
+        Với mô hình full-INT8, đầu vào float được lượng tử hóa và đầu ra được giải
+        lượng tử hóa theo tham số scale/zero_point lưu trong mô hình.
+        """
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # Interpreter không an toàn khi dùng từ nhiều luồng
+        self._lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = batch.shape[0]
+            
+            input_dtype = self._input['dtype']
+            if input_dtype != np.float32:
+                scale, zero_point = self._input['quantization']
+                info = np.iinfo(input_dtype)
+                batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+            
+            self.interpreter.set_tensor(self._input['index'], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+            
+            if output.dtype != np.float32:
+                scale, zero_point = self._output['quantization']
+                output = (output.astype(np.float32) - zero_point) * scale
+            return output
+
+
+class OnnxBackend:
+    def __init__(self, model_path, num_threads=None):
+        """Chạy mô hình ONNX (float hoặc INT8) bằng ONNX Runtime trên CPU"""
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("Cần cài đặt onnxruntime để sử dụng backend 'onnx'")
+        
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        return self.session.run(None, {self._input_name: batch})[0]
+
+
+class FoodClassifier:
+    # Kích thước đầu vào của mô hình CNN
+    input_size = (224, 224)
+    
+    # Các backend suy luận được hỗ trợ
+    backends = {
+        'keras': KerasBackend,
+        'tflite': TFLiteBackend,
+        'onnx': OnnxBackend,
+    }
+    
+    # Vị trí mặc định của mô hình cho từng backend
+    default_model_paths = {
+        'keras': ['models/cnn.h5', 'cnn.h5'],
+        'tflite': ['models/cnn_int8.tflite', 'models/cnn_dynamic.tflite', 'models/cnn.tflite'],
+        'onnx': ['models/cnn_int8.onnx', 'models/cnn_dynamic.onnx', 'models/cnn.onnx'],
+    }
+
+    def __init__(self, model_path=None, class_names=None, backend='keras', num_threads=None, cache=None,
+                 version=None):
+        """
+        Khởi tạo bộ phân loại thực phẩm với mô hình h5, TFLite hoặc ONNX
+        
+        Args:
+            model_path (str, optional): Đường dẫn đến mô hình đã huấn luyện.
+            class_names (list, optional): Danh sách tên các lớp thực phẩm. 
+            backend (str): Backend suy luận: 'keras', 'tflite' hoặc 'onnx'.
+            num_threads (int, optional): Số luồng CPU cho backend tflite/onnx.
+            cache (CropCache, optional): Bộ nhớ đệm kết quả theo perceptual hash của ảnh cắt.
+            version (str, optional): Tên phiên bản trong danh mục mô hình (một phần khóa cache).
+        """
+        self.class_names = class_names
+        self.cache = cache
+        
+        if backend not in self.backends:
+            raise ValueError(f"Backend không hợp lệ: {backend}. Hỗ trợ: {list(self.backends)}")
+        self.backend = backend
+        
+        # Tải mô hình từ đường dẫn được chỉ định hoặc tìm kiếm trong các vị trí mặc định
+        try:
+            if not (model_path and os.path.exists(model_path)):
+                # Tìm kiếm mô hình ở các vị trí mặc định
+                for path in self.default_model_paths[backend]:
+                    if os.path.exists(path):
+                        model_path = path
+                        break
+                else:
+                    raise FileNotFoundError(f"Không tìm thấy mô hình cho backend {backend}")
+            
+            logger.info("Đang tải mô hình (%s) từ %s", backend, model_path)
+            if backend == 'keras':
+                self.model = KerasBackend(model_path)
+            else:
+                self.model = self.backends[backend](model_path, num_threads=num_threads)
+            self.model_path = model_path
+            # Khóa cache của mô hình: phiên bản, đường dẫn tuyệt đối, kích thước và thời điểm sửa
+            # của file cùng danh sách lớp, để hai file cùng tên (kể cả khi sao chép giữ mtime)
+            # hoặc cùng file với danh sách lớp khác không dùng chung kết quả
+            st = os.stat(model_path)
+            identity = json.dumps([version, os.path.abspath(model_path), st.st_size, st.st_mtime_ns, class_names])
+            self.model_version = f"{version or os.path.basename(model_path)}@{hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]}"
+        except Exception as e:
+            logger.error("Lỗi khi tải mô hình: %s", e)
+            raise
+        
+        # Tiền xử lý ghi thẳng vào bộ đệm lô dùng lại giữa các lần gọi
+        self.preprocessor = BatchPreprocessor(self.input_size, color_order='bgr')
+        self._lock = threading.Lock()
+    
+    def warmup(self, batch_sizes=(1, 8)):
+        """
+        Chạy thử mô hình với các kích thước lô dùng trong thực tế để khởi tạo trước đồ thị TF
+        
+        Args:
+            batch_sizes (tuple): Các kích thước lô cần chạy thử
+        """
+        for batch_size in batch_sizes:
+            dummy = np.zeros((batch_size, self.input_size[1], self.input_size[0], 3), dtype=np.float32)
+            self.model(dummy)
+    
+    def preprocess_image(self, image_path, color_order='bgr'):
+        """
+        Tiền xử lý ảnh để đưa vào mô hình
+        
+        Args:
+            image_path (str or numpy.ndarray): Đường dẫn đến ảnh hoặc ảnh dạng numpy array
+            color_order (str): Thứ tự kênh màu của ảnh numpy ('bgr' như OpenCV hoặc 'rgb')
+            
+        Returns:
+            numpy.ndarray: Ảnh đã qua tiền xử lý (1, 224, 224, 3)
+        """
+        try:
+            with self._lock:
+                return self.preprocessor([image_path], color_order).copy()
+        except Exception as e:
+            logger.error("Lỗi khi tiền xử lý ảnh: %s", e)
+            raise
+    
+    def classify(self, image_path, color_order='bgr'):
+        """
+        Phân loại ảnh thực phẩm
+        
+        Args:
+            image_path (str or numpy.ndarray): Đường dẫn đến ảnh hoặc ảnh dạng numpy array
+            color_order (str): Thứ tự kênh màu nếu truyền vào numpy array (mặc định 'bgr')
+            
+        Returns:
+            str: Tên lớp dự đoán
+        """
+        prediction = self.classify_batch([image_path], top_k=1, color_order=color_order)[0]
+        return prediction[0][0] if prediction else None
+    
+    def classify_batch(self, images, top_k=3, color_order='bgr'):
+        """
+        Phân loại cùng lúc tất cả các món ăn của một khay bằng một lần forward
+        
+        Các ảnh được ghi thẳng vào tensor (N, 224, 224, 3) cấp phát sẵn và mô hình
+        được gọi trực tiếp (với Keras là model(x, training=False)) thay vì
+        model.predict để tránh chi phí mỗi lần gọi của Keras.
+        
+        Args:
+            images (list): Danh sách đường dẫn ảnh hoặc ảnh dạng numpy array
+            top_k (int): Số lớp có xác suất cao nhất trả về cho mỗi ảnh
+            color_order (str): Thứ tự kênh màu nếu truyền vào numpy array (mặc định 'bgr')
+            
+        Returns:
+            list: Mỗi phần tử là danh sách [(tên lớp, xác suất), ...] sắp xếp giảm dần,
+                  hoặc None cho toàn bộ khay nếu phân loại thất bại
+        """
+        if len(images) == 0:
+            return []
+        
+        try:
+            results = [None] * len(images)
+            pending = list(range(len(images)))
+            
+            # Tra cache theo perceptual hash, chỉ chạy CNN cho các ảnh chưa có kết quả
+            hashes = None
+            if self.cache is not None:
+                hashes = [None if isinstance(image, str) else dhash(image, color_order) for image in images]
+                pending = []
+                for i, image_hash in enumerate(hashes):
+                    cached = self.cache.get(image_hash, self.model_version, top_k) if image_hash is not None else None
+                    if cached is None:
+                        pending.append(i)
+                    else:
+                        results[i] = cached
+            
+            if pending:
+                # Bộ đệm đầu vào dùng chung nên giữ khóa đến khi forward xong
+                with self._lock:
+                    with STAGE_SECONDS.time(stage='classify_preprocess'):
+                        batch = self.preprocessor([images[i] for i in pending], color_order)
+                    
+                    # Một lần forward duy nhất cho cả khay
+                    with STAGE_SECONDS.time(stage='classify'):
+                        predictions = np.asarray(self.model(batch))
+                
+                k = max(1, min(top_k, predictions.shape[1]))
+                top_indices = np.argsort(-predictions, axis=1)[:, :k]
+                
+                for i, probs, indices in zip(pending, predictions, top_indices):
+                    results[i] = [(self._class_name(idx), float(probs[idx])) for idx in indices]
+                    if hashes is not None and hashes[i] is not None:
+                        self.cache.put(hashes[i], self.model_version, results[i])
+            return results
+        except Exception as e:
+            logger.exception("Lỗi khi phân loại theo lô: %s", e)
+            return [None] * len(images)
+    
+    def _class_name(self, class_index):
+        """Chuyển chỉ số lớp thành tên lớp"""
+        if self.class_names and class_index < len(self.class_names):
+            return self.class_names[class_index]
+        return str(class_index)
\ No newline at end of file
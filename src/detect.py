@@ -1,104 +1,366 @@
-import os
-import cv2
-import numpy as np
-from ultralytics import YOLO
-import tempfile
-
-class FoodDetector:
-    def __init__(self, model_path=None):
-        """
-        Khởi tạo bộ phát hiện thực phẩm sử dụng YOLO
-        
-        Args:
-            model_path (str, optional): Đường dẫn đến trọng số YOLO tùy chỉnh. Nếu None, sử dụng model mặc định.
-        """
-        # Nếu không chỉ định path cụ thể, sử dụng mô hình YOLOv8n mặc định
-        model_to_load = model_path if model_path else 'yolov8n.pt'
-        print(f"Đang tải mô hình YOLO từ: {model_to_load}")
-        self.model = YOLO(model_to_load)
-
-    def detect_and_crop(self, image_path):
-        """
-        Phát hiện bowl/đĩa thức ăn trong ảnh và cắt ra từng phần riêng biệt
-        
-        Args:
-            image_path (str): Đường dẫn đến ảnh cần phân tích
-            
-        Returns:
-            tuple: (danh sách đường dẫn ảnh đã cắt, danh sách tên lớp, kết quả YOLO)
-        """
-        print(f"Đang phát hiện món ăn trong ảnh: {image_path}")
-        
-        # Đọc ảnh
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Không thể đọc ảnh từ đường dẫn: {image_path}")
-        
-        # Phát hiện đối tượng với YOLOv8
-        results = self.model(img)
-        result = results[0]  # Lấy kết quả của ảnh đầu tiên
-        
-        # Lấy tọa độ và lớp của các đối tượng đã phát hiện
-        boxes = result.boxes.xyxy.cpu().numpy()  # [x1, y1, x2, y2]
-        classes = result.boxes.cls.cpu().numpy()  # ID lớp
-        conf_scores = result.boxes.conf.cpu().numpy()  # Độ tin cậy
-        
-        print(f"Đã phát hiện {len(boxes)} đối tượng")
-        
-        # Lọc các đối tượng là bowl (class 45) hoặc plate hoặc các món ăn
-        # Lưu ý: YOLO có thể phát hiện nhiều class khác nhau, chúng ta tập trung vào bowl (45) 
-        # hoặc các đối tượng liên quan đến thức ăn
-        cropped_paths = []
-        yolo_classes = []
-        filtered_boxes = []
-        
-        # Tạo thư mục tạm thời để lưu các ảnh đã cắt
-        temp_dir = tempfile.mkdtemp()
-        
-        for i, (box, cls, conf) in enumerate(zip(boxes, classes, conf_scores)):
-            # Lọc đối tượng là bowl (class 45) hoặc đồ ăn
-            # Nếu confidence score thấp, bỏ qua
-            if conf < 0.4:
-                continue
-                
-            # Ưu tiên phát hiện bowl (class 45) và các đối tượng liên quan đến thức ăn
-            if cls == 45:  # class 45 là bowl trong COCO dataset
-                x1, y1, x2, y2 = map(int, box)
-                
-                # Đảm bảo tọa độ nằm trong giới hạn ảnh
-                x1, y1 = max(0, x1), max(0, y1)
-                x2, y2 = min(img.shape[1], x2), min(img.shape[0], y2)
-                
-                # Cắt ảnh
-                cropped_img = img[y1:y2, x1:x2]
-                
-                # Đảm bảo ảnh cắt không rỗng
-                if cropped_img.size == 0 or cropped_img.shape[0] == 0 or cropped_img.shape[1] == 0:
-                    print(f"  Bỏ qua bounding box {i} vì ảnh cắt rỗng")
-                    continue
-                
-                # Lưu ảnh đã cắt
-                crop_path = os.path.join(temp_dir, f"crop_{i}.jpg")
-                cv2.imwrite(crop_path, cropped_img)
-                
-                cropped_paths.append(crop_path)
-                yolo_classes.append("bowl")  # Gán nhãn tạm thời
-                filtered_boxes.append(box)
-                
-                print(f"  Đã lưu ảnh cắt {i}: {crop_path}, kích thước: {cropped_img.shape}")
-        
-        print(f"Tổng số món ăn đã phát hiện và cắt: {len(cropped_paths)}")
-        
-        return cropped_paths, yolo_classes, results
-
-if __name__ == "__main__":
-    # Demo
-    detector = FoodDetector()
-    image_path = "đường_dẫn_đến_ảnh_thử_nghiệm.jpg"
-    try:
-        cropped_paths, classes, results = detector.detect_and_crop(image_path)
-        print(f"Đã phát hiện {len(cropped_paths)} món ăn:")
-        for i, (path, cls) in enumerate(zip(cropped_paths, classes)):
-            print(f"  {i+1}. {cls}: {path}")
-    except Exception as e:
+import os
+import cv2
+import numpy as np
+import tempfile
+import logging
+from src.metrics import STAGE_SECONDS, DETECTIONS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+class FoodCrop:
+    """
+    Một món ăn đã cắt ra từ ảnh khay, giữ trong bộ nhớ
+    
+    Attributes:
+        box (tuple): Tọa độ (x1, y1, x2, y2) trên ảnh gốc
+        score (float): Độ tin cậy của YOLO
+        yolo_class (str): Nhãn tạm thời do YOLO gán
+        image (numpy.ndarray): Ảnh BGR đã cắt (view trên ảnh gốc)
+    """
+    __slots__ = ('box', 'score', 'yolo_class', 'image')
+
+    def __init__(self, box, score, yolo_class, image):
+        self.box = box
+        self.score = score
+        self.yolo_class = yolo_class
+        self.image = image
+
+def letterbox(img, new_shape=640, color=(114, 114, 114)):
+    """
+    Resize giữ tỉ lệ và thêm viền để ảnh có kích thước new_shape x new_shape (giống ultralytics)
+    
+    Returns:
+        tuple: (ảnh đã letterbox, tỉ lệ resize, (lề trái, lề trên))
+    """
+    h, w = img.shape[:2]
+    r = min(new_shape / h, new_shape / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    dw, dh = (new_shape - new_w) / 2, (new_shape - new_h) / 2
+    
+    if (w, h) != (new_w, new_h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return img, r, (left, top)
+
+def nms(boxes, scores, iou_threshold):
+    """
+    Non-maximum suppression bằng NumPy
+    
+    Args:
+        boxes (numpy.ndarray): (N, 4) tọa độ [x1, y1, x2, y2]
+        scores (numpy.ndarray): (N,) độ tin cậy
+        iou_threshold (float): Ngưỡng IoU để loại bỏ box trùng
+        
+    Returns:
+        numpy.ndarray: Chỉ số các box được giữ lại, theo thứ tự độ tin cậy giảm dần
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores)
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+class UltralyticsBackend:
+    def __init__(self, model_path):
+        """Chạy YOLO qua ultralytics/PyTorch (mặc định)"""
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+
+    def __call__(self, images, keep_classes, conf_threshold):
+        """Trả về danh sách (mảng phát hiện (N, 6) [x1, y1, x2, y2, conf, cls], kết quả YOLO) cho từng ảnh"""
+        outputs = []
+        for result in self.model(list(images)):
+            detections = np.concatenate([
+                result.boxes.xyxy.cpu().numpy(),  # [x1, y1, x2, y2]
+                result.boxes.conf.cpu().numpy()[:, None],  # Độ tin cậy
+                result.boxes.cls.cpu().numpy()[:, None],  # ID lớp
+            ], axis=1)
+            outputs.append((detections, result))
+        return outputs
+
+class ExportedYOLOBackend:
+    # Kích thước đầu vào của mô hình YOLO đã xuất
+    imgsz = 640
+    # Ngưỡng IoU của NMS và ngưỡng độ tin cậy của box ứng viên (giống mặc định của ultralytics)
+    iou_threshold = 0.7
+    candidate_threshold = 0.25
+
+    def __init__(self, model_path, runtime):
+        """
+        Chạy YOLOv8 đã xuất sang ONNX hoặc OpenVINO, không cần PyTorch
+        
+        Letterbox, giải mã box và NMS được thực hiện bằng NumPy. Đầu ra giống ultralytics
+        (mọi lớp, ngưỡng ứng viên 0.25) để FoodDetector lọc và đếm canteen_detections_total
+        theo cùng một nghĩa trên mọi backend.
+        
+        Args:
+            model_path (str): File .onnx, file .xml hoặc thư mục *_openvino_model
+            runtime (str): 'onnx' hoặc 'openvino'
+        """
+        self.runtime = runtime
+        if runtime == 'onnx':
+            import onnxruntime as ort
+            self.session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            model_input = self.session.get_inputs()[0]
+            self._input_name = model_input.name
+            self._dynamic_batch = not isinstance(model_input.shape[0], int)
+        else:
+            import openvino as ov
+            if os.path.isdir(model_path):
+                model_path = next(os.path.join(model_path, f) for f in os.listdir(model_path) if f.endswith('.xml'))
+            self.compiled = ov.Core().compile_model(model_path, 'CPU')
+            self._dynamic_batch = self.compiled.input(0).get_partial_shape()[0].is_dynamic
+
+    def _run(self, batch):
+        if self.runtime == 'onnx':
+            return self.session.run(None, {self._input_name: batch})[0]
+        return self.compiled(batch)[self.compiled.output(0)]
+
+    def __call__(self, images, keep_classes, conf_threshold):
+        """Trả về danh sách (mảng phát hiện (N, 6) [x1, y1, x2, y2, conf, cls], đầu ra thô) cho từng ảnh"""
+        batch = np.empty((len(images), 3, self.imgsz, self.imgsz), dtype=np.float32)
+        transforms = []
+        for i, img in enumerate(images):
+            padded, ratio, pad = letterbox(img, self.imgsz)
+            # BGR -> RGB, HWC -> CHW, [0, 255] -> [0, 1]
+            np.multiply(padded[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=batch[i], casting='unsafe')
+            transforms.append((ratio, pad))
+        
+        if self._dynamic_batch:
+            raw = self._run(batch)
+        else:
+            raw = np.concatenate([self._run(batch[i:i + 1]) for i in range(len(images))])
+        
+        outputs = []
+        for img, prediction, (ratio, pad) in zip(images, raw, transforms):
+            detections = self.postprocess(prediction, img.shape, ratio, pad, keep_classes, conf_threshold)
+            outputs.append((detections, prediction))
+        return outputs
+
+    def postprocess(self, prediction, image_shape, ratio, pad, keep_classes, conf_threshold):
+        """
+        Giải mã đầu ra YOLOv8 (4 + số lớp, số anchor) thành box trên ảnh gốc
+        
+        Mỗi anchor lấy lớp có điểm cao nhất và chỉ giữ anchor có điểm >= candidate_threshold
+        (như ultralytics), sau đó NMS theo từng lớp. Việc lọc theo keep_classes và
+        conf_threshold do FoodDetector thực hiện (và đếm vào low_confidence/other_class);
+        box vượt conf_threshold của các lớp cần giữ không phụ thuộc vào bước lọc này vì
+        NMS theo từng lớp và box điểm thấp không loại được box điểm cao hơn.
+        """
+        prediction = prediction.T  # (số anchor, 4 + số lớp)
+        class_scores = prediction[:, 4:]
+        cls = np.argmax(class_scores, axis=1)
+        conf = class_scores[np.arange(len(cls)), cls]
+        
+        mask = conf >= min(self.candidate_threshold, conf_threshold)
+        if not np.any(mask):
+            return np.zeros((0, 6), dtype=np.float32)
+        xywh, conf, cls = prediction[mask, :4], conf[mask], cls[mask]
+        
+        boxes = np.empty_like(xywh)
+        boxes[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+        boxes[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+        boxes[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+        boxes[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+        
+        # NMS theo từng lớp: dịch box của mỗi lớp ra vùng riêng để không ảnh hưởng lẫn nhau
+        offsets = cls[:, None].astype(np.float32) * (self.imgsz * 2)
+        keep = nms(boxes + offsets, conf, self.iou_threshold)
+        boxes, conf, cls = boxes[keep], conf[keep], cls[keep]
+        
+        # Đưa tọa độ về ảnh gốc
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+        
+        return np.concatenate([boxes, conf[:, None], cls[:, None].astype(np.float32)], axis=1)
+
+class FoodDetector:
+    # Lớp COCO được giữ lại (45 là bowl) và ngưỡng độ tin cậy
+    keep_classes = (45,)
+    conf_threshold = 0.4
+
+    def __init__(self, model_path=None, backend=None):
+        """
+        Khởi tạo bộ phát hiện thực phẩm sử dụng YOLO
+        
+        Args:
+            model_path (str, optional): Đường dẫn đến trọng số YOLO tùy chỉnh. Nếu None, sử dụng model mặc định.
+            backend (str, optional): 'ultralytics', 'onnx' hoặc 'openvino'. Nếu None, suy ra từ model_path.
+        """
+        # Nếu không chỉ định path cụ thể, sử dụng mô hình YOLOv8n mặc định
+        model_to_load = model_path if model_path else 'yolov8n.pt'
+        if backend is None:
+            if model_to_load.endswith('.onnx'):
+                backend = 'onnx'
+            elif model_to_load.endswith('.xml') or model_to_load.rstrip('/\\').endswith('_openvino_model'):
+                backend = 'openvino'
+            else:
+                backend = 'ultralytics'
+        self.backend = backend
+        
+        logger.info("Đang tải mô hình YOLO (%s) từ: %s", backend, model_to_load)
+        if backend == 'ultralytics':
+            self.model = UltralyticsBackend(model_to_load)
+        elif backend in ('onnx', 'openvino'):
+            self.model = ExportedYOLOBackend(model_to_load, backend)
+        else:
+            raise ValueError(f"Backend YOLO không hợp lệ: {backend}")
+
+    def warmup(self, image_size=(1024, 768), batch_sizes=(1,)):
+        """
+        Chạy thử mô hình trên ảnh rỗng để khởi tạo trước các kernel trước khi nhận request thật
+        
+        Args:
+            image_size (tuple): Kích thước (rộng, cao) ảnh khay dùng để chạy thử
+            batch_sizes (tuple): Các kích thước lô cần chạy thử
+        """
+        dummy = np.zeros((image_size[1], image_size[0], 3), dtype=np.uint8)
+        for batch_size in batch_sizes:
+            self.model([dummy] * batch_size, self.keep_classes, self.conf_threshold)
+
+    def detect_crops(self, img):
+        """
+        Phát hiện bowl/đĩa thức ăn trong ảnh đã giải mã và cắt ra từng phần ngay trong bộ nhớ
+        
+        Args:
+            img (numpy.ndarray): Ảnh BGR đã giải mã (ví dụ từ cv2.imdecode)
+            
+        Returns:
+            tuple: (danh sách FoodCrop, kết quả YOLO)
+        """
+        return self.detect_crops_batch([img])[0]
+
+    def detect_crops_batch(self, images):
+        """
+        Phát hiện và cắt món ăn cho nhiều ảnh trong một lần forward YOLO
+        
+        Args:
+            images (list): Danh sách ảnh BGR đã giải mã
+            
+        Returns:
+            list: Mỗi phần tử là (danh sách FoodCrop, kết quả YOLO) tương ứng với từng ảnh
+        """
+        if len(images) == 0:
+            return []
+        
+        # Phát hiện đối tượng với YOLOv8 cho cả lô ảnh
+        with STAGE_SECONDS.time(stage='detect'):
+            outputs = self.model(list(images), self.keep_classes, self.conf_threshold)
+        
+        with STAGE_SECONDS.time(stage='crop'):
+            return [(self._crops_from_detections(img, detections), [raw]) for img, (detections, raw) in zip(images, outputs)]
+
+    def _crops_from_detections(self, img, detections):
+        """
+        Lọc kết quả YOLO của một ảnh và cắt các món ăn ra khỏi ảnh đó
+        
+        Args:
+            img (numpy.ndarray): Ảnh BGR gốc
+            detections (numpy.ndarray): (N, 6) [x1, y1, x2, y2, conf, cls] trên ảnh gốc
+            
+        Returns:
+            list: Danh sách FoodCrop
+        """
+        boxes = detections[:, :4]  # [x1, y1, x2, y2]
+        conf_scores = detections[:, 4]  # Độ tin cậy
+        classes = detections[:, 5]  # ID lớp
+        
+        logger.debug("Đã phát hiện %d đối tượng", len(boxes))
+        
+        # Lọc các đối tượng là bowl (class 45) hoặc plate hoặc các món ăn
+        # Lưu ý: YOLO có thể phát hiện nhiều class khác nhau, chúng ta tập trung vào bowl (45) 
+        # hoặc các đối tượng liên quan đến thức ăn
+        crops = []
+        
+        for i, (box, cls, conf) in enumerate(zip(boxes, classes, conf_scores)):
+            # Lọc đối tượng là bowl (class 45) hoặc đồ ăn
+            # Nếu confidence score thấp, bỏ qua
+            if conf < self.conf_threshold:
+                DETECTIONS_TOTAL.inc(result='low_confidence')
+                continue
+                
+            # Ưu tiên phát hiện bowl (class 45) và các đối tượng liên quan đến thức ăn
+            if cls in self.keep_classes:  # class 45 là bowl trong COCO dataset
+                x1, y1, x2, y2 = map(int, box)
+                
+                # Đảm bảo tọa độ nằm trong giới hạn ảnh
+                x1, y1 = max(0, x1), max(0, y1)
+                x2, y2 = min(img.shape[1], x2), min(img.shape[0], y2)
+                
+                # Cắt ảnh (view trên ảnh gốc, không sao chép)
+                cropped_img = img[y1:y2, x1:x2]
+                
+                # Đảm bảo ảnh cắt không rỗng
+                if cropped_img.size == 0 or cropped_img.shape[0] == 0 or cropped_img.shape[1] == 0:
+                    logger.debug("Bỏ qua bounding box %d vì ảnh cắt rỗng", i)
+                    DETECTIONS_TOTAL.inc(result='empty_crop')
+                    continue
+                
+                crops.append(FoodCrop((x1, y1, x2, y2), float(conf), "bowl", cropped_img))  # Gán nhãn tạm thời
+                DETECTIONS_TOTAL.inc(result='kept')
+                
+                logger.debug("Đã cắt món %d, kích thước: %s", i, cropped_img.shape)
+            else:
+                DETECTIONS_TOTAL.inc(result='other_class')
+        
+        logger.debug("Tổng số món ăn đã phát hiện và cắt: %d", len(crops))
+        
+        return crops
+
+    def detect_and_crop(self, image_path):
+        """
+        Phát hiện bowl/đĩa thức ăn trong ảnh và cắt ra từng phần riêng biệt
+        
+        Giữ lại để tương thích với API cũ dựa trên đường dẫn file: đọc ảnh, gọi
+        detect_crops rồi ghi các ảnh cắt ra một thư mục tạm.
+        
+        Args:
+            image_path (str): Đường dẫn đến ảnh cần phân tích
+            
+        Returns:
+            tuple: (danh sách đường dẫn ảnh đã cắt, danh sách tên lớp, kết quả YOLO)
+        """
+        logger.debug("Đang phát hiện món ăn trong ảnh: %s", image_path)
+        
+        # Đọc ảnh
+        img = cv2.imread(image_path)
+        if img is None:
+            raise ValueError(f"Không thể đọc ảnh từ đường dẫn: {image_path}")
+        
+        crops, results = self.detect_crops(img)
+        
+        # Tạo thư mục tạm thời để lưu các ảnh đã cắt
+        temp_dir = tempfile.mkdtemp()
+        cropped_paths = []
+        for i, crop in enumerate(crops):
+            crop_path = os.path.join(temp_dir, f"crop_{i}.jpg")
+            cv2.imwrite(crop_path, crop.image)
+            cropped_paths.append(crop_path)
+        
+        return cropped_paths, [crop.yolo_class for crop in crops], results
+
+if __name__ == "__main__":
+    # Demo
+    detector = FoodDetector()
+    image_path = "đường_dẫn_đến_ảnh_thử_nghiệm.jpg"
+    try:
+        cropped_paths, classes, results = detector.detect_and_crop(image_path)
+        print(f"Đã phát hiện {len(cropped_paths)} món ăn:")
+        for i, (path, cls) in enumerate(zip(cropped_paths, classes)):
+            print(f"  {i+1}. {cls}: {path}")
+    except Exception as e:
         print(f"Lỗi: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import cv2
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.classify import FoodClassifier
+from src.shards import ShardSet
+
+DATA_DIR = "data/classification_dataset_augmented"
+MODEL_PATH = "models/cnn.h5"
+OUTPUT_DIR = "models"
+IMG_SIZE = (224, 224)
+# Cách resize của FoodClassifier khi suy luận (cv2.resize mặc định); ảnh hiệu chuẩn và ảnh
+# đánh giá phải được resize giống vậy thì quyết định lượng tử hóa mới đúng với thực tế
+SERVING_INTERPOLATION = 'linear'
+VALID_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp']
+
+def list_samples(directory, per_class=None, seed=0):
+    """
+    Liệt kê ảnh theo thư mục lớp (mỗi thư mục con là một lớp, sắp xếp theo alphabet
+    giống flow_from_directory khi huấn luyện)
+
+    Returns:
+        tuple: (danh sách (đường dẫn, chỉ số lớp), danh sách tên lớp)
+    """
+    class_names = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    rng = random.Random(seed)
+    samples = []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(directory, class_name)
+        files = sorted(f for f in os.listdir(class_dir) if os.path.splitext(f)[1].lower() in VALID_EXTENSIONS)
+        if per_class is not None and len(files) > per_class:
+            files = rng.sample(files, per_class)
+        samples.extend((os.path.join(class_dir, f), label) for f in files)
+    return samples, class_names
+
+def load_image(path):
+    """Đọc và tiền xử lý ảnh giống FoodClassifier (RGB, 224x224, [0, 1])"""
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img = cv2.resize(img, IMG_SIZE)
+    return img.astype(np.float32) / 255.0
+
+def calibration_images(samples):
+    """Sinh từng ảnh hiệu chuẩn (1, 224, 224, 3) cho lượng tử hóa INT8"""
+    for path, _ in samples:
+        img = load_image(path)
+        if img is not None:
+            yield img[np.newaxis]
+
+def shard_calibration_images(shards, indices):
+    """Sinh từng ảnh hiệu chuẩn (1, 224, 224, 3) từ shard, không giải mã lại JPEG"""
+    for index in indices:
+        images, _ = shards.take([index])
+        yield images.astype(np.float32) / 255.0
+
+def path_batches(samples, batch_size):
+    """Các lô (ảnh float32 [0, 1], nhãn) đọc từ file ảnh"""
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        images = [load_image(path) for path, _ in chunk]
+        batch = np.stack([img for img in images if img is not None])
+        labels = np.array([label for (_, label), img in zip(chunk, images) if img is not None])
+        yield batch, labels
+
+def shard_batches(shards, batch_size, indices=None):
+    """
+    Các lô (ảnh float32 [0, 1], nhãn) đọc từ shard
+
+    Không có indices thì cắt thẳng lát memmap theo từng lớp; có indices thì chỉ lấy các ảnh đó.
+    """
+    if indices is None:
+        chunks = shards.batches(batch_size)
+    else:
+        chunks = (shards.take(indices[start:start + batch_size]) for start in range(0, len(indices), batch_size))
+    for images, labels in chunks:
+        yield images.astype(np.float32) / 255.0, labels
+
+def export_tflite(keras_model, output_path, mode, calibration=None):
+    """
+    Chuyển mô hình Keras sang TFLite
+
+    Args:
+        keras_model: Mô hình Keras đã tải
+        output_path (str): Đường dẫn file .tflite
+        mode (str): 'float', 'dynamic' (lượng tử hóa trọng số) hoặc 'int8' (full-INT8)
+        calibration (callable): Hàm trả về iterator ảnh hiệu chuẩn cho chế độ 'int8'
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if mode in ('dynamic', 'int8'):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'int8':
+        converter.representative_dataset = lambda: ([img] for img in calibration())
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"Đã xuất TFLite ({mode}): {output_path}")
+    return output_path
+
+def export_onnx(keras_model, output_path, mode, calibration=None, source_path=None, force=False):
+    """
+    Chuyển mô hình Keras sang ONNX và lượng tử hóa bằng ONNX Runtime
+
+    Args:
+        keras_model: Mô hình Keras đã tải
+        output_path (str): Đường dẫn file .onnx
+        mode (str): 'float', 'dynamic' hoặc 'int8' (lượng tử hóa tĩnh có hiệu chuẩn)
+        calibration (callable): Hàm trả về iterator ảnh hiệu chuẩn cho chế độ 'int8'
+        source_path (str, optional): File Keras của keras_model; cnn.onnx cũ hơn file này được xuất lại
+        force (bool): Luôn xuất lại cnn.onnx
+    """
+    import tf2onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_dynamic, quantize_static
+
+    float_path = os.path.join(os.path.dirname(output_path), 'cnn.onnx')
+    # Bản float là nguồn của các bản lượng tử hóa: không dùng lại nếu đã cũ hơn mô hình Keras
+    stale = (source_path is not None and os.path.exists(float_path)
+             and os.path.getmtime(float_path) < os.path.getmtime(source_path))
+    if force or stale or not os.path.exists(float_path):
+        spec = [tf.TensorSpec((None, IMG_SIZE[1], IMG_SIZE[0], 3), tf.float32, name='input')]
+        tf2onnx.convert.from_keras(keras_model, input_signature=spec, output_path=float_path)
+        print(f"Đã xuất ONNX (float): {float_path}")
+
+    if mode == 'float':
+        return float_path
+
+    if mode == 'dynamic':
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+    else:
+        class _Reader(CalibrationDataReader):
+            def __init__(self):
+                self._images = calibration()
+
+            def get_next(self):
+                img = next(self._images, None)
+                return None if img is None else {'input': img}
+
+        quantize_static(float_path, output_path, _Reader(),
+                        activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    print(f"Đã xuất ONNX ({mode}): {output_path}")
+    return output_path
+
+def evaluate(classifier, batches, batch_size=8, latency_runs=20):
+    """
+    Đo độ chính xác và độ trễ của một bộ phân loại
+
+    Args:
+        classifier (FoodClassifier): Bộ phân loại cần đo
+        batches (callable): Hàm batches(batch_size) trả về các lô (ảnh, nhãn)
+
+    Returns:
+        dict: accuracy, độ trễ trung bình cho lô 1 ảnh và lô batch_size ảnh (ms)
+    """
+    correct = 0
+    total = 0
+    latency_images = None
+    for batch, labels in batches(batch_size):
+        if latency_images is None:
+            latency_images = batch
+        predictions = classifier.model(batch)
+        correct += int(np.sum(np.argmax(predictions, axis=1) == labels))
+        total += len(labels)
+
+    def latency(n):
+        batch = latency_images[:n]
+        classifier.model(batch)  # warm-up
+        times = []
+        for _ in range(latency_runs):
+            start = time.perf_counter()
+            classifier.model(batch)
+            times.append((time.perf_counter() - start) * 1000.0)
+        return float(np.median(times))
+
+    return {
+        'accuracy': correct / total if total else 0.0,
+        'samples': total,
+        'latency_ms_batch_1': latency(1),
+        f'latency_ms_batch_{batch_size}': latency(batch_size),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Xuất và lượng tử hóa mô hình CNN cho suy luận trên CPU")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--formats', nargs='+', default=['tflite', 'onnx'], choices=['tflite', 'onnx'])
+    parser.add_argument('--modes', nargs='+', default=['dynamic', 'int8'], choices=['float', 'dynamic', 'int8'])
+    parser.add_argument('--calibration-per-class', type=int, default=10)
+    parser.add_argument('--eval-per-class', type=int, default=None)
+    parser.add_argument('--shards', default=None,
+                        help="Thư mục shard (src/shards.py --interpolation linear, có train/ và val/) "
+                             "thay cho việc đọc ảnh trong --data-dir")
+    parser.add_argument('--force', action='store_true',
+                        help="Xuất lại cnn.onnx (float) kể cả khi file đã có và mới hơn --model")
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.01,
+                        help="Mức giảm accuracy tối đa chấp nhận được so với Keras")
+    parser.add_argument('--report', default=os.path.join(OUTPUT_DIR, 'export_report.json'))
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.shards:
+        train_shards = ShardSet(os.path.join(args.shards, 'train'))
+        val_shards = ShardSet(os.path.join(args.shards, 'val'))
+        for shards in (train_shards, val_shards):
+            if shards.interpolation != SERVING_INTERPOLATION:
+                sys.exit(f"{shards.directory} được resize bằng '{shards.interpolation}' nhưng khi suy luận ảnh được "
+                         f"resize bằng '{SERVING_INTERPOLATION}'; hãy biên dịch shard riêng cho export: python "
+                         f"src/shards.py --interpolation {SERVING_INTERPOLATION} --output-dir <thư mục khác>")
+            if shards.img_size != IMG_SIZE:
+                sys.exit(f"{shards.directory} có kích thước {shards.img_size}, cần {IMG_SIZE}")
+        calibration_indices = train_shards.sample_indices(args.calibration_per_class)
+        eval_indices = None if args.eval_per_class is None else val_shards.sample_indices(args.eval_per_class)
+        calibration = lambda: shard_calibration_images(train_shards, calibration_indices)
+        eval_batches = lambda batch_size: shard_batches(val_shards, batch_size, eval_indices)
+        class_names = train_shards.class_names
+        calibration_count = len(calibration_indices)
+        eval_count = len(val_shards) if eval_indices is None else len(eval_indices)
+    else:
+        calibration_samples, class_names = list_samples(os.path.join(args.data_dir, 'train'), args.calibration_per_class)
+        eval_samples, _ = list_samples(os.path.join(args.data_dir, 'val'), args.eval_per_class)
+        calibration = lambda: calibration_images(calibration_samples)
+        eval_batches = lambda batch_size: path_batches(eval_samples, batch_size)
+        calibration_count, eval_count = len(calibration_samples), len(eval_samples)
+    print(f"{calibration_count} ảnh hiệu chuẩn, {eval_count} ảnh đánh giá, {len(class_names)} lớp")
+
+    keras_model = load_model(args.model, compile=False)
+    artifacts = [('keras', 'float', args.model)]
+    for fmt in args.formats:
+        for mode in args.modes:
+            output_path = os.path.join(args.output_dir, f"cnn_{mode}.{fmt}" if mode != 'float' else f"cnn.{fmt}")
+            try:
+                if fmt == 'tflite':
+                    export_tflite(keras_model, output_path, mode, calibration)
+                else:
+                    output_path = export_onnx(keras_model, output_path, mode, calibration,
+                                              source_path=args.model, force=args.force)
+                    # Bản float chỉ cần xuất một lần trong mỗi lần chạy
+                    args.force = False
+                artifacts.append((fmt, mode, output_path))
+            except Exception as e:
+                print(f"Lỗi khi xuất {fmt} ({mode}): {str(e)}")
+
+    report = []
+    for backend, mode, path in artifacts:
+        classifier = FoodClassifier(model_path=path, class_names=class_names, backend=backend)
+        result = evaluate(classifier, eval_batches)
+        result.update({'backend': backend, 'mode': mode, 'path': path,
+                       'size_mb': os.path.getsize(path) / (1024 * 1024)})
+        report.append(result)
+
+    baseline_accuracy = report[0]['accuracy']
+    for result in report:
+        result['accuracy_delta'] = result['accuracy'] - baseline_accuracy
+        result['within_budget'] = -result['accuracy_delta'] <= args.max_accuracy_drop
+
+    print(f"\n{'backend':<8} {'mode':<8} {'acc':>7} {'delta':>8} {'b1 ms':>8} {'b8 ms':>8} {'MB':>7}")
+    for r in report:
+        print(f"{r['backend']:<8} {r['mode']:<8} {r['accuracy']:>7.4f} {r['accuracy_delta']:>+8.4f} "
+              f"{r['latency_ms_batch_1']:>8.2f} {r['latency_ms_batch_8']:>8.2f} {r['size_mb']:>7.1f}"
+              f"{'' if r['within_budget'] else '  (vượt ngân sách accuracy)'}")
+
+    candidates = [r for r in report if r['within_budget']]
+    best = min(candidates, key=lambda r: r['latency_ms_batch_8'])
+    print(f"\nBackend nhanh nhất trong ngân sách accuracy: {best['backend']} ({best['mode']}) - {best['path']}")
+    print(f"Sử dụng: CNN_BACKEND={best['backend']} CNN_MODEL_PATH={best['path']} python web_server.py")
+
+    with open(args.report, 'w') as f:
+        json.dump({'max_accuracy_drop': args.max_accuracy_drop, 'recommended': best['path'], 'results': report}, f, indent=2)
+    print(f"Đã lưu báo cáo tại {args.report}")
+
+if __name__ == "__main__":
+    main()
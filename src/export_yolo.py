@@ -0,0 +1,134 @@
+import os
+import sys
+import glob
+import random
+import argparse
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.detect import FoodDetector
+
+DATA_DIR = "data/classification_dataset_augmented"
+MODEL_PATH = "yolov8n.pt"
+
+def compose_tray(images, columns=3, cell_size=320, margin=24, background=(200, 200, 200)):
+    """
+    Ghép nhiều ảnh món ăn thành một ảnh khay tổng hợp dạng lưới
+
+    Args:
+        images (list): Danh sách ảnh BGR
+        columns (int): Số cột của lưới
+        cell_size (int): Kích thước mỗi ô (px)
+        margin (int): Khoảng cách giữa các ô (px)
+
+    Returns:
+        numpy.ndarray: Ảnh khay BGR
+    """
+    rows = (len(images) + columns - 1) // columns
+    tray = np.empty((rows * (cell_size + margin) + margin, columns * (cell_size + margin) + margin, 3), dtype=np.uint8)
+    tray[:] = background
+    for i, img in enumerate(images):
+        r, c = divmod(i, columns)
+        y, x = margin + r * (cell_size + margin), margin + c * (cell_size + margin)
+        tray[y:y + cell_size, x:x + cell_size] = cv2.resize(img, (cell_size, cell_size))
+    return tray
+
+def sample_trays(data_dir, count=10, items_per_tray=(4, 8), seed=0):
+    """Tạo các khay tổng hợp từ ảnh trong data_dir/train"""
+    rng = random.Random(seed)
+    paths = sorted(glob.glob(os.path.join(data_dir, 'train', '*', '*.jpg')))
+    trays = []
+    for _ in range(count):
+        n = rng.randint(*items_per_tray)
+        images = [img for img in (cv2.imread(p) for p in rng.sample(paths, n)) if img is not None]
+        trays.append(compose_tray(images))
+    return trays
+
+def box_iou(a, b):
+    """IoU giữa hai tập box (N, 4) và (M, 4)"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+def compare_crops(reference, candidate, iou_threshold=0.9, score_tolerance=0.05):
+    """
+    So sánh các FoodCrop từ hai backend trên cùng một ảnh
+
+    Returns:
+        dict: số box mỗi bên, số box khớp, IoU nhỏ nhất và chênh lệch điểm lớn nhất
+    """
+    result = {'reference': len(reference), 'candidate': len(candidate), 'matched': 0,
+              'min_iou': 1.0, 'max_score_diff': 0.0}
+    if reference and candidate:
+        ious = box_iou(np.array([c.box for c in reference], dtype=np.float32),
+                       np.array([c.box for c in candidate], dtype=np.float32))
+        used = set()
+        for i in np.argsort(-ious.max(axis=1)):
+            j = int(np.argmax(ious[i]))
+            if ious[i, j] < iou_threshold or j in used:
+                continue
+            used.add(j)
+            result['matched'] += 1
+            result['min_iou'] = min(result['min_iou'], float(ious[i, j]))
+            result['max_score_diff'] = max(result['max_score_diff'], abs(reference[i].score - candidate[j].score))
+    result['ok'] = (result['matched'] == result['reference'] == result['candidate']
+                    and result['max_score_diff'] <= score_tolerance)
+    return result
+
+def check_parity(reference, candidate, trays):
+    """
+    Chạy hai FoodDetector trên cùng các khay và in bảng so sánh
+
+    Returns:
+        bool: True nếu mọi khay đều khớp
+    """
+    all_ok = True
+    for i, tray in enumerate(trays):
+        ref_crops, _ = reference.detect_crops(tray)
+        cand_crops, _ = candidate.detect_crops(tray)
+        r = compare_crops(ref_crops, cand_crops)
+        all_ok = all_ok and r['ok']
+        print(f"Khay {i}: ultralytics={r['reference']} {candidate.backend}={r['candidate']} khớp={r['matched']} "
+              f"IoU nhỏ nhất={r['min_iou']:.3f} chênh lệch điểm={r['max_score_diff']:.3f} {'OK' if r['ok'] else 'LỆCH'}")
+    return all_ok
+
+def export(model_path, fmt, imgsz=640):
+    """Xuất YOLO sang ONNX (batch động) hoặc OpenVINO bằng ultralytics"""
+    from ultralytics import YOLO
+    model = YOLO(model_path)
+    if fmt == 'onnx':
+        return model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    return model.export(format='openvino', imgsz=imgsz)
+
+def main():
+    parser = argparse.ArgumentParser(description="Xuất YOLO sang ONNX/OpenVINO và kiểm tra khớp kết quả với ultralytics")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--formats', nargs='+', default=['onnx'], choices=['onnx', 'openvino'])
+    parser.add_argument('--images', default=None, help="Thư mục ảnh khay thật; nếu bỏ trống, dùng khay tổng hợp")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--trays', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.images:
+        trays = [img for img in (cv2.imread(p) for p in sorted(glob.glob(os.path.join(args.images, '*')))) if img is not None]
+    else:
+        trays = sample_trays(args.data_dir, args.trays)
+
+    reference = FoodDetector(args.model, backend='ultralytics')
+    all_ok = True
+    for fmt in args.formats:
+        exported = export(args.model, fmt)
+        print(f"Đã xuất {fmt}: {exported}")
+        all_ok = check_parity(reference, FoodDetector(exported, backend=fmt), trays) and all_ok
+
+    print("Kết quả khớp với ultralytics" if all_ok else "CẢNH BÁO: Kết quả không khớp với ultralytics")
+    sys.exit(0 if all_ok else 1)
+
+if __name__ == "__main__":
+    main()
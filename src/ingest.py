@@ -0,0 +1,137 @@
+import struct
+import cv2
+import numpy as np
+from src.detect import FoodCrop
+from src.metrics import STAGE_SECONDS
+
+# Cờ giải mã giảm độ phân giải (JPEG được thu nhỏ ngay trong bước IDCT)
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+def jpeg_size(data):
+    """
+    Đọc kích thước (rộng, cao) từ header JPEG mà không giải mã ảnh
+
+    Returns:
+        tuple: (rộng, cao) hoặc None nếu không phải JPEG hợp lệ
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        # SOF0-SOF15 (trừ DHT, JPG, DAC) chứa kích thước ảnh
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+def reduced_factor(width, height, max_dimension):
+    """Hệ số thu nhỏ lớn nhất (8/4/2) mà cạnh dài sau khi giải mã vẫn không nhỏ hơn max_dimension"""
+    longest = max(width, height)
+    for factor, flag in REDUCED_FLAGS:
+        if longest // factor >= max_dimension:
+            return factor, flag
+    return 1, cv2.IMREAD_COLOR
+
+class IngestedImage:
+    __slots__ = ('source', 'frame', 'scale', 'original_size', 'decode_factor')
+
+    def __init__(self, source, frame, scale, original_size, decode_factor):
+        """
+        Ảnh đã giải mã cho pipeline suy luận
+
+        Args:
+            source (numpy.ndarray): Ảnh BGR ở độ phân giải dùng để cắt món ăn
+            frame (numpy.ndarray): Ảnh BGR ở độ phân giải dùng cho detector
+            scale (float): Số điểm ảnh source trên một điểm ảnh frame
+            original_size (tuple): Kích thước (rộng, cao) của ảnh gốc
+            decode_factor (int): Hệ số thu nhỏ khi giải mã (1 nếu giải mã đầy đủ)
+        """
+        self.source = source
+        self.frame = frame
+        self.scale = scale
+        self.original_size = original_size
+        self.decode_factor = decode_factor
+
+    def crops_from(self, crops):
+        """
+        Chuyển các FoodCrop phát hiện trên frame sang source: đổi tọa độ box và cắt lại
+        ảnh từ source để CNN nhận ảnh cắt ở độ phân giải cao hơn
+
+        Args:
+            crops (list): Danh sách FoodCrop trên frame
+
+        Returns:
+            list: Danh sách FoodCrop trên source
+        """
+        if self.source is self.frame:
+            return crops
+        height, width = self.source.shape[:2]
+        mapped = []
+        for crop in crops:
+            x1, y1, x2, y2 = (int(round(v * self.scale)) for v in crop.box)
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(width, x2), min(height, y2)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            mapped.append(FoodCrop((x1, y1, x2, y2), crop.score, crop.yolo_class, self.source[y1:y2, x1:x2]))
+        return mapped
+
+def ingest_image(image_bytes, crop_max_dimension=1920, detect_max_dimension=640):
+    """
+    Giải mã ảnh tải lên ở độ phân giải vừa đủ và tạo frame cho detector bằng một lần resize
+
+    Với JPEG lớn (ví dụ ảnh 12 MP từ điện thoại), hệ số IMREAD_REDUCED_COLOR_2/4/8 được
+    chọn từ kích thước trong header để giải mã thẳng ở độ phân giải gần crop_max_dimension,
+    giảm thời gian giải mã và bộ nhớ đỉnh. Các định dạng khác được giải mã đầy đủ rồi thu nhỏ.
+
+    Args:
+        image_bytes (bytes): Dữ liệu ảnh đã mã hóa
+        crop_max_dimension (int): Cạnh dài tối đa của ảnh dùng để cắt món ăn
+        detect_max_dimension (int): Cạnh dài tối đa của ảnh đưa vào detector
+
+    Returns:
+        IngestedImage: hoặc None nếu không giải mã được
+    """
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+
+    size = jpeg_size(image_bytes)
+    factor, flag = reduced_factor(*size, crop_max_dimension) if size else (1, cv2.IMREAD_COLOR)
+    with STAGE_SECONDS.time(stage='decode'):
+        source = cv2.imdecode(buffer, flag)
+    if source is None:
+        return None
+    original_size = size or (source.shape[1], source.shape[0])
+
+    with STAGE_SECONDS.time(stage='resize'):
+        height, width = source.shape[:2]
+        if max(height, width) > crop_max_dimension:
+            ratio = crop_max_dimension / max(height, width)
+            source = cv2.resize(source, (max(1, int(width * ratio)), max(1, int(height * ratio))),
+                                interpolation=cv2.INTER_AREA)
+            height, width = source.shape[:2]
+
+        if max(height, width) <= detect_max_dimension:
+            return IngestedImage(source, source, 1.0, original_size, factor)
+
+        scale = max(height, width) / detect_max_dimension
+        frame = cv2.resize(source, (max(1, int(round(width / scale))), max(1, int(round(height / scale)))),
+                           interpolation=cv2.INTER_AREA)
+        scale = width / frame.shape[1]
+        return IngestedImage(source, frame, scale, original_size, factor)
@@ -0,0 +1,304 @@
+import os
+import sys
+import math
+import time
+import argparse
+
+import tensorflow as tf
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+AUTOTUNE = tf.data.AUTOTUNE
+IMG_SIZE = (224, 224)
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Tham số tăng cường dữ liệu, giống ImageDataGenerator trong train_cnn.py
+AUGMENTATION = {
+    'rotation_range': 30,        # độ
+    'width_shift_range': 0.3,    # tỉ lệ chiều rộng
+    'height_shift_range': 0.3,   # tỉ lệ chiều cao
+    'shear_range': 0.2,          # độ (ImageDataGenerator tính shear theo độ)
+    'zoom_range': 0.2,
+    'horizontal_flip': True,
+    'vertical_flip': True,
+    'brightness_range': (0.7, 1.3),
+    'channel_shift_range': 0.2,  # trên thang 0-255, trước khi rescale
+}
+
+def list_image_files(directory):
+    """
+    Liệt kê ảnh theo thư mục lớp, cùng thứ tự lớp với flow_from_directory (sắp xếp theo tên)
+
+    Returns:
+        tuple: (danh sách đường dẫn, danh sách chỉ số lớp, danh sách tên lớp)
+    """
+    class_names = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(directory, class_name)
+        for file in sorted(os.listdir(class_dir)):
+            if os.path.splitext(file)[1].lower() in VALID_EXTENSIONS:
+                paths.append(os.path.join(class_dir, file))
+                labels.append(label)
+    return paths, labels, class_names
+
+def load_image(path, img_size=IMG_SIZE):
+    """Đọc và giải mã một ảnh, resize về img_size (nearest như flow_from_directory), giữ uint8"""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, img_size, method='nearest')
+    return tf.cast(image, tf.uint8)
+
+def _affine_matrices(batch_size, height, width, config):
+    """
+    Ma trận biến đổi của cả lô: xoay, dịch, shear, zoom ghép như apply_affine_transform
+    của Keras, đổi sang dạng 8 tham số của ImageProjectiveTransformV3
+
+    Returns:
+        tf.Tensor: (batch_size, 8) ánh xạ tọa độ đầu ra -> tọa độ ảnh nguồn
+    """
+    def uniform(low, high):
+        return tf.random.uniform((batch_size,), low, high)
+
+    zeros = tf.zeros((batch_size,))
+    ones = tf.ones((batch_size,))
+
+    def matrix(rows):
+        return tf.reshape(tf.stack([value for row in rows for value in row], axis=1), (batch_size, 3, 3))
+
+    theta = uniform(-config['rotation_range'], config['rotation_range']) * (math.pi / 180.0)
+    tx = uniform(-config['height_shift_range'], config['height_shift_range']) * height
+    ty = uniform(-config['width_shift_range'], config['width_shift_range']) * width
+    shear = uniform(-config['shear_range'], config['shear_range']) * (math.pi / 180.0)
+    zx = uniform(1 - config['zoom_range'], 1 + config['zoom_range'])
+    zy = uniform(1 - config['zoom_range'], 1 + config['zoom_range'])
+
+    # Tọa độ (hàng, cột) như Keras
+    rotation = matrix([[tf.cos(theta), -tf.sin(theta), zeros], [tf.sin(theta), tf.cos(theta), zeros], [zeros, zeros, ones]])
+    shift = matrix([[ones, zeros, tx], [zeros, ones, ty], [zeros, zeros, ones]])
+    shear_m = matrix([[ones, -tf.sin(shear), zeros], [zeros, tf.cos(shear), zeros], [zeros, zeros, ones]])
+    zoom = matrix([[zx, zeros, zeros], [zeros, zy, zeros], [zeros, zeros, ones]])
+    transform = rotation @ shift @ shear_m @ zoom
+
+    # Biến đổi quanh tâm ảnh
+    o_x, o_y = height / 2.0 - 0.5, width / 2.0 - 0.5
+    offset = tf.constant([[1.0, 0.0, o_x], [0.0, 1.0, o_y], [0.0, 0.0, 1.0]])
+    reset = tf.constant([[1.0, 0.0, -o_x], [0.0, 1.0, -o_y], [0.0, 0.0, 1.0]])
+    transform = offset @ transform @ reset
+
+    # (hàng, cột) -> (x = cột, y = hàng)
+    return tf.stack([
+        transform[:, 1, 1], transform[:, 1, 0], transform[:, 1, 2],
+        transform[:, 0, 1], transform[:, 0, 0], transform[:, 0, 2],
+        zeros, zeros,
+    ], axis=1)
+
+def augment_batch(images, config=AUGMENTATION):
+    """
+    Tăng cường dữ liệu cho cả lô ảnh trong vài phép toán tensor
+
+    Tương đương ImageDataGenerator, cùng thứ tự với apply_transform của Keras: biến đổi
+    affine (nội suy song tuyến, fill_mode='nearest'), channel shift, lật ngang/dọc rồi
+    độ sáng, mỗi ảnh một bộ tham số ngẫu nhiên riêng.
+
+    Args:
+        images (tf.Tensor): Lô ảnh uint8 (N, H, W, 3)
+
+    Returns:
+        tf.Tensor: Lô ảnh float32 trên thang 0-255
+    """
+    images = tf.cast(images, tf.float32)
+    shape = tf.shape(images)
+    batch_size, height, width = shape[0], shape[1], shape[2]
+
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=_affine_matrices(batch_size, tf.cast(height, tf.float32), tf.cast(width, tf.float32), config),
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='NEAREST'
+    )
+
+    # Channel shift: cộng một lượng như nhau cho mọi kênh, giới hạn trong khoảng giá trị của
+    # từng ảnh sau biến đổi affine (chưa đổi độ sáng), như Keras
+    intensity = config['channel_shift_range']
+    shifted = images + tf.random.uniform((batch_size, 1, 1, 1), -intensity, intensity)
+    images = tf.clip_by_value(shifted,
+                              tf.reduce_min(images, axis=[1, 2, 3], keepdims=True),
+                              tf.reduce_max(images, axis=[1, 2, 3], keepdims=True))
+
+    def random_flags():
+        return tf.reshape(tf.random.uniform((batch_size,)) < 0.5, (-1, 1, 1, 1))
+
+    if config['horizontal_flip']:
+        images = tf.where(random_flags(), tf.reverse(images, axis=[2]), images)
+    if config['vertical_flip']:
+        images = tf.where(random_flags(), tf.reverse(images, axis=[1]), images)
+
+    low, high = config['brightness_range']
+    return tf.clip_by_value(images * tf.random.uniform((batch_size, 1, 1, 1), low, high), 0.0, 255.0)
+
+def make_dataset(directory, batch_size=16, img_size=IMG_SIZE, training=True, cache=None, seed=None):
+    """
+    Pipeline tf.data thay cho ImageDataGenerator.flow_from_directory
+
+    Đọc và giải mã ảnh song song, cache ảnh gốc đã giải mã (uint8, trước tăng cường),
+    tăng cường theo lô và prefetch để chuẩn bị lô tiếp theo trong lúc mô hình đang tính.
+
+    Args:
+        directory (str): Thư mục có các thư mục con theo lớp
+        batch_size (int): Kích thước lô
+        img_size (tuple): Kích thước (cao, rộng) ảnh đầu vào
+        training (bool): Xáo trộn mỗi epoch và tăng cường dữ liệu
+        cache (str, optional): File cache trên đĩa; None cache trong bộ nhớ, '' không cache
+        seed (int, optional): Seed cho xáo trộn
+
+    Returns:
+        tuple: (tf.data.Dataset trả về (ảnh float32 0-1, nhãn one-hot), danh sách tên lớp, số ảnh)
+    """
+    paths, labels, class_names = list_image_files(directory)
+    num_classes = len(class_names)
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    dataset = dataset.map(lambda path, label: (load_image(path, img_size), tf.one_hot(label, num_classes)),
+                          num_parallel_calls=AUTOTUNE, deterministic=not training)
+    if cache is None:
+        dataset = dataset.cache()
+    elif cache:
+        dataset = dataset.cache(cache)
+
+    if training:
+        dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    if training:
+        dataset = dataset.map(lambda images, labels: (augment_batch(images), labels),
+                              num_parallel_calls=AUTOTUNE, deterministic=False)
+    dataset = dataset.map(lambda images, labels: (tf.cast(images, tf.float32) / 255.0, labels),
+                          num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE), class_names, len(paths)
+
+def make_shard_dataset(shards, batch_size=16, training=True, seed=None):
+    """
+    Pipeline tf.data đọc từ shard đã biên dịch (src/shards.py) thay vì giải mã JPEG
+
+    Ảnh uint8 đã resize được lấy thẳng từ memmap theo từng lô chỉ số, sau đó tăng cường
+    và rescale như make_dataset.
+
+    Args:
+        shards (ShardSet): Tập shard đã mở
+        batch_size (int): Kích thước lô
+        training (bool): Xáo trộn mỗi epoch và tăng cường dữ liệu
+        seed (int, optional): Seed cho xáo trộn
+
+    Returns:
+        tuple: (tf.data.Dataset trả về (ảnh float32 0-1, nhãn one-hot), danh sách tên lớp, số ảnh)
+    """
+    num_classes = len(shards.class_names)
+    height, width = shards.img_size
+
+    def gather(indices):
+        images, labels = tf.numpy_function(shards.take, [indices], (tf.uint8, tf.int32))
+        images.set_shape((None, height, width, 3))
+        labels.set_shape((None,))
+        return images, tf.one_hot(labels, num_classes)
+
+    dataset = tf.data.Dataset.range(len(shards))
+    if training:
+        dataset = dataset.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(gather, num_parallel_calls=AUTOTUNE, deterministic=not training)
+    if training:
+        dataset = dataset.map(lambda images, labels: (augment_batch(images), labels),
+                              num_parallel_calls=AUTOTUNE, deterministic=False)
+    dataset = dataset.map(lambda images, labels: (tf.cast(images, tf.float32) / 255.0, labels),
+                          num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE), shards.class_names, len(shards)
+
+class StepsPerSecond(tf.keras.callbacks.Callback):
+    """Ghi số bước và số ảnh mỗi giây của từng epoch vào logs (steps_per_sec, images_per_sec)"""
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._started = time.perf_counter()
+        self._steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._started
+        steps_per_sec = self._steps / elapsed if elapsed > 0 else 0.0
+        if logs is not None:
+            logs['steps_per_sec'] = steps_per_sec
+            logs['images_per_sec'] = steps_per_sec * self.batch_size
+        print(f" - {steps_per_sec:.2f} bước/giây ({steps_per_sec * self.batch_size:.1f} ảnh/giây)")
+
+def measure_input(batches, steps, warmup=5):
+    """Số lô mỗi giây khi chỉ đọc đầu vào (không huấn luyện)"""
+    iterator = iter(batches)
+    for _ in range(warmup):
+        next(iterator)
+    started = time.perf_counter()
+    for _ in range(steps):
+        next(iterator)
+    return steps / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh tốc độ đầu vào huấn luyện: ImageDataGenerator và tf.data")
+    parser.add_argument('--train-dir', default="data/classification_dataset_augmented/train")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--shards', default=None,
+                        help="Thư mục shard của tập huấn luyện (src/shards.py) để đo thêm đường đọc shard")
+    parser.add_argument('--with-model', action='store_true',
+                        help="Đo cả một bước huấn luyện (mô hình của train_cnn.py) thay vì chỉ đọc đầu vào")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.train_dir):
+        sys.exit(f"Không tìm thấy {args.train_dir}")
+
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+    generator = ImageDataGenerator(
+        rescale=1./255,
+        fill_mode='nearest',
+        **AUGMENTATION
+    ).flow_from_directory(args.train_dir, target_size=IMG_SIZE, batch_size=args.batch_size,
+                          class_mode='categorical', shuffle=True)
+    dataset, class_names, count = make_dataset(args.train_dir, args.batch_size)
+    # Lặp lại để số bước đo không bị giới hạn bởi một epoch
+    sources = [('generator', generator), ('tf.data', dataset.repeat())]
+    if args.shards:
+        from src.shards import ShardSet
+        shard_dataset, _, _ = make_shard_dataset(ShardSet(args.shards), args.batch_size)
+        sources.append(('shards', shard_dataset.repeat()))
+    print(f"{count} ảnh, {len(class_names)} lớp, lô {args.batch_size}")
+
+    results = {}
+    if args.with_model:
+        from tensorflow.keras import layers, Model
+        inputs = layers.Input(shape=IMG_SIZE + (3,))
+        x = layers.Conv2D(32, 3, strides=2, activation='relu')(inputs)
+        x = layers.GlobalAveragePooling2D()(x)
+        model = Model(inputs, layers.Dense(len(class_names), activation='softmax')(x))
+        model.compile(optimizer='adam', loss='categorical_crossentropy')
+        for name, batches in sources:
+            model.fit(batches, steps_per_epoch=5, epochs=1, verbose=0)
+            started = time.perf_counter()
+            model.fit(batches, steps_per_epoch=args.steps, epochs=1, verbose=0)
+            results[name] = args.steps / (time.perf_counter() - started)
+    else:
+        for name, batches in sources:
+            results[name] = measure_input(batches, args.steps)
+
+    print(f"\n{'đầu vào':<10} {'bước/giây':>10} {'ảnh/giây':>10}")
+    for name, steps_per_sec in results.items():
+        print(f"{name:<10} {steps_per_sec:>10.2f} {steps_per_sec * args.batch_size:>10.1f}")
+    print()
+    for name in results:
+        if name != 'generator':
+            print(f"{name} nhanh hơn generator {results[name] / results['generator']:.2f} lần")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import time
+import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+class Job:
+    __slots__ = ('id', 'status', 'created_at', 'started_at', 'finished_at', 'result', 'status_code',
+                 'future', 'done', 'cancel_requested')
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.status_code = None
+        self.future = None
+        self.done = threading.Event()
+        self.cancel_requested = False
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class JobManager:
+    def __init__(self, max_workers=2, max_pending=64, ttl=300):
+        """
+        Chạy các công việc phân tích khay trong một pool worker có giới hạn
+
+        Args:
+            max_workers (int): Số công việc chạy đồng thời
+            max_pending (int): Số công việc tối đa đang chờ hoặc đang chạy; vượt quá sẽ bị từ chối
+            ttl (float): Thời gian (giây) giữ kết quả sau khi công việc kết thúc
+        """
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tray-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _purge(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _pending_count(self):
+        return sum(1 for job in self._jobs.values() if job.status in ('queued', 'running'))
+
+    def submit(self, fn, *args):
+        """
+        Đưa một công việc vào hàng đợi
+
+        Args:
+            fn (callable): Hàm trả về (kết quả dạng dict, mã HTTP)
+
+        Returns:
+            Job: Công việc đã tạo, hoặc None nếu hàng đợi đã đầy
+        """
+        with self._lock:
+            self._purge()
+            if self._pending_count() >= self.max_pending:
+                return None
+            job = Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+        # Chạy trong bản sao context hiện tại để log của công việc mang request ID của request gửi nó
+        context = contextvars.copy_context()
+        job.future = self._executor.submit(context.run, self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        with self._lock:
+            if job.status == 'cancelled':
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+
+        try:
+            result, status_code = fn(*args)
+        except Exception as e:
+            result, status_code = {'error': f'Lỗi phân tích: {str(e)}'}, 500
+
+        with self._lock:
+            job.finished_at = time.time()
+            if job.cancel_requested:
+                # Không thể dừng giữa chừng; kết quả của công việc đã hủy bị bỏ đi
+                job.status = 'cancelled'
+            else:
+                job.result, job.status_code = result, status_code
+                job.status = 'done' if status_code < 400 else 'failed'
+        job.done.set()
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout):
+        """Chờ công việc kết thúc tối đa timeout giây (long-poll), trả về Job hoặc None"""
+        job = self.get(job_id)
+        if job is not None and timeout > 0:
+            job.done.wait(timeout)
+        return job
+
+    def cancel(self, job_id):
+        """
+        Hủy một công việc
+
+        Returns:
+            Job: Công việc sau khi hủy, hoặc None nếu không tồn tại
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in ('done', 'failed', 'cancelled'):
+                return job
+            if job.status == 'queued':
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                if job.future is not None:
+                    job.future.cancel()
+                job.done.set()
+            else:
+                job.cancel_requested = True
+            return job
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {'jobs': counts, 'max_pending': self.max_pending}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
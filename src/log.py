@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import copy
+import time
+import queue
+import atexit
+import logging
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+# ID của request đang được xử lý (đặt trong before_request của Flask)
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# Các thuộc tính chuẩn của LogRecord; các thuộc tính khác (truyền qua extra=) được ghi thành trường JSON
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+class RequestIdFilter(logging.Filter):
+    """Gắn request ID hiện tại vào bản ghi ngay trong luồng gọi, trước khi bản ghi vào hàng đợi"""
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        """Chỉ ghép thông điệp và traceback trong luồng gọi; việc định dạng để luồng ghi log làm"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """Định dạng mỗi bản ghi thành một dòng JSON"""
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        return super().format(record)
+
+_listener = None
+_handler = None
+
+def _start_listener(formatter):
+    global _listener
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+def _restart_after_fork():
+    # Luồng của QueueListener không tồn tại trong tiến trình con (worker của serve.py)
+    if _listener is not None:
+        _handler.queue = queue.SimpleQueue()
+        _start_listener(_listener.handlers[0].formatter)
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+def setup_logging(level='INFO', fmt='json'):
+    """
+    Cấu hình logging cho toàn ứng dụng
+
+    Các logger ghi vào một QueueHandler (không chặn luồng xử lý request); một luồng
+    QueueListener định dạng và ghi ra stdout. Gọi nhiều lần chỉ cập nhật mức log.
+
+    Args:
+        level (str): Mức log ('DEBUG', 'INFO', ...); chi tiết từng ảnh cắt chỉ có ở DEBUG
+        fmt (str): 'json' (mỗi dòng một bản ghi JSON) hoặc 'text'
+    """
+    global _handler
+    root = logging.getLogger()
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    if _handler is not None:
+        return
+
+    _handler = _QueueHandler(queue.SimpleQueue())
+    _handler.addFilter(RequestIdFilter())
+    root.addHandler(_handler)
+    _start_listener(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_after_fork)
+    atexit.register(_stop_listener)
@@ -0,0 +1,157 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Ngưỡng bucket mặc định (giây) cho histogram thời gian
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Nhãn của {self.name} phải là {self.labelnames}, nhận được {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self, items):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [số mẫu theo từng bucket (không cộng dồn), tổng, số mẫu]
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Đo thời gian của khối lệnh (giây) và ghi vào histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        """
+        Tập hợp các metric của tiến trình, xuất ra định dạng văn bản của Prometheus
+
+        Mỗi tiến trình (mỗi worker của serve.py) có bộ đếm riêng; Prometheus phân biệt
+        chúng qua instance được scrape.
+        """
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+# Metric của pipeline phân tích khay
+STAGE_SECONDS = REGISTRY.histogram(
+    'canteen_stage_seconds', 'Thời gian của từng bước trong pipeline phân tích khay', ('stage',))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'canteen_request_seconds', 'Tổng thời gian xử lý request', ('endpoint', 'status'))
+TRAY_ITEMS = REGISTRY.histogram(
+    'canteen_tray_items', 'Số món ăn được phát hiện trên mỗi khay', buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20))
+ITEMS_TOTAL = REGISTRY.counter(
+    'canteen_items_total', 'Tổng số món ăn đã phân tích')
+DETECTIONS_TOTAL = REGISTRY.counter(
+    'canteen_detections_total', 'Các box YOLO theo kết quả lọc (kept, low_confidence, other_class, empty_crop)', ('result',))
+CNN_FALLBACKS_TOTAL = REGISTRY.counter(
+    'canteen_cnn_fallbacks_total', 'Số món mà CNN thất bại và phải dùng nhãn YOLO')
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    'canteen_model_load_seconds', 'Thời gian tải và warm-up mô hình', ('model',))
+ORDER_WRITE_FAILURES_TOTAL = REGISTRY.counter(
+    'canteen_order_write_failures_total', 'Số đơn hàng không ghi được vào CSDL và phải ghi tạm ra file spill')
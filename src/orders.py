@@ -0,0 +1,368 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import sqlite3
+import threading
+
+from src.metrics import ORDER_WRITE_FAILURES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    student_id TEXT,
+    items_count INTEGER NOT NULL,
+    total_cost REAL NOT NULL,
+    total_calories REAL NOT NULL,
+    menu_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_student ON orders (student_id, created_at, id);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id TEXT NOT NULL REFERENCES orders (id),
+    position INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    price REAL NOT NULL,
+    calories REAL NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (order_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_order_items_item ON order_items (item, created_at);
+"""
+
+class OrderStore:
+    def __init__(self, path, batch_size=256, flush_interval=0.05, max_pending=10000,
+                 lock_timeout=60.0, shutdown_timeout=10.0, spill_path=None, replay_interval=30.0):
+        """
+        Lưu các đơn hàng đã hoàn tất vào SQLite (chế độ WAL) theo kiểu write-behind
+
+        submit() chỉ đưa đơn vào hàng đợi và trả về ngay; một luồng ghi gom các đơn
+        thành lô và ghi mỗi lô trong một transaction (group commit), nên request không
+        bao giờ phải chờ fsync. Các truy vấn lịch sử dùng kết nối đọc riêng cho mỗi
+        luồng và phân trang theo khóa (created_at, id) trên chỉ mục.
+
+        Đơn đã nhận (202) không bao giờ bị bỏ: lô không ghi được (CSDL bị khóa quá
+        lock_timeout hoặc lỗi khác) và các đơn còn trong hàng đợi khi hết shutdown_timeout
+        được ghi tạm ra file spill (JSONL, fsync). Luồng ghi định kỳ ghi lại các đơn này
+        vào CSDL (bỏ qua đơn đã có), kể cả sau khi khởi động lại.
+
+        Args:
+            path (str): File SQLite
+            batch_size (int): Số đơn tối đa trong một transaction
+            flush_interval (float): Thời gian chờ tối đa (giây) để gom thêm đơn sau đơn đầu tiên
+            max_pending (int): Số đơn tối đa đang chờ ghi; vượt quá thì submit() từ chối
+            lock_timeout (float): Thời gian tối đa (giây) thử ghi lại một lô khi CSDL bị khóa
+            shutdown_timeout (float): Thời gian tối đa (giây) chờ ghi nốt hàng đợi khi thoát
+            spill_path (str, optional): File spill (mặc định <path>.spill.jsonl)
+            replay_interval (float): Khoảng thời gian (giây) giữa các lần thử ghi lại file spill
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock_timeout = lock_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.spill_path = spill_path or path + '.spill.jsonl'
+        self.replay_interval = replay_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._batch_listeners = []
+        self._spill_lock = threading.Lock()
+        self._inflight = []
+        self._next_replay = 0.0
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Với WAL, NORMAL chỉ fsync khi checkpoint: an toàn khi tiến trình chết, nhanh hơn FULL
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def connection(self):
+        """Kết nối chỉ dùng để đọc của luồng hiện tại"""
+        conn = getattr(self._local, 'conn', None)
+        # Kết nối mở trước khi fork không được dùng lại trong tiến trình con
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    def add_batch_listener(self, listener):
+        """
+        Đăng ký hàm listener(conn, orders) được gọi trong cùng transaction của mỗi lô,
+        ví dụ để cập nhật bảng tổng hợp
+        """
+        self._batch_listeners.append(listener)
+
+    def _ensure_writer(self):
+        # Luồng ghi được tạo lười (trong worker sau khi fork)
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name='order-writer', daemon=True)
+                self._writer.start()
+
+    def submit(self, bill_details, total_cost, total_calories, student_id=None, menu_version=None):
+        """
+        Đưa một đơn hàng vào hàng đợi ghi
+
+        Args:
+            bill_details (list): [{'item', 'price', 'calories'}, ...] (đầu ra của calculate_bill)
+            total_cost (float): Tổng tiền
+            total_calories (float): Tổng calo
+            student_id (str, optional): Mã sinh viên
+            menu_version (str, optional): Phiên bản menu dùng để tính hóa đơn
+
+        Returns:
+            dict: Đơn hàng (có id), hoặc None nếu hàng đợi ghi đã đầy
+        """
+        order = {
+            'id': uuid.uuid4().hex,
+            'created_at': time.time(),
+            'student_id': student_id,
+            'items_count': len(bill_details),
+            'total_cost': total_cost,
+            'total_calories': total_calories,
+            'menu_version': menu_version,
+            'items': [{'item': d['item'], 'price': d['price'], 'calories': d['calories']} for d in bill_details],
+        }
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(order)
+        except queue.Full:
+            return None
+        return order
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=1.0)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            if time.monotonic() >= self._next_replay:
+                self._replay_spill(conn)
+            batch = self._collect()
+            if not batch:
+                continue
+            self._inflight = batch
+            try:
+                deadline = time.monotonic() + self.lock_timeout
+                while True:
+                    try:
+                        self._write_batch(conn, batch)
+                        break
+                    except sqlite3.OperationalError as e:
+                        # CSDL đang bị khóa (ví dụ khi đang dựng lại bảng tổng hợp): ghi lại lô này
+                        # sau, nhưng không quá lock_timeout để luồng ghi (và flush khi thoát) không treo
+                        if 'locked' not in str(e) or time.monotonic() >= deadline:
+                            raise
+                        logger.warning("CSDL đơn hàng đang bị khóa, thử ghi lại %d đơn", len(batch))
+                        time.sleep(0.5)
+            except Exception as e:
+                logger.exception("Lỗi ghi %d đơn hàng, ghi tạm ra %s: %s", len(batch), self.spill_path, e)
+                self._spill(batch)
+                self._next_replay = time.monotonic() + self.replay_interval
+            finally:
+                self._inflight = []
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _spill(self, batch):
+        """Ghi tạm các đơn chưa lưu được ra file spill (nối thêm, fsync trước khi trả về)"""
+        if not batch:
+            return
+        with self._spill_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for order in batch:
+                    f.write(json.dumps(order, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        self.failed += len(batch)
+        ORDER_WRITE_FAILURES_TOTAL.inc(len(batch))
+
+    def _replay_spill(self, conn):
+        """
+        Ghi các đơn trong file spill vào CSDL; đơn đã có (ví dụ lô được ghi xong đúng lúc
+        tiến trình thoát) được bỏ qua để bảng tổng hợp không bị cộng hai lần
+
+        Returns:
+            int: Số đơn đã ghi lại
+        """
+        self._next_replay = time.monotonic() + self.replay_interval
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path):
+                return 0
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                # Dòng cuối có thể dở dang nếu tiến trình chết khi đang ghi
+                spilled = [json.loads(line) for line in f if line.endswith('\n')]
+            try:
+                pending, replayed = list(spilled), 0
+                while pending:
+                    batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                    placeholders = ','.join('?' * len(batch))
+                    existing = {row[0] for row in conn.execute(
+                        f'SELECT id FROM orders WHERE id IN ({placeholders})', [order['id'] for order in batch])}
+                    batch = [order for order in batch if order['id'] not in existing]
+                    if batch:
+                        self._write_batch(conn, batch)
+                        replayed += len(batch)
+            except Exception as e:
+                # Giữ nguyên file spill; đơn đã ghi sẽ được bỏ qua ở lần thử sau
+                logger.warning("Chưa ghi lại được file spill %s: %s", self.spill_path, e)
+                return 0
+            os.remove(self.spill_path)
+        logger.info("Đã ghi lại %d đơn hàng từ %s", replayed, self.spill_path)
+        return replayed
+
+    def close(self):
+        """Khi thoát: chờ ghi nốt hàng đợi, hết thời gian thì ghi tạm phần còn lại ra file spill"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.flush(timeout=self.shutdown_timeout):
+            return
+        remaining = list(self._inflight)
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        self._spill(remaining)
+        logger.error("Đã ghi tạm %d đơn hàng chưa lưu ra %s", len(remaining), self.spill_path)
+
+    def _write_batch(self, conn, batch):
+        with conn:
+            conn.executemany(
+                'INSERT INTO orders (id, created_at, student_id, items_count, total_cost, total_calories, menu_version) '
+                'VALUES (:id, :created_at, :student_id, :items_count, :total_cost, :total_calories, :menu_version)',
+                batch
+            )
+            conn.executemany(
+                'INSERT INTO order_items (order_id, position, item, price, calories, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                [(order['id'], position, line['item'], line['price'], line['calories'], order['created_at'])
+                 for order in batch for position, line in enumerate(order['items'])]
+            )
+            for listener in self._batch_listeners:
+                listener(conn, batch)
+        self.written += len(batch)
+        self.batches += 1
+        logger.debug("Đã ghi %d đơn hàng", len(batch))
+
+    def flush(self, timeout=None):
+        """
+        Chờ đến khi mọi đơn đã nhận được ghi xuống
+
+        Args:
+            timeout (float, optional): Thời gian chờ tối đa (giây); None chờ đến khi xong
+
+        Returns:
+            bool: False nếu hết thời gian mà vẫn còn đơn chưa ghi
+        """
+        if self._writer is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    logger.error("Hết thời gian chờ ghi, còn %d đơn hàng chưa được lưu", self._queue.unfinished_tasks)
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _attach_items(self, orders):
+        if not orders:
+            return orders
+        placeholders = ','.join('?' * len(orders))
+        rows = self.connection().execute(
+            f'SELECT order_id, item, price, calories FROM order_items WHERE order_id IN ({placeholders}) '
+            'ORDER BY order_id, position',
+            [order['id'] for order in orders]
+        ).fetchall()
+        by_order = {order['id']: order for order in orders}
+        for order in orders:
+            order['items'] = []
+        for row in rows:
+            by_order[row['order_id']]['items'].append(
+                {'item': row['item'], 'price': row['price'], 'calories': row['calories']})
+        return orders
+
+    def get(self, order_id):
+        row = self.connection().execute('SELECT * FROM orders WHERE id = ?', (order_id,)).fetchone()
+        if row is None:
+            return None
+        return self._attach_items([dict(row)])[0]
+
+    def history(self, student_id=None, since=None, cursor=None, limit=50):
+        """
+        Lịch sử đơn hàng mới nhất trước, phân trang theo khóa
+
+        Args:
+            student_id (str, optional): Chỉ lấy đơn của sinh viên này
+            since (float, optional): Chỉ lấy đơn từ thời điểm này (epoch giây)
+            cursor (str, optional): Con trỏ next_cursor của trang trước
+            limit (int): Số đơn mỗi trang
+
+        Returns:
+            tuple: (danh sách đơn kèm món, con trỏ trang tiếp theo hoặc None)
+        """
+        clauses, params = [], []
+        if student_id is not None:
+            clauses.append('student_id = ?')
+            params.append(student_id)
+        if since is not None:
+            clauses.append('created_at >= ?')
+            params.append(since)
+        if cursor:
+            created_at, order_id = cursor.split(':', 1)
+            clauses.append('(created_at, id) < (?, ?)')
+            params.extend([float(created_at), order_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self.connection().execute(
+            f'SELECT * FROM orders {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+
+        orders = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = orders[-1]
+            next_cursor = f"{last['created_at']!r}:{last['id']}"
+        return self._attach_items(orders), next_cursor
+
+    def stats(self):
+        return {'pending': self._queue.qsize(), 'written': self.written, 'batches': self.batches,
+                'failed': self.failed, 'spill_pending': os.path.exists(self.spill_path)}
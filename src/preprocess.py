@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+class BatchPreprocessor:
+    def __init__(self, input_size=(224, 224), color_order='bgr', max_batch_size=8):
+        """
+        Tiền xử lý ảnh cắt thành tensor đầu vào CNN, ghi thẳng vào bộ đệm cấp phát sẵn
+
+        Mỗi ảnh được resize trực tiếp vào một ô của bộ đệm uint8, đổi kênh màu tại chỗ
+        (chỉ khi đầu vào là BGR), sau đó cả lô được chuyển uint8 -> float32 và chia 255
+        trong một lần duyệt duy nhất. Không cấp phát mảng mới cho mỗi ảnh.
+
+        Args:
+            input_size (tuple): Kích thước (rộng, cao) đầu vào của mô hình
+            color_order (str): Thứ tự kênh màu mặc định của ảnh đầu vào ('bgr' như OpenCV hoặc 'rgb')
+            max_batch_size (int): Kích thước lô ban đầu của bộ đệm (tự mở rộng khi cần)
+        """
+        if color_order not in ('bgr', 'rgb'):
+            raise ValueError(f"Thứ tự kênh màu không hợp lệ: {color_order}")
+        self.input_size = input_size
+        self.color_order = color_order
+        self._allocate(max_batch_size)
+
+    def _allocate(self, batch_size):
+        width, height = self.input_size
+        self._pixels = np.empty((batch_size, height, width, 3), dtype=np.uint8)
+        self._batch = np.empty((batch_size, height, width, 3), dtype=np.float32)
+
+    @property
+    def capacity(self):
+        return self._batch.shape[0]
+
+    def __call__(self, images, color_order=None):
+        """
+        Tiền xử lý một lô ảnh
+
+        Args:
+            images (list): Danh sách ảnh numpy (H, W, 3) uint8 hoặc đường dẫn ảnh
+            color_order (str, optional): Thứ tự kênh màu của ảnh numpy; mặc định dùng giá trị khởi tạo.
+                Ảnh đọc từ đường dẫn luôn là BGR.
+
+        Returns:
+            numpy.ndarray: View (N, H, W, 3) float32 trong [0, 1] trên bộ đệm nội bộ; chỉ hợp lệ
+                đến lần gọi tiếp theo
+        """
+        color_order = color_order or self.color_order
+        n = len(images)
+        if n > self.capacity:
+            self._allocate(n)
+
+        for i, image in enumerate(images):
+            order = color_order
+            if isinstance(image, str):
+                path = image
+                image = cv2.imread(path)
+                if image is None:
+                    raise ValueError(f"Không thể đọc ảnh từ {path}")
+                order = 'bgr'
+
+            dst = self._pixels[i]
+            cv2.resize(image, self.input_size, dst=dst, interpolation=cv2.INTER_LINEAR)
+            if order == 'bgr':
+                # Đổi kênh sau khi resize (ít điểm ảnh hơn), ghi đè tại chỗ
+                cv2.cvtColor(dst, cv2.COLOR_BGR2RGB, dst=dst)
+
+        # Chuyển kiểu và chuẩn hóa trong một lần duyệt
+        batch = self._batch[:n]
+        np.multiply(self._pixels[:n], np.float32(1.0 / 255.0), out=batch, casting='unsafe')
+        return batch
@@ -0,0 +1,438 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from src.detect import FoodDetector
+from src.classify import FoodClassifier
+from src.scheduler import InferenceScheduler
+from src.metrics import MODEL_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Các lớp của mô hình CNN mặc định, theo thứ tự thư mục của tập huấn luyện
+DEFAULT_CLASS_NAMES = (
+    'banh mi', 'bap cai luoc', 'bap cai xao', 'bo xao', 'ca chien', 'ca chua', 'ca kho',
+    'ca rot', 'canh bau', 'canh bi do', 'canh cai', 'canh chua', 'canh rong bien', 'chuoi',
+    'com', 'dau bap', 'dau hu', 'dau que', 'do chua', 'dua hau', 'dua leo', 'ga chien',
+    'ga kho', 'kho qua', 'kho tieu', 'kho trung', 'nuoc mam', 'nuoc tuong', 'oi', 'ot',
+    'rau', 'rau muong', 'rau ngo', 'suon mieng', 'suon xao', 'thanh long', 'thit chien',
+    'thit luoc', 'tom', 'trung chien', 'trung luoc'
+)
+
+# Các khóa của một phiên bản mô hình trong manifest
+SPEC_KEYS = ('yolo_model_path', 'cnn_model_path', 'cnn_backend', 'class_names_path')
+
+# Backend CNN có thể tạo trong master của serve.py rồi fork (không khởi tạo runtime TensorFlow)
+FORK_SAFE_CNN_BACKENDS = ('tflite', 'onnx')
+
+def is_fork_safe(spec):
+    """
+    Phiên bản có thể tải trước khi fork hay không
+
+    Keras (load_model khởi tạo runtime TensorFlow) và YOLO qua ultralytics/torch hoặc
+    OpenVINO không an toàn khi fork; chỉ CNN tflite/onnx cùng YOLO đã xuất .onnx mới được
+    tải trong master.
+    """
+    yolo_model_path = spec.get('yolo_model_path') or ''
+    return (spec.get('cnn_backend') or 'keras') in FORK_SAFE_CNN_BACKENDS and yolo_model_path.endswith('.onnx')
+
+def load_class_names(path=None):
+    """
+    Đọc danh sách lớp từ file JSON (mảng tên) hoặc file văn bản (mỗi dòng một tên)
+
+    Args:
+        path (str, optional): File danh sách lớp; None dùng DEFAULT_CLASS_NAMES
+
+    Returns:
+        list: Tên các lớp theo thứ tự đầu ra của CNN
+    """
+    if not path:
+        return list(DEFAULT_CLASS_NAMES)
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    if path.endswith('.json'):
+        names = json.loads(content)
+    else:
+        names = [line.strip() for line in content.splitlines() if line.strip()]
+    if not names or not all(isinstance(name, str) for name in names):
+        raise ValueError(f"Danh sách lớp không hợp lệ trong {path}")
+    return names
+
+class ModelBundle:
+    def __init__(self, version, spec, detector, classifier, class_names):
+        """
+        Một phiên bản mô hình: detector, classifier và danh sách lớp đi cùng nhau
+
+        Mỗi request lấy bundle đang hoạt động một lần và dùng nó cho cả khay, nên một
+        khay không bao giờ được xử lý bởi hai phiên bản khác nhau.
+
+        Args:
+            version (str): Tên phiên bản (được ghi lên mỗi kết quả)
+            spec (dict): Cấu hình đã dùng để tải (các khóa trong SPEC_KEYS)
+            detector (FoodDetector): Bộ phát hiện món ăn
+            classifier (FoodClassifier): Bộ phân loại món ăn
+            class_names (list): Danh sách lớp của classifier
+        """
+        self.version = version
+        self.spec = dict(spec)
+        self.detector = detector
+        self.classifier = classifier
+        self.class_names = class_names
+        self.scheduler = None
+        self.loaded_at = time.time()
+        self.activated_at = None
+        # Số request đang dùng bundle và bundle đã bị thay hẳn chưa (ModelRegistry.use, giữ khóa của registry)
+        self.users = 0
+        self.retired = False
+
+    def warmup(self, detect_batch_sizes=(1,), classify_batch_sizes=(1,)):
+        started = time.perf_counter()
+        self.detector.warmup(batch_sizes=detect_batch_sizes)
+        self.classifier.warmup(batch_sizes=classify_batch_sizes)
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model='warmup')
+
+    def smoke_test(self, image=None):
+        """
+        Kiểm tra nhanh trước khi phiên bản nhận request thật
+
+        Số đầu ra của CNN phải bằng số lớp, và cả pipeline phát hiện + phân loại phải
+        chạy được trên ảnh thử (nếu có ảnh khay mẫu thì phải phát hiện được ít nhất một món).
+
+        Raises:
+            RuntimeError: Phiên bản không vượt qua kiểm tra
+        """
+        width, height = self.classifier.input_size
+        outputs = np.asarray(self.classifier.model(np.zeros((1, height, width, 3), dtype=np.float32)))
+        if outputs.shape[-1] != len(self.class_names):
+            raise RuntimeError(f"CNN có {outputs.shape[-1]} đầu ra nhưng danh sách lớp có {len(self.class_names)} lớp")
+        if not np.all(np.isfinite(outputs)):
+            raise RuntimeError("CNN trả về giá trị không hữu hạn")
+
+        if image is None:
+            crops, _ = self.detector.detect_crops(np.zeros((768, 1024, 3), dtype=np.uint8))
+            images = [np.full((height, width, 3), 127, dtype=np.uint8)]
+        else:
+            crops, _ = self.detector.detect_crops(image)
+            if not crops:
+                raise RuntimeError("Detector không phát hiện được món nào trên ảnh khay mẫu")
+            images = [crop.image for crop in crops]
+        predictions = self.classifier.classify_batch(images)
+        if any(prediction is None for prediction in predictions):
+            raise RuntimeError("Classifier không phân loại được ảnh thử")
+
+    def start(self, **scheduler_options):
+        """Tạo bộ lập lịch suy luận của phiên bản (phải gọi sau khi fork)"""
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        self.scheduler = InferenceScheduler(self.detector, self.classifier, **scheduler_options)
+
+    def shutdown(self):
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+            self.scheduler = None
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            **self.spec,
+            'classes': len(self.class_names),
+            'loaded_at': self.loaded_at,
+            'activated_at': self.activated_at,
+        }
+
+class ModelRegistry:
+    def __init__(self, manifest_path, defaults, cache=None, num_threads=None, scheduler_options=None,
+                 warmup_batch_sizes=((1,), (1,)), smoke_image_path=None):
+        """
+        Danh mục các phiên bản mô hình và phiên bản đang phục vụ
+
+        Manifest (JSON) ghi các phiên bản đã đăng ký và phiên bản đang hoạt động. Khi
+        phiên bản hoạt động trong manifest thay đổi, mỗi tiến trình tải phiên bản mới
+        trong một luồng nền, warm-up, kiểm tra nhanh rồi thay bundle đang phục vụ bằng
+        một phép gán. Bundle trước đó vẫn được giữ (đã warm-up) để quay lui tức thì;
+        bundle cũ hơn nữa bị dừng khi request cuối cùng đang dùng nó (qua use()) kết thúc.
+
+        Args:
+            manifest_path (str): File manifest; nếu chưa có, chỉ có phiên bản 'default'
+            defaults (dict): Cấu hình của phiên bản 'default' và giá trị mặc định cho
+                các khóa bị thiếu của phiên bản khác (các khóa trong SPEC_KEYS)
+            cache (CropCache, optional): Bộ nhớ đệm kết quả CNN dùng chung (khóa theo phiên bản mô hình)
+            num_threads (int, optional): Số luồng CPU cho backend tflite/onnx
+            scheduler_options (dict, optional): Tham số cho InferenceScheduler
+            warmup_batch_sizes (tuple): (kích thước lô warm-up detector, kích thước lô warm-up CNN)
+            smoke_image_path (str, optional): Ảnh khay mẫu dùng để kiểm tra phiên bản mới
+        """
+        self.manifest_path = manifest_path
+        self.defaults = {key: defaults.get(key) for key in SPEC_KEYS}
+        self.cache = cache
+        self.num_threads = num_threads
+        self.scheduler_options = scheduler_options or {}
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self.smoke_image_path = smoke_image_path
+
+        self.active = None
+        self.previous = None
+        self.loading = None
+        self._failed = {}  # phiên bản -> (spec, thời điểm đăng ký) đã không vượt qua kiểm tra
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    # Manifest
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'active': 'default', 'versions': {}}
+
+    def _write_manifest(self, manifest):
+        directory = os.path.dirname(self.manifest_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # Ghi file tạm rồi đổi tên để tiến trình khác không đọc phải manifest ghi dở
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def resolve(self, version, manifest=None):
+        """Cấu hình của một phiên bản (các khóa thiếu lấy từ defaults)"""
+        if version == 'default':
+            return dict(self.defaults)
+        manifest = manifest or self.read_manifest()
+        if version not in manifest.get('versions', {}):
+            raise KeyError(f"Phiên bản mô hình không tồn tại: {version}")
+        entry = manifest['versions'][version]
+        return {key: entry.get(key) or self.defaults[key] for key in SPEC_KEYS}
+
+    def register(self, version, spec, activate=True):
+        """Đăng ký (hoặc cập nhật) một phiên bản trong manifest và đặt làm phiên bản hoạt động"""
+        if version == 'default':
+            raise ValueError("Tên phiên bản 'default' được dành cho cấu hình mặc định")
+        for key in ('yolo_model_path', 'cnn_model_path', 'class_names_path'):
+            path = spec.get(key)
+            if path and not os.path.exists(path):
+                raise FileNotFoundError(f"Không tìm thấy {key}: {path}")
+        manifest = self.read_manifest()
+        manifest.setdefault('versions', {})[version] = {
+            **{key: spec.get(key) for key in SPEC_KEYS if spec.get(key)},
+            'registered_at': time.time(),
+        }
+        if activate:
+            manifest['active'] = version
+        self._write_manifest(manifest)
+
+    def set_active(self, version):
+        """Đặt phiên bản hoạt động trong manifest (các tiến trình sẽ chuyển theo)"""
+        manifest = self.read_manifest()
+        if version != 'default' and version not in manifest.get('versions', {}):
+            raise KeyError(f"Phiên bản mô hình không tồn tại: {version}")
+        manifest['active'] = version
+        self._write_manifest(manifest)
+
+    # Tải và chuyển phiên bản
+
+    def build(self, version, spec=None):
+        """Tạo bundle của một phiên bản (chưa warm-up, chưa có bộ lập lịch)"""
+        spec = spec or self.resolve(version)
+        class_names = load_class_names(spec['class_names_path'])
+
+        started = time.perf_counter()
+        detector = FoodDetector(model_path=spec['yolo_model_path'])
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model='yolo')
+
+        started = time.perf_counter()
+        classifier = FoodClassifier(
+            model_path=spec['cnn_model_path'],
+            class_names=class_names,
+            backend=spec['cnn_backend'] or 'keras',
+            num_threads=self.num_threads,
+            cache=self.cache,
+            version=version
+        )
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model='cnn')
+        return ModelBundle(version, spec, detector, classifier, class_names)
+
+    def _prepare(self, bundle):
+        """Warm-up, kiểm tra nhanh và tạo bộ lập lịch cho bundle"""
+        bundle.warmup(*self.warmup_batch_sizes)
+        image = None
+        if self.smoke_image_path:
+            import cv2
+            image = cv2.imread(self.smoke_image_path)
+        bundle.smoke_test(image)
+        bundle.start(**self.scheduler_options)
+
+    def load_initial(self):
+        """Tạo bundle của phiên bản hoạt động trong manifest mà không chạy suy luận (an toàn trước fork)"""
+        if self.active is not None:
+            return
+        version = self.read_manifest().get('active', 'default')
+        try:
+            bundle = self.build(version)
+        except KeyError:
+            logger.warning("Phiên bản mô hình %s không có trong manifest, dùng cấu hình mặc định", version)
+            bundle = self.build('default')
+        self.active = bundle
+
+    def fork_safe(self):
+        """Phiên bản hoạt động trong manifest có thể tải trong master trước khi fork hay không"""
+        version = self.read_manifest().get('active', 'default')
+        try:
+            return is_fork_safe(self.resolve(version))
+        except KeyError:
+            return is_fork_safe(self.defaults)
+
+    def start(self):
+        """Warm-up, kiểm tra nhanh và bắt đầu phục vụ bằng bundle ban đầu (gọi sau khi fork)"""
+        self._prepare(self.active)
+        self.active.activated_at = time.time()
+        logger.info("Đang phục vụ mô hình phiên bản %s", self.active.version)
+
+    @contextmanager
+    def use(self):
+        """
+        Lấy bundle đang hoạt động cho một request (cả khay hoặc cả khung hình)
+
+        Bundle không bị dừng khi còn request đang dùng, kể cả khi đã bị thay.
+
+        Raises:
+            RuntimeError: Chưa có mô hình nào được tải
+        """
+        with self._lock:
+            bundle = self.active
+            if bundle is None or bundle.scheduler is None:
+                raise RuntimeError("Mô hình chưa sẵn sàng")
+            bundle.users += 1
+        try:
+            yield bundle
+        finally:
+            with self._lock:
+                bundle.users -= 1
+                stop = bundle.retired and bundle.users == 0
+            if stop:
+                bundle.shutdown()
+
+    def _swap(self, bundle):
+        stop = False
+        with self._lock:
+            retired = self.previous
+            self.previous = self.active
+            self.active = bundle
+            bundle.activated_at = time.time()
+            if retired is not None and retired is not bundle:
+                # Request đang dùng bundle cũ vẫn chạy xong; request cuối cùng sẽ dừng nó (use())
+                retired.retired = True
+                stop = retired.users == 0
+        logger.info("Đã chuyển sang mô hình phiên bản %s (phiên bản trước: %s)",
+                    bundle.version, self.previous.version if self.previous else None)
+        if stop:
+            retired.shutdown()
+
+    def _load(self, version, spec, stamp):
+        try:
+            logger.info("Đang tải mô hình phiên bản %s trong nền...", version)
+            bundle = self.build(version, spec)
+            self._prepare(bundle)
+        except Exception as e:
+            logger.exception("Phiên bản mô hình %s không dùng được, giữ phiên bản %s: %s",
+                             version, self.active.version if self.active else None, e)
+            # Không thử lại cho đến khi phiên bản được đăng ký lại
+            self._failed[version] = stamp
+            self.loading = {'version': version, 'state': 'failed', 'error': str(e)}
+            return
+        self._swap(bundle)
+        self.loading = {'version': version, 'state': 'active', 'error': None}
+
+    def _rollback_locked(self, version):
+        # Gọi khi đang giữ self._lock; chỉ đổi chỗ khi bundle trước đúng là phiên bản đích
+        if self.previous is None or self.previous.version != version:
+            return False
+        self.active, self.previous = self.previous, self.active
+        self.active.activated_at = time.time()
+        return True
+
+    def rollback(self, version=None):
+        """
+        Quay lại bundle trước đó ngay lập tức (bundle này vẫn đang được warm-up sẵn)
+
+        Args:
+            version (str, optional): Phiên bản đích; nếu đang phục vụ phiên bản này thì không làm gì,
+                nên gọi lặp lại (từ route và từ luồng theo dõi) không chuyển ngược lại
+
+        Returns:
+            ModelBundle: Bundle đang hoạt động sau khi quay lui, hoặc None nếu không có bundle trước
+        """
+        with self._lock:
+            if self.previous is None:
+                return None
+            version = version or self.previous.version
+            if self.active.version == version:
+                return self.active
+            if not self._rollback_locked(version):
+                return None
+        logger.info("Đã quay lại mô hình phiên bản %s", version)
+        return self.active
+
+    def sync(self):
+        """Chuyển sang phiên bản hoạt động trong manifest nếu khác phiên bản đang phục vụ"""
+        manifest = self.read_manifest()
+        target = manifest.get('active', 'default')
+        # Kiểm tra và đặt trạng thái trong cùng một khóa: request API và luồng theo dõi có
+        # thể gọi sync() đồng thời nhưng chỉ một trong hai được bắt đầu tải phiên bản mới
+        with self._lock:
+            if self.active is None or self.active.scheduler is None:
+                return
+            if target == self.active.version:
+                return
+            if self._rollback_locked(target):
+                logger.info("Đã quay lại mô hình phiên bản %s", target)
+                return
+            if self.loading is not None and self.loading['state'] == 'loading':
+                return
+            try:
+                spec = self.resolve(target, manifest)
+            except KeyError as e:
+                logger.error("%s", e)
+                return
+            stamp = (spec, manifest.get('versions', {}).get(target, {}).get('registered_at'))
+            if self._failed.get(target) == stamp:
+                return
+            self.loading = {'version': target, 'state': 'loading', 'error': None}
+
+        threading.Thread(target=self._load, args=(target, spec, stamp), name='model-loader', daemon=True).start()
+
+    def start_watching(self, interval=5.0):
+        """Theo dõi manifest trong một luồng nền và chuyển phiên bản khi phiên bản hoạt động thay đổi"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_watching.clear()
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.exception("Lỗi đọc manifest mô hình: %s", e)
+
+        self._watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+
+    def status(self):
+        manifest = self.read_manifest()
+        return {
+            'active': self.active.to_dict() if self.active else None,
+            'previous': self.previous.to_dict() if self.previous else None,
+            'loading': self.loading,
+            'manifest': manifest,
+        }
@@ -0,0 +1,222 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import sqlite3
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales_hourly (
+    hour INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    revenue REAL NOT NULL,
+    calories REAL NOT NULL,
+    PRIMARY KEY (hour, item)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS calories_daily (
+    student_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    orders INTEGER NOT NULL,
+    calories REAL NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (student_id, day)
+) WITHOUT ROWID;
+"""
+
+# Đơn hàng không có mã sinh viên được gộp vào khóa này trong calories_daily
+ANONYMOUS = ''
+
+def hour_bucket(timestamp):
+    """Đầu giờ (epoch giây) chứa thời điểm timestamp"""
+    return int(timestamp // 3600) * 3600
+
+def local_day(timestamp):
+    """Ngày theo giờ địa phương của máy chủ, dạng YYYY-MM-DD"""
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+class RollupAccumulator:
+    """Cộng dồn các đơn hàng theo khóa của bảng tổng hợp trước khi ghi"""
+    def __init__(self):
+        self.sales = defaultdict(lambda: [0, 0.0, 0.0])
+        self.calories = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def add_order(self, created_at, student_id, total_cost, total_calories):
+        entry = self.calories[(student_id or ANONYMOUS, local_day(created_at))]
+        entry[0] += 1
+        entry[1] += total_calories
+        entry[2] += total_cost
+
+    def add_item(self, created_at, item, price, calories):
+        entry = self.sales[(hour_bucket(created_at), item)]
+        entry[0] += 1
+        entry[1] += price
+        entry[2] += calories
+
+    def write(self, conn):
+        """Cộng các giá trị đã gom vào bảng tổng hợp (UPSERT), trong transaction của conn"""
+        conn.executemany(
+            'INSERT INTO sales_hourly (hour, item, quantity, revenue, calories) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (hour, item) DO UPDATE SET quantity = quantity + excluded.quantity, '
+            'revenue = revenue + excluded.revenue, calories = calories + excluded.calories',
+            [(hour, item, *values) for (hour, item), values in self.sales.items()]
+        )
+        conn.executemany(
+            'INSERT INTO calories_daily (student_id, day, orders, calories, cost) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (student_id, day) DO UPDATE SET orders = orders + excluded.orders, '
+            'calories = calories + excluded.calories, cost = cost + excluded.cost',
+            [(student_id, day, *values) for (student_id, day), values in self.calories.items()]
+        )
+
+class SalesRollups:
+    def __init__(self, store):
+        """
+        Bảng tổng hợp doanh thu theo món/giờ và calo theo sinh viên/ngày
+
+        Các bảng được cập nhật tăng dần trong cùng transaction ghi lô đơn hàng của
+        OrderStore, nên luôn khớp với dữ liệu gốc; truy vấn chỉ đọc số bucket cần thiết
+        thay vì quét lại toàn bộ đơn hàng.
+
+        Args:
+            store (OrderStore): Kho đơn hàng chứa các bảng tổng hợp
+        """
+        self.store = store
+        conn = sqlite3.connect(store.path, timeout=30.0)
+        conn.executescript(SCHEMA)
+        conn.close()
+        store.add_batch_listener(self.apply)
+
+    def apply(self, conn, orders):
+        """Listener của OrderStore: cộng một lô đơn hàng vào các bảng tổng hợp"""
+        acc = RollupAccumulator()
+        for order in orders:
+            acc.add_order(order['created_at'], order['student_id'], order['total_cost'], order['total_calories'])
+            for line in order['items']:
+                acc.add_item(order['created_at'], line['item'], line['price'], line['calories'])
+        acc.write(conn)
+
+    def dish_sales(self, since=None, until=None, granularity='day', item=None):
+        """
+        Số lượng, doanh thu và calo theo món trong từng giờ hoặc từng ngày
+
+        Args:
+            since (float, optional): Từ thời điểm (epoch giây, làm tròn xuống đầu giờ)
+            until (float, optional): Đến trước thời điểm (epoch giây)
+            granularity (str): 'hour' hoặc 'day' (ngày theo giờ địa phương)
+            item (str, optional): Chỉ lấy một món
+
+        Returns:
+            list: [{'period', 'item', 'quantity', 'revenue', 'calories'}, ...] theo thời gian
+        """
+        if granularity not in ('hour', 'day'):
+            raise ValueError(f"granularity không hợp lệ: {granularity}")
+        clauses, params = [], []
+        if since is not None:
+            clauses.append('hour >= ?')
+            params.append(hour_bucket(since))
+        if until is not None:
+            clauses.append('hour < ?')
+            params.append(until)
+        if item is not None:
+            clauses.append('item = ?')
+            params.append(item)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        period = 'hour' if granularity == 'hour' else "date(hour, 'unixepoch', 'localtime')"
+        rows = self.store.connection().execute(
+            f'SELECT {period} AS period, item, SUM(quantity) AS quantity, SUM(revenue) AS revenue, '
+            f'SUM(calories) AS calories FROM sales_hourly {where} '
+            'GROUP BY period, item ORDER BY period, revenue DESC',
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def daily_calories(self, student_id=None, since=None, until=None):
+        """
+        Tổng calo, số đơn và tiền theo ngày của một sinh viên
+
+        Args:
+            student_id (str, optional): Mã sinh viên (None: các đơn không có mã)
+            since (str, optional): Từ ngày YYYY-MM-DD
+            until (str, optional): Đến hết ngày YYYY-MM-DD
+
+        Returns:
+            list: [{'day', 'orders', 'calories', 'cost'}, ...] theo ngày
+        """
+        clauses, params = ['student_id = ?'], [student_id or ANONYMOUS]
+        if since is not None:
+            clauses.append('day >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('day <= ?')
+            params.append(until)
+        rows = self.store.connection().execute(
+            f"SELECT day, orders, calories, cost FROM calories_daily WHERE {' AND '.join(clauses)} ORDER BY day",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+def rebuild(path, fetch_size=5000):
+    """
+    Dựng lại các bảng tổng hợp từ bảng đơn hàng gốc trong một lượt đọc tuần tự
+
+    Đơn hàng được đọc theo từng khối fetch_size dòng; bộ nhớ chỉ tỉ lệ với số bucket.
+    Việc đọc và thay bảng nằm trong một transaction ghi nên không đơn nào bị đếm thiếu
+    hoặc hai lần; trong lúc đó luồng ghi đơn hàng của máy chủ chờ rồi ghi lại.
+
+    Returns:
+        tuple: (số đơn hàng, số món đã đọc)
+    """
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+    try:
+        conn.executescript(SCHEMA)
+        conn.execute('BEGIN IMMEDIATE')
+        acc = RollupAccumulator()
+        orders_count = items_count = 0
+        cursor = conn.execute(
+            'SELECT o.created_at, o.student_id, o.total_cost, o.total_calories, i.position, i.item, i.price, i.calories '
+            'FROM orders o LEFT JOIN order_items i ON i.order_id = o.id'
+        )
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for created_at, student_id, total_cost, total_calories, position, item, price, calories in rows:
+                # Mỗi đơn chỉ được đếm một lần, ở món đầu tiên (hoặc dòng duy nhất nếu đơn không có món)
+                if not position:
+                    acc.add_order(created_at, student_id, total_cost, total_calories)
+                    orders_count += 1
+                if item is not None:
+                    acc.add_item(created_at, item, price, calories)
+                    items_count += 1
+
+        conn.execute('DELETE FROM sales_hourly')
+        conn.execute('DELETE FROM calories_daily')
+        acc.write(conn)
+        conn.execute('COMMIT')
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return orders_count, items_count
+
+def main():
+    parser = argparse.ArgumentParser(description="Dựng lại các bảng tổng hợp doanh thu và calo từ lịch sử đơn hàng")
+    parser.add_argument('--db', default=os.environ.get('ORDERS_DB_PATH', 'data/orders.db'))
+    parser.add_argument('--fetch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f"Không tìm thấy {args.db}")
+    started = time.perf_counter()
+    orders_count, items_count = rebuild(args.db, args.fetch_size)
+    print(f"Đã dựng lại bảng tổng hợp từ {orders_count} đơn hàng ({items_count} món) "
+          f"trong {time.perf_counter() - started:.2f} giây")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+class SchedulerStopped(RuntimeError):
+    """Bộ lập lịch đã dừng: yêu cầu không được (và sẽ không bao giờ được) chạy"""
+
+class _Batcher:
+    def __init__(self, name, run_batch, max_batch_size, max_wait_ms, stats_window=1000):
+        """
+        Gom các yêu cầu suy luận đơn lẻ thành lô và chạy chúng trên một luồng riêng
+
+        Args:
+            name (str): Tên của loại công việc (dùng cho thống kê)
+            run_batch (callable): Hàm nhận danh sách đầu vào và trả về danh sách kết quả tương ứng
+            max_batch_size (int): Số yêu cầu tối đa trong một lô
+            max_wait_ms (float): Thời gian chờ tối đa (ms) để gom thêm yêu cầu sau yêu cầu đầu tiên
+            stats_window (int): Số mẫu thời gian chờ gần nhất được giữ lại để tính thống kê
+        """
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._submit_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._batch_sizes = {}
+        self._wait_times = deque(maxlen=stats_window)
+        self._batches = 0
+        self._requests = 0
+        self._errors = 0
+
+        self._thread = threading.Thread(target=self._loop, name=f"inference-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """
+        Đưa một yêu cầu vào hàng đợi và trả về Future chứa kết quả
+
+        Raises:
+            SchedulerStopped: Bộ lập lịch đã dừng
+        """
+        future = Future()
+        # Kiểm tra và đưa vào hàng đợi cùng một khóa với shutdown(), nên mọi yêu cầu đã
+        # vào hàng đợi đều được chạy hoặc được trả lỗi khi dừng
+        with self._submit_lock:
+            if self._stop.is_set():
+                raise SchedulerStopped(f"Bộ lập lịch {self.name} đã dừng")
+            self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        """Lấy một lô yêu cầu: chờ yêu cầu đầu tiên rồi gom thêm cho đến khi đầy lô hoặc hết thời gian chờ"""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            items = []
+            futures = []
+            for item, future, enqueued in batch:
+                # Bỏ qua các yêu cầu đã bị hủy bởi phía gọi
+                if not future.set_running_or_notify_cancel():
+                    continue
+                items.append(item)
+                futures.append(future)
+                with self._lock:
+                    self._wait_times.append(started - enqueued)
+
+            if not items:
+                continue
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(items)
+                self._batch_sizes[len(items)] = self._batch_sizes.get(len(items), 0) + 1
+
+            try:
+                results = self.run_batch(items)
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.exception("Lỗi khi chạy lô %s: %s", self.name, e)
+                with self._lock:
+                    self._errors += 1
+                for future in futures:
+                    future.set_exception(e)
+
+    def stats(self):
+        """Trả về độ sâu hàng đợi, histogram kích thước lô và thống kê thời gian chờ"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            batches, requests, errors = self._batches, self._requests, self._errors
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(round(p / 100.0 * (len(waits) - 1))))] * 1000.0
+
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches': batches,
+            'requests': requests,
+            'errors': errors,
+            'avg_batch_size': requests / batches if batches else 0.0,
+            'batch_size_histogram': batch_sizes,
+            'wait_ms': {
+                'mean': sum(waits) / len(waits) * 1000.0 if waits else 0.0,
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'p99': percentile(99),
+                'max': waits[-1] * 1000.0 if waits else 0.0,
+            },
+        }
+
+    def shutdown(self):
+        """Dừng luồng chạy lô; các yêu cầu còn trong hàng đợi nhận lỗi SchedulerStopped"""
+        with self._submit_lock:
+            self._stop.set()
+        self._thread.join()
+        while True:
+            try:
+                _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(SchedulerStopped(f"Bộ lập lịch {self.name} đã dừng"))
+
+
+class InferenceScheduler:
+    def __init__(self, detector, classifier, max_batch_size=8, max_wait_ms=8, max_detect_batch_size=4,
+                 result_timeout=30.0):
+        """
+        Bộ lập lịch suy luận nằm giữa các request Flask và các mô hình dùng chung
+
+        Gom các công việc phát hiện (YOLO) và phân loại món ăn (CNN) từ nhiều request
+        đồng thời thành các lô, mỗi lô chạy một lần forward. Mỗi phía gọi nhận kết quả
+        qua một Future.
+
+        Args:
+            detector (FoodDetector): Bộ phát hiện món ăn
+            classifier (FoodClassifier): Bộ phân loại món ăn
+            max_batch_size (int): Số ảnh cắt tối đa trong một lô phân loại
+            max_wait_ms (float): Thời gian chờ tối đa (ms) để gom lô
+            max_detect_batch_size (int): Số ảnh khay tối đa trong một lô phát hiện
+            result_timeout (float): Thời gian tối đa (giây) một request chờ kết quả của lô
+        """
+        self.detector = detector
+        self.classifier = classifier
+        self.result_timeout = result_timeout
+        self._classify = _Batcher('classify', classifier.classify_batch, max_batch_size, max_wait_ms)
+        self._detect = _Batcher('detect', detector.detect_crops_batch, max_detect_batch_size, max_wait_ms)
+
+    def submit_detect(self, img):
+        """Đưa một ảnh khay vào hàng đợi phát hiện, Future trả về (danh sách FoodCrop, kết quả YOLO)"""
+        return self._detect.submit(img)
+
+    def submit_classify(self, image):
+        """Đưa một ảnh cắt vào hàng đợi phân loại, Future trả về [(tên lớp, xác suất), ...] hoặc None"""
+        return self._classify.submit(image)
+
+    def _wait(self, futures):
+        """Chờ kết quả của các Future trong tối đa result_timeout giây (tính chung)"""
+        deadline = time.monotonic() + self.result_timeout
+        try:
+            return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+        except FutureTimeoutError:
+            # Không chạy các yêu cầu mà phía gọi đã bỏ
+            for future in futures:
+                future.cancel()
+            raise TimeoutError(f"Quá {self.result_timeout} giây chờ kết quả suy luận")
+
+    def detect_crops(self, img):
+        """Phát hiện và cắt món ăn, chờ đến khi lô chứa ảnh này chạy xong"""
+        return self._wait([self.submit_detect(img)])[0]
+
+    def classify_batch(self, images):
+        """Phân loại các ảnh cắt của một khay; các ảnh có thể được gom chung lô với request khác"""
+        return self._wait([self.submit_classify(image) for image in images])
+
+    def stats(self):
+        return {
+            'classify': self._classify.stats(),
+            'detect': self._detect.stats(),
+        }
+
+    def shutdown(self):
+        self._classify.shutdown()
+        self._detect.shutdown()
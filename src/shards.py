@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+VALID_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+INTERPOLATIONS = {
+    'nearest': cv2.INTER_NEAREST,  # giống flow_from_directory/tf.data khi huấn luyện
+    'linear': cv2.INTER_LINEAR,    # giống FoodClassifier khi suy luận
+}
+
+def list_class_files(directory):
+    """
+    Danh sách ảnh của từng lớp (thư mục con), cùng thứ tự lớp với flow_from_directory
+
+    Returns:
+        dict: {tên lớp: [tên file đã sắp xếp]} theo thứ tự tên lớp
+    """
+    classes = {}
+    for class_name in sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d))):
+        class_dir = os.path.join(directory, class_name)
+        classes[class_name] = sorted(f for f in os.listdir(class_dir)
+                                     if os.path.splitext(f)[1].lower() in VALID_EXTENSIONS)
+    return classes
+
+def class_fingerprint(class_dir, files):
+    """Dấu vân tay của một lớp từ tên, kích thước và thời điểm sửa của các file (chỉ stat, không đọc ảnh)"""
+    digest = hashlib.sha1()
+    for file in files:
+        st = os.stat(os.path.join(class_dir, file))
+        digest.update(f"{file}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def decode_image(path, img_size, interpolation):
+    """Đọc ảnh thành RGB uint8 (cao, rộng, 3) đã resize, hoặc None nếu không đọc được"""
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return cv2.resize(img, (img_size[1], img_size[0]), interpolation=INTERPOLATIONS[interpolation])
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def _build_class_shard(class_dir, files, shard_path, img_size, interpolation, workers):
+    """
+    Giải mã ảnh của một lớp (song song) và ghi thẳng vào file .npy qua memmap
+
+    Returns:
+        tuple: (số ảnh đã ghi, danh sách file không đọc được)
+    """
+    tmp_path = shard_path + '.tmp.npy'
+    shard = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8,
+                                      shape=(len(files),) + tuple(img_size) + (3,))
+    count = 0
+    skipped = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        images = executor.map(lambda file: decode_image(os.path.join(class_dir, file), img_size, interpolation), files)
+        for file, img in zip(files, images):
+            if img is None:
+                skipped.append(file)
+                continue
+            shard[count] = img
+            count += 1
+    shard.flush()
+
+    if skipped:
+        # Hiếm gặp: ghi lại file với đúng số ảnh đọc được
+        compact = np.lib.format.open_memmap(tmp_path + '.compact.npy', mode='w+', dtype=np.uint8,
+                                            shape=(count,) + tuple(img_size) + (3,))
+        compact[:] = shard[:count]
+        compact.flush()
+        del compact
+        os.replace(tmp_path + '.compact.npy', tmp_path)
+    del shard
+    os.replace(tmp_path, shard_path)
+    return count, skipped
+
+def compile_split(source_dir, output_dir, img_size=(224, 224), interpolation='nearest', workers=None, force=False):
+    """
+    Biên dịch một thư mục ảnh (mỗi thư mục con là một lớp) thành các shard uint8 đã resize
+
+    Mỗi lớp là một file <lớp>.npy (N, cao, rộng, 3) đọc được bằng memmap; manifest.json
+    ghi thứ tự lớp (chỉ số lớp = nhãn), số ảnh và dấu vân tay nguồn của từng lớp. Chỉ
+    các lớp có file nguồn thay đổi (thêm/xóa/sửa) mới được giải mã lại.
+
+    Args:
+        source_dir (str): Thư mục ảnh nguồn
+        output_dir (str): Thư mục chứa shard và manifest
+        img_size (tuple): Kích thước (cao, rộng)
+        interpolation (str): 'nearest' hoặc 'linear'
+        workers (int, optional): Số luồng giải mã (mặc định theo số CPU)
+        force (bool): Dựng lại mọi lớp
+
+    Returns:
+        dict: Manifest mới, kèm 'rebuilt' là danh sách lớp đã dựng lại trong lần này
+    """
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"interpolation không hợp lệ: {interpolation}")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or min(8, os.cpu_count() or 1)
+    img_size = [int(img_size[0]), int(img_size[1])]
+
+    previous = read_manifest(output_dir)
+    # Đổi kích thước hoặc cách resize thì không dùng lại được shard nào
+    if previous and (previous.get('version') != MANIFEST_VERSION or previous.get('img_size') != img_size
+                     or previous.get('interpolation') != interpolation):
+        previous = None
+    previous_classes = {entry['name']: entry for entry in previous['classes']} if previous else {}
+
+    classes = []
+    rebuilt = []
+    for class_name, files in list_class_files(source_dir).items():
+        class_dir = os.path.join(source_dir, class_name)
+        fingerprint = class_fingerprint(class_dir, files)
+        shard_file = f"{class_name}.npy"
+        entry = previous_classes.get(class_name)
+        if (not force and entry is not None and entry['fingerprint'] == fingerprint
+                and os.path.exists(os.path.join(output_dir, shard_file))):
+            classes.append(entry)
+            continue
+
+        started = time.perf_counter()
+        count, skipped = _build_class_shard(class_dir, files, os.path.join(output_dir, shard_file),
+                                            img_size, interpolation, workers)
+        classes.append({'name': class_name, 'file': shard_file, 'count': count,
+                        'fingerprint': fingerprint, 'skipped': skipped})
+        rebuilt.append(class_name)
+        print(f"{class_name}: {count} ảnh ({len(skipped)} lỗi) trong {time.perf_counter() - started:.1f} giây")
+
+    # Xóa shard của các lớp không còn trong nguồn
+    kept = {entry['file'] for entry in classes}
+    for file in os.listdir(output_dir):
+        if file.endswith('.npy') and file not in kept:
+            os.remove(os.path.join(output_dir, file))
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': os.path.abspath(source_dir),
+        'img_size': img_size,
+        'interpolation': interpolation,
+        'total': sum(entry['count'] for entry in classes),
+        'classes': classes,
+    }
+    _write_manifest(output_dir, manifest)
+    manifest['rebuilt'] = rebuilt
+    return manifest
+
+class ShardSet:
+    def __init__(self, directory):
+        """
+        Tập dữ liệu đã biên dịch bởi compile_split, đọc bằng memmap (không giải mã, không sao chép khi cắt lát)
+
+        Args:
+            directory (str): Thư mục chứa manifest.json và các shard
+        """
+        manifest = read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"Không tìm thấy {os.path.join(directory, MANIFEST_NAME)}")
+        self.directory = directory
+        self.manifest = manifest
+        self.img_size = tuple(manifest['img_size'])
+        self.interpolation = manifest['interpolation']
+        self.class_names = [entry['name'] for entry in manifest['classes']]
+        self.shards = [np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+                       for entry in manifest['classes']]
+        # Số ảnh lấy từ chính file shard, phòng khi manifest cũ hơn shard (biên dịch bị ngắt giữa chừng)
+        self.counts = np.array([len(shard) for shard in self.shards], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        self.labels = np.repeat(np.arange(len(self.class_names), dtype=np.int32), self.counts)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def take(self, indices):
+        """
+        Lấy các ảnh theo chỉ số toàn cục (theo thứ tự của indices)
+
+        Returns:
+            tuple: (ảnh uint8 (N, cao, rộng, 3), nhãn int32 (N,))
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        images = np.empty((len(indices),) + self.img_size + (3,), dtype=np.uint8)
+        classes = np.searchsorted(self.offsets, indices, side='right') - 1
+        for label in np.unique(classes):
+            mask = classes == label
+            rows = indices[mask] - self.offsets[label]
+            order = np.argsort(rows)
+            # Đọc theo thứ tự tăng dần trong file để truy cập đĩa tuần tự
+            images[np.flatnonzero(mask)[order]] = self.shards[label][rows[order]]
+        return images, self.labels[indices]
+
+    def batches(self, batch_size):
+        """
+        Duyệt tuần tự theo từng lớp; ảnh là lát cắt của memmap (không sao chép)
+
+        Yields:
+            tuple: (ảnh uint8 (<= batch_size, cao, rộng, 3), nhãn int32)
+        """
+        for label, shard in enumerate(self.shards):
+            for start in range(0, len(shard), batch_size):
+                images = shard[start:start + batch_size]
+                yield images, np.full(len(images), label, dtype=np.int32)
+
+    def sample_indices(self, per_class, seed=0):
+        """Chỉ số toàn cục của tối đa per_class ảnh ngẫu nhiên mỗi lớp (đã sắp xếp)"""
+        rng = np.random.default_rng(seed)
+        picks = []
+        for label, count in enumerate(self.counts):
+            rows = rng.choice(count, size=per_class, replace=False) if count > per_class else np.arange(count)
+            picks.append(np.sort(rows) + self.offsets[label])
+        return np.concatenate(picks) if picks else np.empty(0, dtype=np.int64)
+
+def main():
+    parser = argparse.ArgumentParser(description="Biên dịch tập ảnh thành các shard uint8 đã resize (memmap .npy)")
+    parser.add_argument('--data-dir', default="data/classification_dataset_augmented")
+    parser.add_argument('--output-dir', default=os.environ.get('DATASET_SHARDS', "data/shards"))
+    parser.add_argument('--splits', nargs='+', default=['train', 'val'])
+    parser.add_argument('--img-size', type=int, default=224)
+    parser.add_argument('--interpolation', default='nearest', choices=sorted(INTERPOLATIONS))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="Dựng lại mọi lớp")
+    args = parser.parse_args()
+
+    for split in args.splits:
+        source_dir = os.path.join(args.data_dir, split)
+        if not os.path.isdir(source_dir):
+            sys.exit(f"Không tìm thấy {source_dir}")
+        started = time.perf_counter()
+        manifest = compile_split(source_dir, os.path.join(args.output_dir, split), (args.img_size, args.img_size),
+                                 args.interpolation, args.workers, args.force)
+        size_mb = manifest['total'] * args.img_size * args.img_size * 3 / (1024 * 1024)
+        print(f"[{split}] {manifest['total']} ảnh, {len(manifest['classes'])} lớp ({size_mb:.0f} MB), "
+              f"dựng lại {len(manifest['rebuilt'])} lớp trong {time.perf_counter() - started:.1f} giây")
+
+if __name__ == "__main__":
+    main()
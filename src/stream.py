@@ -0,0 +1,319 @@
+import time
+import uuid
+import threading
+import cv2
+import numpy as np
+
+class MotionGate:
+    def __init__(self, threshold=8.0, size=(64, 48)):
+        """
+        Cổng chuyển động: chỉ cho chạy detector khi khung hình khác đáng kể so với lần chạy trước
+
+        Khung hình được thu nhỏ về ảnh xám size và làm mờ, sau đó so sánh trung bình
+        chênh lệch tuyệt đối với khung tham chiếu (khung gần nhất đã chạy detector).
+
+        Args:
+            threshold (float): Ngưỡng chênh lệch trung bình (0-255) để coi là cảnh thay đổi
+            size (tuple): Kích thước (rộng, cao) ảnh thu nhỏ dùng để so sánh
+        """
+        self.threshold = threshold
+        self.size = size
+        self._reference = None
+
+    def _signature(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed(self, frame):
+        """
+        Kiểm tra khung hình có thay đổi so với khung tham chiếu không
+
+        Returns:
+            tuple: (có thay đổi hay không, chữ ký của khung hình để cập nhật tham chiếu)
+        """
+        signature = self._signature(frame)
+        if self._reference is None:
+            return True, signature
+        diff = float(np.mean(cv2.absdiff(signature, self._reference)))
+        return diff > self.threshold, signature
+
+    def update(self, signature):
+        self._reference = signature
+
+class Track:
+    __slots__ = ('id', 'box', 'hits', 'missing', 'label', 'prediction', 'yolo_class', 'image', 'billed')
+
+    def __init__(self, track_id, box, yolo_class):
+        self.id = track_id
+        self.box = box
+        self.yolo_class = yolo_class
+        self.hits = 1
+        self.missing = 0
+        self.label = None
+        self.prediction = None
+        self.image = None
+        self.billed = False
+
+    def to_dict(self):
+        return {
+            'track_id': self.id,
+            'box': [int(v) for v in self.box],
+            'label': self.label,
+            'confirmed': self.label is not None,
+            'billed': self.billed,
+        }
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+class TrayTracker:
+    def __init__(self, iou_threshold=0.4, min_hits=2, max_missing=3, rebill_cooldown=10.0):
+        """
+        Theo dõi các món ăn qua nhiều khung hình bằng cách ghép box theo IoU
+
+        Track đã tính tiền bị xóa (ví dụ món bị tay che vài khung hình) được giữ lại
+        rebill_cooldown giây; box mới trùng vị trí trong thời gian đó được ghép lại vào
+        track cũ thay vì tạo track mới và tính tiền lần nữa. Khi detector không thấy món
+        nào (khay đã được lấy đi), các track này bị quên ngay để khay mới được tính tiền.
+
+        Args:
+            iou_threshold (float): IoU tối thiểu để ghép box mới với track cũ
+            min_hits (int): Số lần phát hiện liên tiếp cần có trước khi xác nhận track (tránh box nhiễu)
+            max_missing (int): Số lần chạy detector liên tiếp không thấy trước khi xóa track
+            rebill_cooldown (float): Thời gian (giây) nhớ các track đã tính tiền sau khi bị xóa
+        """
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_missing = max_missing
+        self.rebill_cooldown = rebill_cooldown
+        self.tracks = []
+        self._dropped = []  # (track đã tính tiền bị xóa, thời điểm xóa)
+        self._next_id = 1
+
+    def _revive(self, box):
+        """Lấy lại track đã tính tiền bị xóa gần đây có IoU lớn nhất với box (nếu đạt ngưỡng)"""
+        best, best_iou = None, self.iou_threshold
+        for i, (track, _) in enumerate(self._dropped):
+            iou = box_iou(track.box, box)
+            if iou >= best_iou:
+                best, best_iou = i, iou
+        if best is None:
+            return None
+        return self._dropped.pop(best)[0]
+
+    def update(self, crops):
+        """
+        Cập nhật các track với kết quả phát hiện mới
+
+        Args:
+            crops (list): Danh sách FoodCrop của khung hình hiện tại
+
+        Returns:
+            list: Các cặp (track, crop) vừa đủ điều kiện xác nhận và cần được phân loại
+        """
+        candidates = sorted(
+            ((box_iou(track.box, crop.box), t, c) for t, track in enumerate(self.tracks) for c, crop in enumerate(crops)),
+            key=lambda x: -x[0]
+        )
+        matched_tracks, matched_crops = set(), set()
+        to_confirm = []
+        for iou, t, c in candidates:
+            if iou < self.iou_threshold:
+                break
+            if t in matched_tracks or c in matched_crops:
+                continue
+            matched_tracks.add(t)
+            matched_crops.add(c)
+            track, crop = self.tracks[t], crops[c]
+            track.box = crop.box
+            track.hits += 1
+            track.missing = 0
+            if track.label is None and track.hits >= self.min_hits:
+                to_confirm.append((track, crop))
+
+        now = time.monotonic()
+        self._dropped = [(track, dropped_at) for track, dropped_at in self._dropped
+                         if now - dropped_at <= self.rebill_cooldown]
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missing += 1
+                if track.missing > self.max_missing:
+                    if track.billed:
+                        self._dropped.append((track, now))
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+        if not crops:
+            # Khung hình trống: khay đã được lấy đi, món ở cùng vị trí sau đó là khay mới
+            self._dropped = []
+
+        for c, crop in enumerate(crops):
+            if c in matched_crops:
+                continue
+            track = self._revive(crop.box)
+            if track is not None:
+                # Món đã tính tiền xuất hiện lại sau khi bị che: tiếp tục track cũ, không tính tiền lại
+                track.box = crop.box
+                track.hits += 1
+                track.missing = 0
+                self.tracks.append(track)
+                continue
+            track = Track(self._next_id, crop.box, crop.yolo_class)
+            self._next_id += 1
+            self.tracks.append(track)
+            if self.min_hits <= 1:
+                to_confirm.append((track, crop))
+
+        return to_confirm
+
+    @property
+    def pending(self):
+        """
+        Có track nào đang chờ xác nhận hoặc đang bị mất dấu không
+
+        Track bị mất dấu chỉ được tính thêm missing khi detector chạy, nên detector phải
+        tiếp tục chạy (kể cả khi cảnh đứng yên) cho đến khi track được thấy lại hoặc bị xóa.
+        """
+        return any(track.label is None or track.missing > 0 for track in self.tracks)
+
+class StreamSession:
+    def __init__(self, session_id, motion_threshold=8.0, min_hits=2, max_missing=3, rebill_cooldown=10.0):
+        """
+        Trạng thái của một luồng camera: cổng chuyển động, bộ theo dõi và các món đã tính tiền
+        """
+        self.id = session_id
+        self.gate = MotionGate(motion_threshold)
+        self.tracker = TrayTracker(min_hits=min_hits, max_missing=max_missing, rebill_cooldown=rebill_cooldown)
+        self.billed_tracks = []
+        self.frames = 0
+        self.detections = 0
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def process_frame(self, frame, detect_fn, classify_fn):
+        """
+        Xử lý một khung hình
+
+        Detector chỉ chạy khi cảnh thay đổi hoặc còn track đang chờ xác nhận hay đang bị
+        mất dấu. Mỗi track chỉ được phân loại một lần khi được xác nhận.
+
+        Args:
+            frame (numpy.ndarray): Khung hình BGR
+            detect_fn (callable): Hàm nhận ảnh, trả về (danh sách FoodCrop, kết quả YOLO)
+            classify_fn (callable): Hàm nhận danh sách ảnh, trả về danh sách top-k
+
+        Returns:
+            tuple: (detector có chạy không, danh sách track vừa được xác nhận)
+        """
+        with self.lock:
+            self.frames += 1
+            self.last_seen = time.monotonic()
+
+            changed, signature = self.gate.changed(frame)
+            if not changed and not self.tracker.pending:
+                return False, []
+
+            crops, _ = detect_fn(frame)
+            self.detections += 1
+            self.gate.update(signature)
+
+            to_confirm = self.tracker.update(crops)
+            if to_confirm:
+                predictions = classify_fn([crop.image for _, crop in to_confirm])
+                for (track, crop), prediction in zip(to_confirm, predictions):
+                    track.prediction = prediction
+                    track.label = prediction[0][0] if prediction else track.yolo_class
+                    track.image = crop.image.copy()
+                    track.billed = True
+                    self.billed_tracks.append(track)
+            return True, [track for track, _ in to_confirm]
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'detections': self.detections,
+            'skipped_frames': self.frames - self.detections,
+            'tracks': [track.to_dict() for track in self.tracker.tracks],
+            'billed_items': len(self.billed_tracks),
+        }
+
+class StreamManager:
+    def __init__(self, max_sessions=32, ttl=300, **session_options):
+        """
+        Quản lý các phiên luồng camera đang mở, tự đóng phiên không hoạt động quá ttl giây
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.session_options = session_options
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.monotonic()
+        for session_id in [sid for sid, s in self._sessions.items() if now - s.last_seen > self.ttl]:
+            del self._sessions[session_id]
+
+    def create(self):
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            session = StreamSession(uuid.uuid4().hex, **self.session_options)
+            self._sessions[session.id] = session
+            return session
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire()
+            return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+
+if __name__ == "__main__":
+    # Kiểm tra: lấy khay ra rồi đặt khay mới vào đúng chỗ cũ thì khay mới phải được tính tiền
+    from types import SimpleNamespace
+
+    empty = np.zeros((240, 320, 3), dtype=np.uint8)
+    tray = empty.copy()
+    tray[40:200, 60:260] = 255
+    box = (80, 60, 160, 140)
+    scene = {'frame': empty}
+
+    def detect(frame):
+        if frame is empty:
+            return [], None
+        return [SimpleNamespace(box=box, image=frame[60:140, 80:160], yolo_class='food')], None
+
+    def classify(images):
+        return [[('com', 0.9)] for _ in images]
+
+    session = StreamSession('demo', rebill_cooldown=60.0)
+    for frame in [tray] * 3 + [empty] * 6 + [tray] * 3:
+        session.process_frame(frame, detect, classify)
+    assert len(session.billed_tracks) == 2, session.stats()
+
+    # Món bị che vài khung hình (các món khác vẫn thấy) thì không bị tính tiền lại
+    session = StreamSession('demo', rebill_cooldown=60.0)
+    other = SimpleNamespace(box=(200, 60, 260, 140), image=tray[60:140, 200:260], yolo_class='food')
+    visible = {'hidden': False}
+
+    def detect_partial(frame):
+        crops = [other] if visible['hidden'] else [other] + detect(frame)[0]
+        return crops, None
+
+    hand = tray.copy()
+    hand[0:150, 60:180] = 128
+    for hidden in [False] * 3 + [True] * 6 + [False] * 3:
+        visible['hidden'] = hidden
+        session.process_frame(hand if hidden else tray, detect_partial, classify)
+    assert len(session.billed_tracks) == 2, session.stats()
+    print("OK:", session.stats()['billed_items'], "món đã tính tiền")
@@ -0,0 +1,50 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+class ThumbnailStore:
+    def __init__(self, max_size=2048, ttl=600):
+        """
+        Kho ảnh thu nhỏ (JPEG) trong bộ nhớ, có thời gian sống ngắn
+
+        Ảnh cắt được lưu một lần và trả về client qua /api/crops/<id> thay vì nhúng
+        base64 vào JSON kết quả.
+
+        Args:
+            max_size (int): Số ảnh tối đa (loại bỏ ảnh cũ nhất khi đầy)
+            ttl (float): Thời gian sống của mỗi ảnh (giây)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # id -> (bytes JPEG, thời điểm lưu)
+        self._lock = threading.Lock()
+
+    def put(self, data):
+        """Lưu bytes JPEG, trả về id của ảnh"""
+        thumbnail_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[thumbnail_id] = (data, time.monotonic())
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return thumbnail_id
+
+    def get(self, thumbnail_id):
+        """Trả về bytes JPEG hoặc None nếu không tồn tại/đã hết hạn"""
+        with self._lock:
+            entry = self._entries.get(thumbnail_id)
+            if entry is None:
+                return None
+            data, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[thumbnail_id]
+                return None
+            return data
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'bytes': sum(len(data) for data, _ in self._entries.values()),
+            }
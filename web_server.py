@@ -1,4 +1,6 @@
-from app import app
-
-if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
+from app import app, start_models_initialization
+
+if __name__ == '__main__':
+    # Tải và warm-up mô hình trong nền; /readyz trả về 200 khi hoàn tất
+    start_models_initialization()
+    app.run(debug=True, host='0.0.0.0', port=5001, use_reloader=False)
\ No newline at end of file